@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Resolve data/aliases.json once, so canonicalising is a single lookup.
+
+The file maps an alias onto the id it duplicates, and that id may itself be an
+alias: a chain. Walking the chain on every lookup, with a fresh `seen` set to
+survive a cycle, happened once per event and once per item in every consumer.
+flatten_aliases() walks each chain once, points every alias straight at its
+root, and refuses a cycle outright instead of quietly stopping somewhere on it.
+
+data/aliases.json keeps the chains as edited; export_quiz.py writes the flat
+table to web/data/aliases.json for the app.
+"""
+
+from __future__ import annotations
+
+
+class AliasCycleError(ValueError):
+    """data/aliases.json maps some id back onto itself, directly or along a chain."""
+
+
+def flatten_aliases(aliases: dict[str, str]) -> dict[str, str]:
+    """alias -> root for every alias, where a root is an id that is not an alias.
+
+    Raises AliasCycleError naming the ids of any cycle, including an id mapped
+    onto itself. The scripts print it and exit 1 rather than show a traceback.
+    """
+    flat: dict[str, str] = {}
+    for start in aliases:
+        if start in flat:
+            continue
+        path: list[str] = []
+        on_path: set[str] = set()
+        current = start
+        while current in aliases and current not in flat:
+            if current in on_path:
+                cycle = path[path.index(current) :] + [current]
+                raise AliasCycleError("Alias cycle in data/aliases.json: " + " -> ".join(cycle))
+            path.append(current)
+            on_path.add(current)
+            current = aliases[current]
+        root = flat.get(current, current)
+        # Path compression: everything walked resolves to the same root.
+        for alias_id in path:
+            flat[alias_id] = root
+    return flat
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Replay the answer history and measure how well scoring would have selected.
+
+There was no way to tell whether a change to a tau or a weight actually improves
+the practice set. This walks the history forward once, folding each answer into
+a running ScoreState per (word, mode), and at every session boundary asks what
+the selector would have picked right then. Two things are measured:
+
+- Prediction: before each answer is folded in, the word's score at that moment
+  is recorded with the outcome. A useful score ranks the answers that went wrong
+  above the ones that went right; the AUC says how often it does (0.5 is chance).
+- Selection: of the words answered in the session that followed a boundary,
+  which were picked, and how many of the picked ones were then got wrong.
+
+    .venv/bin/python scripts/backtest.py --limit 10
+    .venv/bin/python scripts/backtest.py --tau-wrong 14 --weight-wrong 2
+
+It is one forward sweep: the state is carried, never rebuilt, and selecting at a
+boundary costs one O(1) score per deck word, so a year replays in seconds.
+
+Bear in mind the history was shaped by whatever selector ran at the time — a
+word never offered has no answers to be judged by. Compare configs against each
+other on the same history rather than reading the numbers as absolutes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Sequence
+
+from alias_table import AliasCycleError
+from build_today import (
+    DEFAULT_CONFIG,
+    ScoreConfig,
+    filter_items,
+    iter_items,
+    load_aliases,
+    load_rows,
+    load_vocab_files,
+    parse_modes,
+    tau_right_for,
+)
+from score_state import ScoreState
+from score_sweep import deck_tags
+
+
+@dataclass
+class BacktestReport:
+    events: int = 0
+    sessions: int = 0
+    # (score just before the answer, answer was wrong), for every answer replayed.
+    predictions: list[tuple[float, bool]] = field(default_factory=list)
+    # Per boundary: when it fell and the ids the selector would have picked.
+    selections: list[tuple[datetime, list[str]]] = field(default_factory=list)
+    # Deck words answered in the session after a boundary, counting each word once
+    # per session by its first answer there.
+    answered: int = 0
+    answered_wrong: int = 0
+    picked_answered: int = 0
+    picked_wrong: int = 0
+
+    def auc(self) -> float | None:
+        """P(a wrong answer's score > a right answer's score), ties counting half."""
+        wrong = sum(1 for _, is_wrong in self.predictions if is_wrong)
+        right = len(self.predictions) - wrong
+        if not wrong or not right:
+            return None
+        # Mann-Whitney: sum the ranks of the wrong answers, averaging tied ranks.
+        ordered = sorted(self.predictions, key=lambda entry: entry[0])
+        rank_sum = 0.0
+        index = 0
+        while index < len(ordered):
+            end = index
+            while end + 1 < len(ordered) and ordered[end + 1][0] == ordered[index][0]:
+                end += 1
+            average_rank = (index + end) / 2 + 1
+            rank_sum += average_rank * sum(1 for _, is_wrong in ordered[index : end + 1] if is_wrong)
+            index = end + 1
+        return (rank_sum - wrong * (wrong + 1) / 2) / (wrong * right)
+
+    def summary(self) -> dict[str, float | int | None]:
+        return {
+            "events": self.events,
+            "sessions": self.sessions,
+            "auc": self.auc(),
+            # Of the words that went wrong next session, how many had been picked.
+            "recall": self.picked_wrong / self.answered_wrong if self.answered_wrong else None,
+            # Of the picked words that came up next session, how many went wrong.
+            "precision": self.picked_wrong / self.picked_answered if self.picked_answered else None,
+            "base_rate": self.answered_wrong / self.answered if self.answered else None,
+        }
+
+
+def backtest(
+    events: Iterable[tuple[datetime, str, str, bool]],
+    deck: dict[str, set[str]],
+    config: ScoreConfig = DEFAULT_CONFIG,
+    modes: Sequence[str] = ("en-tr",),
+    limit: int = 30,
+    session_gap: timedelta = timedelta(hours=1),
+) -> BacktestReport:
+    """Replay `events` (sorted, canonical, as event_stream returns them) once.
+
+    A new session starts when the gap since the previous answer exceeds
+    `session_gap`. Selection ranks the words in `deck` by their best score over
+    `modes`, as build_today.py does; prediction covers every answer in `modes`.
+    """
+    taus = {word_id: tau_right_for(tags, config) for word_id, tags in deck.items()}
+    states: dict[tuple[str, str], ScoreState] = {}
+    empty = ScoreState()
+    report = BacktestReport()
+    wanted_modes = set(modes)
+
+    picked: set[str] = set()
+    seen_this_session: set[str] = set()
+    previous: datetime | None = None
+
+    for timestamp, word_id, mode, correct in events:
+        if mode not in wanted_modes:
+            continue
+        tau_right_days = taus.get(word_id, config.tau_right_default_days)
+
+        if previous is None or timestamp - previous > session_gap:
+            report.sessions += 1
+            ranked = sorted(
+                (
+                    (
+                        max(
+                            states.get((deck_word, m), empty).score(timestamp, config, taus[deck_word])[2]
+                            for m in modes
+                        ),
+                        deck_word,
+                    )
+                    for deck_word in deck
+                ),
+                key=lambda entry: (-entry[0], entry[1]),
+            )
+            picked = {deck_word for _, deck_word in ranked[: max(0, limit)]}
+            report.selections.append((timestamp, sorted(picked)))
+            seen_this_session = set()
+        previous = timestamp
+
+        state = states.get((word_id, mode))
+        before = (state or empty).score(timestamp, config, tau_right_days)[2]
+        report.predictions.append((before, not correct))
+        report.events += 1
+
+        if word_id in deck and word_id not in seen_this_session:
+            seen_this_session.add(word_id)
+            report.answered += 1
+            report.answered_wrong += not correct
+            if word_id in picked:
+                report.picked_answered += 1
+                report.picked_wrong += not correct
+
+        if state is None:
+            state = states[(word_id, mode)] = ScoreState()
+        state.fold(timestamp, correct, config.tau_wrong_days, tau_right_days)
+
+    return report
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay the history and score past practice-set selection.")
+    parser.add_argument(
+        "--results",
+        default=os.environ.get("RESULTS_SOURCE", "").strip(),
+        help="CSV/JSON source path or URL (or RESULTS_SOURCE env); Supabase when configured.",
+    )
+    parser.add_argument("--mode", default="en-tr", help="en-tr, tr-en, or both (default: en-tr).")
+    parser.add_argument("--limit", type=int, default=30, help="Practice-set size (default: 30).")
+    parser.add_argument("--include-tag", action="append", default=[], help="Only items with this tag.")
+    parser.add_argument("--exclude-tag", action="append", default=[], help="Drop items with this tag.")
+    parser.add_argument(
+        "--session-gap-hours",
+        type=float,
+        default=1.0,
+        help="A pause longer than this starts a new session (default: 1).",
+    )
+    parser.add_argument("--tau-wrong", type=float, default=DEFAULT_CONFIG.tau_wrong_days)
+    parser.add_argument(
+        "--tau-right-scale",
+        type=float,
+        default=1.0,
+        help="Multiply every right-answer tau by this (default: 1).",
+    )
+    parser.add_argument("--weight-wrong", type=float, default=DEFAULT_CONFIG.weight_wrong)
+    parser.add_argument("--weight-right", type=float, default=DEFAULT_CONFIG.weight_right)
+    parser.add_argument("--novelty-bonus", type=float, default=DEFAULT_CONFIG.novelty_bonus)
+    parser.add_argument("--out", help="Also write the summary and every selection to this JSON file.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    # Imported here: event_store builds on build_today, which this CLI loads first.
+    from event_store import EventStore
+
+    args = parse_args()
+    modes = parse_modes(args.mode)
+    if modes is None:
+        print("ERROR: --mode must be en-tr, tr-en, or both")
+        return 2
+    config = ScoreConfig(
+        tau_wrong_days=args.tau_wrong,
+        tau_right_default_days=DEFAULT_CONFIG.tau_right_default_days * args.tau_right_scale,
+        tau_right_by_freq={
+            tag: tau * args.tau_right_scale for tag, tau in DEFAULT_CONFIG.tau_right_by_freq.items()
+        },
+        weight_wrong=args.weight_wrong,
+        weight_right=args.weight_right,
+        novelty_bonus=args.novelty_bonus,
+    )
+
+    rows = load_rows(args)
+    if rows is None:
+        return 2
+    try:
+        aliases = load_aliases()
+    except AliasCycleError as exc:
+        print(f"ERROR: {exc}")
+        return 1
+    events = EventStore.from_rows(rows, aliases)
+    items = filter_items(
+        list(iter_items(load_vocab_files())),
+        set(args.include_tag or []),
+        set(args.exclude_tag or []),
+    )
+    deck = deck_tags(items, aliases)
+
+    report = backtest(
+        events,
+        deck,
+        config,
+        modes,
+        args.limit,
+        timedelta(hours=args.session_gap_hours),
+    )
+    summary = report.summary()
+
+    def show(value: float | None) -> str:
+        return "n/a" if value is None else f"{value:.3f}"
+
+    print(f"Replayed {summary['events']} answers in {summary['sessions']} sessions over {len(deck)} words")
+    print(f"  AUC, score before an answer vs. it going wrong: {show(summary['auc'])}")
+    print(f"  wrong answers that had been picked (recall):    {show(summary['recall'])}")
+    print(f"  picked words then answered wrong (precision):   {show(summary['precision'])}")
+    print(f"  any word answered wrong (base rate):            {show(summary['base_rate'])}")
+
+    if args.out:
+        payload = {
+            "summary": summary,
+            "selections": [
+                {"at": at.isoformat(), "ids": ids} for at, ids in report.selections
+            ],
+        }
+        Path(args.out).write_text(json.dumps(payload, ensure_ascii=True, indent=2), encoding="utf-8")
+        print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
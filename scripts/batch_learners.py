@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""Score a whole group of learners at once, one report each, on every core.
+
+results is multi-user behind row-level security: each app secret reads only
+its own user's answers (current_app_user() in the policies). build_today.py
+scores the one history its secret resolves to; this takes a list of learners
+and scores each in a process pool:
+
+    .venv/bin/python scripts/batch_learners.py resources/learners.json \\
+        --out-dir resources/learner_reports --mode both --each-tag-prefix unit-
+
+The learners file is a JSON list. Each entry has a "name", which names the
+report (<out-dir>/<name>.json), and one history:
+
+    [
+      {"name": "ayse", "secret_file": "resources/access_keys/learners/ayse.txt"},
+      {"name": "mert", "secret": "..."},
+      {"name": "archive", "results": ["exports/2025.csv.gz", "exports/2026.ndjson"]}
+    ]
+
+"secret"/"secret_file" read that user's rows from the configured Supabase
+project; "results" takes one or more files or URLs, merged as repeated
+--results are. An entry may add its own "include"/"exclude" tags, applied on
+top of every filter, for a learner working through a different unit. Keep the
+file under resources/access_keys/ if it holds secrets.
+
+The deck, its TagIndex, the alias map and the deck-wide taus are built once,
+here, and handed to each worker as it starts rather than with every learner;
+a worker then only reads and scores histories. Reports have run_batch's
+shape (one top --limit per filter, plain --include-tag/--exclude-tag giving
+a single "practice" set), plus the learner's whole score table. Nothing is
+tagged. All learners are scored against the same `now`, so the reports of
+one run compare.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Iterable
+
+from alias_table import AliasCycleError
+from build_today import (
+    SUPABASE_ANON_PATH,
+    SUPABASE_URL_PATH,
+    iter_items,
+    load_aliases,
+    load_filter_specs,
+    load_results_supabase,
+    load_vocab_files,
+    locate_source,
+    parse_modes,
+    rank_sets,
+    read_api_key,
+    score_canonicals,
+)
+from event_store import EventStore
+from results_stream import iter_records, merge_records
+from score_state import deck_taus
+from tag_index import TagIndex
+
+# A report name is a file name; nothing that could climb out of --out-dir.
+LEARNER_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]*")
+
+
+@dataclass
+class SharedDeck:
+    """What every learner is scored against; pickled once per worker, not per learner."""
+
+    aliases: dict[str, str]
+    taus: dict[str, float]
+    index: TagIndex
+    specs: list[dict[str, Any]]
+    modes: tuple[str, ...]
+    limit: int
+    engine: str
+    now: datetime
+    out_dir: Path
+    # (url, anon key); each learner brings their own secret.
+    supabase: tuple[str, str] | None = None
+
+
+# Set in each worker by share_deck, the pool's initializer.
+_deck: SharedDeck | None = None
+
+
+def share_deck(deck: SharedDeck) -> None:
+    global _deck
+    _deck = deck
+
+
+def load_learners(path: str) -> list[dict[str, Any]] | None:
+    """The learners file, checked and with secret files read; None (after saying why) if unusable."""
+    try:
+        raw = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as exc:
+        print(f"ERROR: cannot read {path}: {exc}")
+        return None
+    if not isinstance(raw, list) or not all(isinstance(entry, dict) for entry in raw):
+        print('ERROR: the learners file must hold a list of {"name", ...} objects')
+        return None
+
+    learners: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    for entry in raw:
+        name = str(entry.get("name", "")).strip()
+        if not LEARNER_NAME.fullmatch(name):
+            print(f"ERROR: learner name {name!r} is not usable as a file name")
+            return None
+        if name in seen:
+            print(f"ERROR: learner {name} is listed twice")
+            return None
+        seen.add(name)
+        given = [key for key in ("secret", "secret_file", "results") if entry.get(key)]
+        if len(given) != 1:
+            print(f"ERROR: learner {name} needs exactly one of secret, secret_file or results")
+            return None
+        learner = {
+            "name": name,
+            "include": list(entry.get("include", []) or []),
+            "exclude": list(entry.get("exclude", []) or []),
+        }
+        if given == ["results"]:
+            results = entry["results"]
+            learner["results"] = [results] if isinstance(results, str) else [str(source) for source in results]
+        else:
+            secret = str(entry["secret"]).strip() if given == ["secret"] else read_api_key(Path(entry["secret_file"]))
+            if not secret:
+                print(f"ERROR: learner {name}: no secret in {entry['secret_file']}")
+                return None
+            learner["secret"] = secret
+        learners.append(learner)
+    return learners
+
+
+def learner_events(learner: dict[str, Any], deck: SharedDeck) -> EventStore:
+    """The learner's history as an EventStore, from their files or their Supabase rows."""
+    if "results" in learner:
+        streams = [iter_records(locate_source(source)[0]) for source in learner["results"]]
+        records = streams[0] if len(streams) == 1 else merge_records(streams)
+        return EventStore.from_records(records, deck.aliases)
+    if deck.supabase is None:
+        raise RuntimeError("Supabase is not configured; add the keys under resources/access_keys/")
+    return EventStore.from_rows(load_results_supabase(*deck.supabase, learner["secret"]), deck.aliases)
+
+
+def score_learner(learner: dict[str, Any]) -> dict[str, Any]:
+    """Score one learner in this worker and write their report; a summary (never the secret) back."""
+    deck = _deck
+    assert deck is not None, "share_deck has not run in this process"
+    name = learner["name"]
+    try:
+        events = learner_events(learner, deck)
+        scored = score_canonicals(events, deck.taus, deck.modes, deck.now, deck.engine)
+        if scored is None:
+            raise RuntimeError("--engine numpy needs NumPy (pip install numpy)")
+        specs = [
+            {
+                **spec,
+                "include": spec["include"] + learner["include"],
+                "exclude": spec["exclude"] + learner["exclude"],
+            }
+            for spec in deck.specs
+        ]
+        score_by_canonical = dict(scored)
+        report = {
+            "learner": name,
+            "generated_at": deck.now.isoformat(),
+            "mode": list(deck.modes),
+            "limit": deck.limit,
+            "events": len(events),
+            "sets": rank_sets(score_by_canonical, deck.index, specs, deck.aliases, deck.limit),
+            "table": {canonical_id: round(score, 6) for canonical_id, score in scored},
+        }
+        path = deck.out_dir / f"{name}.json"
+        path.write_text(json.dumps(report, ensure_ascii=True, indent=2) + "\n", encoding="utf-8")
+    except Exception as exc:
+        return {"name": name, "error": str(exc)}
+    return {"name": name, "events": len(events), "rows": events.rows, "path": str(path)}
+
+
+def score_learners(
+    learners: Iterable[dict[str, Any]],
+    deck: SharedDeck,
+    workers: int,
+) -> list[dict[str, Any]]:
+    """Every learner's summary, in the order given; one worker runs in-process."""
+    learners = list(learners)
+    deck.out_dir.mkdir(parents=True, exist_ok=True)
+    if workers <= 1 or len(learners) <= 1:
+        share_deck(deck)
+        return [score_learner(learner) for learner in learners]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(learners)),
+        initializer=share_deck,
+        initargs=(deck,),
+    ) as pool:
+        return list(pool.map(score_learner, learners))
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Score a list of learners in a process pool, one report each.")
+    parser.add_argument("learners", help="JSON list of learners (see the module docstring).")
+    parser.add_argument("--out-dir", required=True, help="Directory for the per-learner JSON reports.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes to score in (default: one per core; 1 scores in this process).",
+    )
+    parser.add_argument("--limit", type=int, default=int(os.environ.get("TODAY_LIMIT", "30")))
+    parser.add_argument("--mode", default=os.environ.get("TODAY_MODE", "en-tr"), help="en-tr, tr-en, or both.")
+    parser.add_argument("--engine", choices=("python", "numpy"), default=os.environ.get("SCORE_ENGINE", "python"))
+    parser.add_argument("--include-tag", action="append", default=[], help="Only items with this tag (repeatable).")
+    parser.add_argument("--exclude-tag", action="append", default=[], help="Drop items with this tag (repeatable).")
+    parser.add_argument("--filters", help="A JSON list of named filters, as build_today.py --filters takes.")
+    parser.add_argument(
+        "--each-tag-prefix",
+        action="append",
+        default=[],
+        help="One filter per tag in data/tags.json with this prefix (repeatable).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    modes = parse_modes(args.mode)
+    if modes is None:
+        print("ERROR: --mode must be en-tr, tr-en, or both")
+        return 2
+    specs = load_filter_specs(args)
+    if specs is None:
+        return 2
+    if not specs:
+        if args.filters or args.each_tag_prefix:
+            print("ERROR: no filters: --each-tag-prefix matched no tag in data/tags.json")
+            return 2
+        specs = [{"name": "practice", "include": list(args.include_tag), "exclude": list(args.exclude_tag)}]
+    learners = load_learners(args.learners)
+    if learners is None:
+        return 2
+    if not learners:
+        print("ERROR: the learners file lists nobody")
+        return 2
+
+    supabase = None
+    if any("secret" in learner for learner in learners):
+        url, anon = read_api_key(SUPABASE_URL_PATH), read_api_key(SUPABASE_ANON_PATH)
+        if not (url and anon):
+            print("ERROR: learners with a secret need the Supabase URL and anon key under resources/access_keys/")
+            return 2
+        supabase = (url, anon)
+
+    try:
+        aliases = load_aliases()
+    except AliasCycleError as exc:
+        print(f"ERROR: {exc}")
+        return 1
+    all_items = list(iter_items(load_vocab_files()))
+    deck = SharedDeck(
+        aliases=aliases,
+        taus=deck_taus(all_items, aliases),
+        index=TagIndex(all_items),
+        specs=specs,
+        modes=modes,
+        limit=args.limit,
+        engine=args.engine,
+        now=datetime.now(tz=UTC),
+        out_dir=Path(args.out_dir),
+        supabase=supabase,
+    )
+    summaries = score_learners(learners, deck, args.workers)
+
+    failed = 0
+    for summary in summaries:
+        if "error" in summary:
+            failed += 1
+            print(f"ERROR: learner {summary['name']}: {summary['error']}")
+        else:
+            print(f"  {summary['name']}: {summary['events']} events from {summary['rows']} rows -> {summary['path']}")
+    print(f"Scored {len(summaries) - failed} of {len(summaries)} learner(s) for {len(specs)} filter(s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""The whole content pipeline in one process: candidates -> web/data/.
+
+`make build` used to run four scripts, each starting an interpreter, parsing
+the JSON the previous one had just written with indent=2, and writing its own
+back out; dedupe_vocab --apply even rewrote reviewed.json in place. This runs
+the same four steps over one list held in memory:
+
+    rebuild_reviewed   approved candidates, sorted by id   (ParsedCache per file)
+    dedupe_vocab       aliases merged into their canonical items
+    validate_tags      every tag known to data/tags.json
+    export_quiz        quiz.json, tag_index.json and the flat aliases.json
+                       (and, with --shards, the per-unit shards)
+
+Each source is read once and only the final artifacts are written.
+data/vocab/reviewed.json is written only with --reviewed. `make build` asks for
+it, because build_today.py, the scoring service and stats_analysis.py read the
+merged deck from there. The output is byte for byte what the four scripts
+produce, and they still work on their own.
+
+Like each of those steps, the run is skipped when nothing it reads has changed
+since the last one (see build_manifest); --force runs it anyway.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from alias_table import AliasCycleError, flatten_aliases
+from build_manifest import BuildManifest, ParsedCache, scripts
+from dedupe_vocab import apply_aliases, load_aliases
+from export_quiz import (
+    ALIASES_PATH,
+    LEXICON_PATH,
+    OUT_PATH,
+    TAGS_PATH,
+    VOCAB_DIR,
+    deck_outputs,
+    load_tags,
+    quiz_entries,
+    write_deck,
+)
+from rebuild_reviewed import OUT_PATH as REVIEWED_PATH
+from rebuild_reviewed import candidate_files, load_candidates, parsed_cache
+from validate_tags import known_tags, tag_errors
+
+
+@dataclass
+class Deck:
+    """Everything the export needs, after the merge and before any writing."""
+
+    # reviewed.json's items: the approved candidates with aliases merged.
+    reviewed: list[dict[str, Any]]
+    # Per vocab file name, the items export_quiz reads from it.
+    files: dict[str, list[dict[str, Any]]]
+    tags: list[dict[str, Any]]
+    aliases: dict[str, str]
+
+    @property
+    def items(self) -> list[dict[str, Any]]:
+        items = [item for file_items in self.files.values() for item in file_items]
+        if items:
+            return items
+        # export_quiz's fallback for a checkout without data/vocab/.
+        return json.loads(LEXICON_PATH.read_text(encoding="utf-8")).get("items", [])
+
+
+def other_vocab_files() -> list[Path]:
+    """Hand-kept vocab files beside reviewed.json; export_quiz ships them too."""
+    return [path for path in sorted(VOCAB_DIR.glob("*.json")) if path.resolve() != REVIEWED_PATH.resolve()]
+
+
+def vocab_items(path: Path) -> list[dict[str, Any]]:
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(raw, dict):
+        return list(raw.get("items", []))
+    return list(raw) if isinstance(raw, list) else []
+
+
+def assemble(cache: ParsedCache | None = None) -> Deck:
+    aliases = load_aliases(ALIASES_PATH)
+    reviewed = load_candidates(cache)
+    apply_aliases(reviewed, aliases)
+    files = {path.name: vocab_items(path) for path in other_vocab_files()}
+    files[REVIEWED_PATH.name] = reviewed
+    # In the order export_quiz globs them.
+    files = dict(sorted(files.items()))
+    # Flattened so the app canonicalises with one lookup; a cycle stops the build.
+    return Deck(reviewed, files, load_tags(), flatten_aliases(aliases))
+
+
+def reviewed_json(deck: Deck) -> str:
+    # As dedupe_vocab --apply leaves it: rebuild_reviewed's payload, no final newline.
+    return json.dumps({"source": "reviewed", "items": deck.reviewed}, ensure_ascii=True, indent=2)
+
+
+def step_inputs() -> list[Path]:
+    return [
+        *candidate_files(),
+        *other_vocab_files(),
+        TAGS_PATH,
+        ALIASES_PATH,
+        LEXICON_PATH,
+        *scripts(
+            "build_deck.py",
+            "rebuild_reviewed.py",
+            "dedupe_vocab.py",
+            "alias_table.py",
+            "validate_tags.py",
+            "export_quiz.py",
+            "tag_index.py",
+        ),
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build web/data/ from the candidate files in one process.")
+    parser.add_argument(
+        "--reviewed",
+        action="store_true",
+        help="Also write data/vocab/reviewed.json, the merged deck the offline scoring scripts read.",
+    )
+    parser.add_argument("--force", action="store_true", help="Build even if no input changed.")
+    parser.add_argument(
+        "--readable",
+        action="store_true",
+        help="Write quiz.json indented, with tag names, instead of the compact form.",
+    )
+    parser.add_argument(
+        "--shards",
+        action="store_true",
+        help="Also write the deck as per-unit shards with a hashed manifest, under web/data/shards/.",
+    )
+    args = parser.parse_args()
+
+    def outputs() -> list[Path]:
+        # Shard names change with their content, so this is read again after writing.
+        return [*deck_outputs(args.shards), *([REVIEWED_PATH] if args.reviewed else [])]
+
+    manifest = BuildManifest()
+    options = {"readable": args.readable, "shards": args.shards}
+    if not args.force and manifest.up_to_date("build_deck", step_inputs(), outputs(), options):
+        print(f"{OUT_PATH} is up to date")
+        return 0
+
+    # --force re-parses every candidate file rather than trusting the cache.
+    cache = None if args.force else parsed_cache()
+    try:
+        deck = assemble(cache)
+    except AliasCycleError as exc:
+        print(f"Not built: {exc}")
+        return 1
+    known = known_tags()
+    errors = [error for name, items in deck.files.items() for error in tag_errors(name, items, known)]
+    if errors:
+        print("Tag validation failed:")
+        for line in errors:
+            print(line)
+        return 1
+
+    if args.reviewed:
+        text = reviewed_json(deck)
+        if not REVIEWED_PATH.exists() or REVIEWED_PATH.read_text(encoding="utf-8") != text:
+            REVIEWED_PATH.parent.mkdir(parents=True, exist_ok=True)
+            REVIEWED_PATH.write_text(text, encoding="utf-8")
+            print(f"Wrote {len(deck.reviewed)} items to {REVIEWED_PATH}")
+    quiz_items = quiz_entries(deck.items)
+    tag_index = write_deck(quiz_items, deck.tags, deck.aliases, args.readable, args.shards)
+    manifest.record("build_deck", step_inputs(), outputs(), options)
+
+    print(
+        f"Built {len(quiz_items)} items from {len(candidate_files())} candidate files "
+        f"({len(candidate_files()) if cache is None else cache.misses} parsed), {len(deck.aliases)} aliases, "
+        f"postings for {len(tag_index['postings'])} tags"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
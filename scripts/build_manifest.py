@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Skip a build step whose inputs have not changed since it last ran.
+
+`make build` ran all four steps in full every time, each re-reading every
+candidate file and rewriting its outputs, even when nothing under data/ had
+changed. The manifest records a content hash of each file a step read, and of
+each file the pipeline last wrote. A step is up to date when every input
+hashes as it did when the step last finished and every output is still what
+the pipeline left there; anything else (an edit, a deleted or hand-changed
+output, an edit to the step's own script) runs it again.
+
+Hashes are taken after the step finishes. That is what lets dedupe_vocab
+--apply, which rewrites reviewed.json in place, count as up to date on the
+file it left behind, and rebuild_reviewed count as up to date on reviewed.json
+although dedupe has since changed it.
+
+ParsedCache keeps each candidate file's approved, cleaned items, keyed by the
+file's hash and the parsing script's, so an edit to one sweep file re-parses
+that file only, and an edit to the parser re-parses them all.
+
+Both live under resources/build_cache/ and can be deleted at any time; every
+step also takes --force.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Iterable
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = ROOT / "resources" / "build_cache"
+MANIFEST_PATH = CACHE_DIR / "manifest.json"
+PARSED_DIR = CACHE_DIR / "candidates"
+SCRIPTS_DIR = ROOT / "scripts"
+
+
+def content_hash(path: Path) -> str:
+    """sha256 of the file's bytes; "" for a file that does not exist."""
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return ""
+
+
+def _key(path: Path) -> str:
+    path = path.resolve()
+    return str(path.relative_to(ROOT)) if path.is_relative_to(ROOT) else str(path)
+
+
+def scripts(*names: str) -> list[Path]:
+    """A step's own code, as inputs: a changed script must not be skipped past."""
+    return [SCRIPTS_DIR / name for name in names]
+
+
+class BuildManifest:
+    """Per-step input hashes and the last-written hash of every output."""
+
+    def __init__(self, path: Path = MANIFEST_PATH) -> None:
+        self.path = path
+        self.steps: dict[str, dict[str, str]] = {}
+        self.outputs: dict[str, str] = {}
+        # Per step, the flags that change what it writes (export_quiz --readable).
+        self.options: dict[str, dict[str, Any]] = {}
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return
+        if isinstance(raw, dict):
+            self.steps = dict(raw.get("steps", {}) or {})
+            self.outputs = dict(raw.get("outputs", {}) or {})
+            self.options = dict(raw.get("options", {}) or {})
+
+    def up_to_date(
+        self,
+        step: str,
+        inputs: Iterable[Path],
+        outputs: Iterable[Path] = (),
+        options: dict[str, Any] | None = None,
+    ) -> bool:
+        recorded = self.steps.get(step)
+        if recorded is None:
+            return False
+        if self.options.get(step, {}) != (options or {}):
+            return False  # same inputs, asked for a different output
+        inputs = list(inputs)
+        if sorted(recorded) != sorted(_key(path) for path in inputs):
+            return False  # a file added or removed
+        if any(recorded[_key(path)] != content_hash(path) for path in inputs):
+            return False
+        return all(self.outputs.get(_key(path)) == content_hash(path) != "" for path in outputs)
+
+    def record(
+        self,
+        step: str,
+        inputs: Iterable[Path],
+        outputs: Iterable[Path] = (),
+        options: dict[str, Any] | None = None,
+    ) -> None:
+        """Note a finished step, hashing its files as they now are, and save."""
+        self.steps[step] = {_key(path): content_hash(path) for path in inputs}
+        if options:
+            self.options[step] = dict(options)
+        else:
+            self.options.pop(step, None)
+        for path in outputs:
+            self.outputs[_key(path)] = content_hash(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(
+            json.dumps(
+                {"steps": self.steps, "outputs": self.outputs, "options": self.options},
+                indent=2,
+                sort_keys=True,
+            )
+            + "\n",
+            encoding="utf-8",
+        )
+
+
+class ParsedCache:
+    """One JSON file per source file, holding what parsing it produced last time.
+
+    `parser` identifies the code that did the parsing (rebuild_reviewed passes
+    its own hash); an entry written by other code is a miss, so a change to
+    the cleaning rules never reuses items cleaned the old way.
+    """
+
+    def __init__(self, directory: Path = PARSED_DIR, parser: str = "") -> None:
+        self.directory = directory
+        self.parser = parser
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: Path, digest: str) -> Any | None:
+        try:
+            raw = json.loads((self.directory / f"{path.name}.json").read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            raw = None
+        if not isinstance(raw, dict) or raw.get("hash") != digest or raw.get("parser", "") != self.parser:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return raw.get("value")
+
+    def put(self, path: Path, digest: str, value: Any) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{path.name}.json").write_text(
+            json.dumps({"hash": digest, "parser": self.parser, "value": value}, ensure_ascii=False, separators=(",", ":")),
+            encoding="utf-8",
+        )
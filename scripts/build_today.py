@@ -1,19 +1,21 @@
 #!/usr/bin/env python3
 
 import argparse
-import csv
-import io
 import json
 import math
 import os
 import sys
-import urllib.request
-from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+from urllib.parse import parse_qsl, quote, urlencode, urlparse, urlunparse
 from collections import Counter
 from dataclasses import dataclass
 from datetime import UTC, datetime
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
+
+from alias_table import AliasCycleError, flatten_aliases
+from results_stream import RECORD_FIELDS, Record, iter_records, merge_records, records_from_rows
+from supabase_client import SupabaseClient, in_filters
+from tag_index import TagIndex
 
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -26,7 +28,11 @@ DEFAULT_SHEETS_PARAM = "?format=csv"
 SUPABASE_URL_PATH = ROOT / "resources" / "access_keys" / "supabase_url.txt"
 SUPABASE_ANON_PATH = ROOT / "resources" / "access_keys" / "supabase_anon_key.txt"
 SUPABASE_SECRET_PATH = ROOT / "resources" / "access_keys" / "supabase_app_secret.txt"
-SUPABASE_PAGE = 1000  # PostgREST caps a single response at 1000 rows
+# The --results value that stands for the configured Supabase project.
+SUPABASE_SOURCE = "supabase"
+# A tag filter is pushed into the Supabase read while its ids fit this many
+# in.(...) requests; a filter that keeps most of the deck reads everything.
+PUSHDOWN_MAX_CHUNKS = 4
 
 
 @dataclass(frozen=True)
@@ -60,8 +66,11 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--results",
-        default=os.environ.get("RESULTS_SOURCE", "").strip(),
-        help="CSV/JSON source path or URL (or RESULTS_SOURCE env).",
+        action="append",
+        help=(
+            "CSV/JSON/NDJSON source path or URL (or RESULTS_SOURCE env). Repeat to merge several "
+            "in time order; 'supabase' names the configured project."
+        ),
     )
     parser.add_argument(
         "--limit",
@@ -96,7 +105,84 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Print top items but do not modify vocab files.",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--mirror",
+        default=os.environ.get("RESULTS_MIRROR", "").strip(),
+        help=(
+            "Read Supabase through a local SQLite mirror that fetches only what is "
+            "new (e.g. resources/results_mirror.sqlite); works offline from the last sync."
+        ),
+    )
+    parser.add_argument(
+        "--parallel-read",
+        action="store_true",
+        help="Fetch a full Supabase read as concurrent pages rather than one keyset page at a time.",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("python", "numpy"),
+        default=os.environ.get("SCORE_ENGINE", "python"),
+        help="Scoring engine: the per-event Python loop, or NumPy over all keys at once.",
+    )
+    parser.add_argument(
+        "--state",
+        default=os.environ.get("SCORE_STATE", "").strip(),
+        help=(
+            "Score from a persisted per-word state file, folding in only events "
+            "newer than the ones it holds (e.g. resources/score_state.json)."
+        ),
+    )
+    parser.add_argument(
+        "--rebuild-state",
+        action="store_true",
+        help="With --state, discard the stored state and fold the whole history again.",
+    )
+    parser.add_argument(
+        "--snapshot",
+        default=os.environ.get("RESULTS_SNAPSHOT", "").strip(),
+        help=(
+            "Score from a results snapshot (see compact_results.py) plus the rows "
+            "answered after its cutoff, e.g. resources/results_snapshot.json."
+        ),
+    )
+    parser.add_argument(
+        "--aggregates",
+        action="store_true",
+        help=(
+            "Score from per-word aggregates folded by Supabase "
+            "(supabase/score_aggregates.sql) instead of reading every event."
+        ),
+    )
+    parser.add_argument(
+        "--filters",
+        help=(
+            'Batch mode: a JSON list of {"name", "include": [...], "exclude": [...]} '
+            "filters, each getting its own top --limit in one report. Never tags."
+        ),
+    )
+    parser.add_argument(
+        "--each-tag-prefix",
+        action="append",
+        default=[],
+        help="Batch mode: one filter per tag in data/tags.json with this prefix, e.g. unit- (repeatable).",
+    )
+    parser.add_argument(
+        "--report",
+        help="Where batch mode writes its JSON report (required with --filters/--each-tag-prefix).",
+    )
+    parser.add_argument(
+        "--at",
+        action="append",
+        default=[],
+        help=(
+            "Print the practice set predicted for this future time instead of "
+            "tagging (repeatable; ISO timestamp, UTC unless it carries an offset)."
+        ),
+    )
+    args = parser.parse_args()
+    if not args.results:
+        args.results = [source for source in [os.environ.get("RESULTS_SOURCE", "").strip()] if source]
+    return args
 
 
 def resolve_results_source(value: str) -> str:
@@ -133,13 +219,6 @@ def build_results_csv_url(endpoint: str, api_key: str = "") -> str:
     return urlunparse(updated)
 
 
-def load_text(source: str) -> str:
-    if source.startswith("http://") or source.startswith("https://"):
-        with urllib.request.urlopen(source, timeout=30) as response:
-            return response.read().decode("utf-8", errors="replace")
-    return Path(source).read_text(encoding="utf-8")
-
-
 def load_aliases() -> dict[str, str]:
     if not ALIASES_PATH.exists():
         return {}
@@ -151,19 +230,26 @@ def load_aliases() -> dict[str, str]:
         canonical = str(canonical_id).strip()
         if alias and canonical:
             cleaned[alias] = canonical
-    return cleaned
+    return flatten_aliases(cleaned)
 
 
 def canonicalize(word_id: str, aliases: dict[str, str]) -> str:
-    current = word_id
-    seen: set[str] = set()
-    while current in aliases and current not in seen:
-        seen.add(current)
-        current = aliases[current]
-    return current
+    """One lookup: `aliases` is flat, as load_aliases returns it (see alias_table)."""
+    return aliases.get(word_id, word_id)
 
 
-def parse_timestamp(value: str) -> datetime | None:
+# Tried in order; fromisoformat (None) covers Supabase and the sheet's own
+# "2026-01-05 07:30:00", the rest are what a spreadsheet's locale may produce.
+TIMESTAMP_FORMATS = (
+    None,
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+)
+
+
+def _timestamp_text(value: Any) -> str | None:
     if not value:
         return None
     raw = str(value).strip()
@@ -171,26 +257,66 @@ def parse_timestamp(value: str) -> datetime | None:
         return None
     if raw.endswith("Z"):
         raw = raw[:-1] + "+00:00"
-    for fmt in (
-        None,
-        "%Y-%m-%d %H:%M:%S",
-        "%Y-%m-%d %H:%M:%S.%f",
-        "%m/%d/%Y %H:%M:%S",
-        "%m/%d/%Y %H:%M",
-    ):
-        try:
-            if fmt:
-                parsed = datetime.strptime(raw, fmt)
-            else:
-                parsed = datetime.fromisoformat(raw)
-            if parsed.tzinfo is None:
-                parsed = parsed.replace(tzinfo=UTC)
-            return parsed.astimezone(UTC)
-        except ValueError:
-            continue
+    return raw
+
+
+def _parse_as(raw: str, fmt: str | None) -> datetime | None:
+    try:
+        parsed = datetime.strptime(raw, fmt) if fmt else datetime.fromisoformat(raw)
+    except ValueError:
+        return None
+    return _as_utc(parsed)
+
+
+def _as_utc(parsed: datetime) -> datetime:
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=UTC)
+    return parsed.astimezone(UTC)
+
+
+def parse_timestamp(value: str) -> datetime | None:
+    if isinstance(value, datetime):
+        return _as_utc(value)
+    raw = _timestamp_text(value)
+    if raw is None:
+        return None
+    for fmt in TIMESTAMP_FORMATS:
+        parsed = _parse_as(raw, fmt)
+        if parsed is not None:
+            return parsed
     return None
 
 
+class TimestampParser:
+    """parse_timestamp for one source, trying the format that last worked first.
+
+    A source writes every row in one format, so after the first row a parse is
+    a single attempt rather than a walk through the formats that fail. The
+    formats never accept the same text with different meanings, so the order
+    they are tried in does not change the result.
+    """
+
+    def __init__(self) -> None:
+        self.format: str | None = None
+
+    def __call__(self, value: Any) -> datetime | None:
+        if isinstance(value, datetime):
+            return _as_utc(value)  # already parsed, by merge_records
+        raw = _timestamp_text(value)
+        if raw is None:
+            return None
+        parsed = _parse_as(raw, self.format)
+        if parsed is not None:
+            return parsed
+        for fmt in TIMESTAMP_FORMATS:
+            if fmt != self.format:
+                parsed = _parse_as(raw, fmt)
+                if parsed is not None:
+                    self.format = fmt
+                    return parsed
+        return None
+
+
 def parse_correct(value: str) -> bool | None:
     if value is None:
         return None
@@ -212,68 +338,67 @@ def supabase_config() -> tuple[str, str, str] | None:
     return None
 
 
-def load_results_supabase(url: str, anon: str, secret: str) -> list[dict[str, Any]]:
-    """Read every event, paging because PostgREST returns at most 1000 rows.
+def load_results_supabase(
+    url: str,
+    anon: str,
+    secret: str,
+    since: str | None = None,
+    parallel: bool = False,
+    word_ids: Iterable[str] | None = None,
+    modes: Iterable[str] | None = None,
+) -> list[dict[str, Any]]:
+    """Read every event, in keyset pages because PostgREST returns at most 1000 rows.
+
+    With `since`, only events answered at or after it. The bound is inclusive,
+    unlike the app's incremental read, so a caller resuming from a watermark
+    sees the events sharing its timestamp and can tell which it already holds.
+    `parallel` fetches the pages concurrently instead (see supabase_client).
+
+    `word_ids` and `modes` push a filter into the query, so only those answers
+    cross the wire; a long id list is read in several chunks. They match the
+    stored values exactly, where the other readers trim them first: the app
+    writes ids and modes trimmed, so the two only differ for hand-edited rows.
 
     Returned dicts use the "timestamp" key so the rest of the pipeline
     (event_stream, duplicate_rows) is unchanged.
     """
-    endpoint = (
-        url.rstrip("/")
-        + "/rest/v1/results?select=answered_at,word_id,mode,correct&order=answered_at.asc"
-    )
-    rows: list[dict[str, Any]] = []
-    offset = 0
-    while True:
-        request = urllib.request.Request(
-            endpoint,
-            headers={
-                "apikey": anon,
-                "Authorization": f"Bearer {anon}",
-                "x-app-secret": secret,
-                "Range-Unit": "items",
-                "Range": f"{offset}-{offset + SUPABASE_PAGE - 1}",
-            },
-        )
-        with urllib.request.urlopen(request, timeout=60) as response:
-            batch = json.loads(response.read().decode("utf-8"))
-        if not batch:
-            break
-        rows.extend(
-            {
-                "timestamp": item.get("answered_at", ""),
-                "word_id": item.get("word_id", ""),
-                "mode": item.get("mode", ""),
-                "correct": item.get("correct"),
-            }
-            for item in batch
-        )
-        if len(batch) < SUPABASE_PAGE:
-            break
-        offset += len(batch)
-    return rows
+    filters = [f"answered_at=gte.{quote(since)}"] if since else []
+    filters += in_filters("mode", sorted(set(modes))) if modes is not None else []
+    chunks: list[str | None] = [None]
+    if word_ids is not None:
+        chunks = list(in_filters("word_id", sorted(set(word_ids))))
+    batch: list[dict[str, Any]] = []
+    with SupabaseClient(url, anon, secret) as client:
+        for chunk in chunks:
+            batch += client.read_all(
+                "results",
+                "id,answered_at,word_id,mode,correct",
+                order=("answered_at", "id"),
+                filters=[*filters, chunk] if chunk else filters,
+                parallel=parallel,
+            )
+    if len(chunks) > 1:
+        # Each chunk comes back in order; the merged list has to be put back in it.
+        earliest = datetime.min.replace(tzinfo=UTC)
+        batch.sort(key=lambda item: (parse_timestamp(item.get("answered_at", "")) or earliest, item.get("id", 0)))
+    return [
+        {
+            "timestamp": item.get("answered_at", ""),
+            "word_id": item.get("word_id", ""),
+            "mode": item.get("mode", ""),
+            "correct": item.get("correct"),
+        }
+        for item in batch
+    ]
 
 
 def load_results(source: str) -> list[dict[str, Any]]:
-    text = load_text(source)
-    stripped = text.lstrip()
-    if not stripped:
-        return []
-
-    if stripped[0] in "[{":
-        payload = json.loads(text)
-        if isinstance(payload, dict):
-            if "rows" in payload and isinstance(payload["rows"], list):
-                return payload["rows"]
-            if "items" in payload and isinstance(payload["items"], list):
-                return payload["items"]
-            return []
-        if isinstance(payload, list):
-            return payload
-        return []
-
-    reader = csv.DictReader(io.StringIO(text))
-    return [row for row in reader]
+    """Every row of a CSV/JSON/NDJSON export, gzipped or not, as dicts of the four columns.
+
+    For callers that need the rows themselves; a plain run streams the same
+    records into an EventStore without building these (see results_stream).
+    """
+    return [dict(zip(RECORD_FIELDS, record)) for record in iter_records(source)]
 
 
 def event_stream(
@@ -403,84 +528,264 @@ def filter_items(
     include_tags: set[str],
     exclude_tags: set[str],
 ) -> list[dict[str, Any]]:
-    filtered: list[dict[str, Any]] = []
-    for item in items:
-        tags = set(item.get("tags", []) or [])
-        if include_tags and not include_tags.issubset(tags):
-            continue
-        if exclude_tags and tags.intersection(exclude_tags):
-            continue
-        filtered.append(item)
-    return filtered
+    """Items carrying every include tag and no exclude tag.
 
+    A one-off filter; anything filtering the same deck repeatedly should keep
+    the TagIndex and call its filter() instead.
+    """
+    return TagIndex(items).filter(include_tags, exclude_tags)
 
-def run_with_rows(rows: list[dict[str, Any]], args: argparse.Namespace) -> int:
-    aliases = load_aliases()
-    events = event_stream(rows, aliases)
-    events_by_key: dict[tuple[str, str], list[tuple[datetime, bool]]] = {}
-    for timestamp, word_id, mode, correct in events:
-        events_by_key.setdefault((word_id, mode), []).append((timestamp, correct))
 
-    vocab_files = load_vocab_files()
-    items = filter_items(
-        list(iter_items(vocab_files)),
-        set(args.include_tag or []),
-        set(args.exclude_tag or []),
+def tau_right_for(tags: Iterable[str], config: ScoreConfig = DEFAULT_CONFIG) -> float:
+    """The right-answer tau for an item: the shortest of its frequency bands."""
+    return min(
+        (config.tau_right_by_freq[tag] for tag in tags if tag in config.tau_right_by_freq),
+        default=config.tau_right_default_days,
     )
-    item_ids = {str(item.get("id", "")).strip() for item in items if item.get("id")}
 
-    mode_value = str(args.mode or "").strip().lower()
+
+def parse_modes(value: str) -> tuple[str, ...] | None:
+    mode_value = str(value or "").strip().lower()
     if mode_value == "both":
-        modes = ("tr-en", "en-tr")
-    elif mode_value in {"tr-en", "en-tr"}:
-        modes = (mode_value,)
-    else:
-        print("ERROR: --mode must be en-tr, tr-en, or both")
-        return 2
+        return ("tr-en", "en-tr")
+    if mode_value in {"tr-en", "en-tr"}:
+        return (mode_value,)
+    return None
 
-    now = datetime.now(tz=UTC)
-    scored: list[tuple[str, float]] = []
-    score_by_canonical: dict[str, float] = {}
-    canonical_to_items: dict[str, list[dict[str, Any]]] = {}
 
+def group_by_canonical(
+    items: Iterable[dict[str, Any]],
+    aliases: dict[str, str],
+) -> dict[str, list[dict[str, Any]]]:
+    canonical_to_items: dict[str, list[dict[str, Any]]] = {}
     for item in items:
         word_id = str(item.get("id", "")).strip()
         if not word_id:
             continue
         canonical_id = canonicalize(word_id, aliases)
         canonical_to_items.setdefault(canonical_id, []).append(item)
+    return canonical_to_items
 
-    for canonical_id, grouped_items in canonical_to_items.items():
-        representative = next(
-            (entry for entry in grouped_items if str(entry.get("id", "")).strip() == canonical_id),
-            grouped_items[0],
-        )
-        tags = set(representative.get("tags", []) or [])
-        tau_right_days = min(
-            (DEFAULT_CONFIG.tau_right_by_freq[tag] for tag in tags if tag in DEFAULT_CONFIG.tau_right_by_freq),
-            default=DEFAULT_CONFIG.tau_right_default_days,
-        )
 
+def pushdown_ids(items: Iterable[dict[str, Any]], aliases: dict[str, str]) -> list[str]:
+    """Every word_id whose answers count for `items`: their canonical ids and all aliases onto them."""
+    canonical_ids = set(group_by_canonical(items, aliases))
+    return sorted(canonical_ids | {alias for alias, canonical in aliases.items() if canonical in canonical_ids})
+
+
+def representative(canonical_id: str, grouped_items: list[dict[str, Any]]) -> dict[str, Any]:
+    """The item that speaks for a canonical id: itself if present, else the first alias."""
+    return next(
+        (entry for entry in grouped_items if str(entry.get("id", "")).strip() == canonical_id),
+        grouped_items[0],
+    )
+
+
+def score_canonicals(
+    events: Any,
+    taus: dict[str, float],
+    modes: tuple[str, ...],
+    now: datetime,
+    engine: str = "python",
+) -> list[tuple[str, float]] | None:
+    """(canonical id, best score over `modes`) for every id in `taus`.
+
+    `events` is an EventStore. Returns None when the NumPy engine is asked for
+    but NumPy is missing; the caller reports it.
+    """
+    if engine == "numpy":
+        try:
+            from score_kernel import score_events
+        except ImportError:
+            return None
+        table = score_events(events, taus, now, DEFAULT_CONFIG)
+        unseen = compute_scores([], now, DEFAULT_CONFIG, DEFAULT_CONFIG.tau_right_default_days)
+        events_by_key = {}
+    else:
+        table = None
+        events_by_key = events.by_key()
+
+    scored: list[tuple[str, float]] = []
+    for canonical_id, tau_right_days in taus.items():
         scores = []
         for mode in modes:
             key = (canonical_id, mode)
-            mode_events = events_by_key.get(key, [])
-            wrong, right, score = compute_scores(
-                mode_events,
-                now,
-                DEFAULT_CONFIG,
-                tau_right_days,
-            )
+            if table is not None:
+                wrong, right, score = table.get(key, unseen)
+            else:
+                mode_events = events_by_key.get(key, [])
+                wrong, right, score = compute_scores(
+                    mode_events,
+                    now,
+                    DEFAULT_CONFIG,
+                    tau_right_days,
+                )
             scores.append(score)
         final_score = max(scores) if scores else 0.0
         scored.append((canonical_id, final_score))
-        score_by_canonical[canonical_id] = final_score
+    return scored
+
+
+def run_with_events(events: Any, aliases: dict[str, str], args: argparse.Namespace) -> int:
+    """Rank and select from an EventStore (see load_events)."""
+    vocab_files = load_vocab_files()
+    items = filter_items(
+        list(iter_items(vocab_files)),
+        set(args.include_tag or []),
+        set(args.exclude_tag or []),
+    )
+
+    modes = parse_modes(args.mode)
+    if modes is None:
+        print("ERROR: --mode must be en-tr, tr-en, or both")
+        return 2
+
+    now = datetime.now(tz=UTC)
+    grouped = group_by_canonical(items, aliases)
+    taus = {
+        canonical_id: tau_right_for(set(representative(canonical_id, grouped_items).get("tags", []) or []))
+        for canonical_id, grouped_items in grouped.items()
+    }
+
+    scored = score_canonicals(events, taus, modes, now, args.engine)
+    if scored is None:
+        print("ERROR: --engine numpy needs NumPy (pip install numpy)")
+        return 2
+
+    print(f"Loaded {events.rows} results rows")
+    return apply_selection(scored, vocab_files, items, aliases, args)
+
+
+def load_filter_specs(args: argparse.Namespace) -> list[dict[str, Any]] | None:
+    """The filters --filters and --each-tag-prefix ask for, each with a name.
+
+    --include-tag/--exclude-tag apply on top of every one. None means a spec
+    file was unreadable; the error is printed.
+    """
+    base_include = list(args.include_tag or [])
+    base_exclude = list(args.exclude_tag or [])
+    specs: list[dict[str, Any]] = []
+    if args.filters:
+        try:
+            raw = json.loads(Path(args.filters).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as exc:
+            print(f"ERROR: cannot read --filters {args.filters}: {exc}")
+            return None
+        if not isinstance(raw, list) or not all(isinstance(entry, dict) for entry in raw):
+            print('ERROR: --filters must hold a list of {"name", "include", "exclude"} objects')
+            return None
+        for index, entry in enumerate(raw):
+            include = list(entry.get("include", []) or [])
+            exclude = list(entry.get("exclude", []) or [])
+            specs.append(
+                {
+                    "name": str(entry.get("name") or "+".join(include) or f"filter-{index + 1}"),
+                    "include": base_include + include,
+                    "exclude": base_exclude + exclude,
+                }
+            )
+    if args.each_tag_prefix:
+        tags = json.loads(TAGS_PATH.read_text(encoding="utf-8")).get("tags", [])
+        for tag in tags:
+            tag_id = str(tag.get("id", ""))
+            if any(tag_id.startswith(prefix) for prefix in args.each_tag_prefix):
+                specs.append(
+                    {"name": tag_id, "include": base_include + [tag_id], "exclude": base_exclude}
+                )
+    return specs
+
+
+def run_batch(rows: list[dict[str, Any]], args: argparse.Namespace) -> int:
+    """Every filtered top-N from one scoring pass, as a JSON report.
+
+    Each canonical word is scored once over the whole deck and every filter
+    reads the shared table. The right-answer tau therefore comes from the
+    deck-wide representative, as with --state, rather than from the filtered
+    one; the two only differ for an alias whose frequency tags disagree with
+    its canonical's.
+    """
+    # Imported here: event_store and score_state build on this module.
+    from event_store import EventStore
+    from score_state import deck_taus
+
+    modes = parse_modes(args.mode)
+    if modes is None:
+        print("ERROR: --mode must be en-tr, tr-en, or both")
+        return 2
+    if not args.report:
+        print("ERROR: batch mode needs --report PATH for the JSON report")
+        return 2
+    specs = load_filter_specs(args)
+    if specs is None:
+        return 2
+    if not specs:
+        print("ERROR: no filters: --each-tag-prefix matched no tag in data/tags.json")
+        return 2
+
+    aliases = load_aliases()
+    events = EventStore.from_rows(rows, aliases)
+    all_items = list(iter_items(load_vocab_files()))
+    now = datetime.now(tz=UTC)
+    scored = score_canonicals(events, deck_taus(all_items, aliases), modes, now, args.engine)
+    if scored is None:
+        print("ERROR: --engine numpy needs NumPy (pip install numpy)")
+        return 2
+    score_by_canonical = dict(scored)
+
+    sets = rank_sets(score_by_canonical, TagIndex(all_items), specs, aliases, args.limit)
+    report = {
+        "generated_at": now.isoformat(),
+        "mode": list(modes),
+        "limit": args.limit,
+        "events": len(events),
+        "sets": sets,
+    }
+    Path(args.report).write_text(json.dumps(report, ensure_ascii=True, indent=2) + "\n", encoding="utf-8")
+    print(f"Scored {len(scored)} words once for {len(sets)} filter(s); wrote {args.report}")
+    return 0
+
 
-    scored.sort(key=lambda entry: (-entry[1], entry[0]))
+def rank_sets(
+    score_by_canonical: dict[str, float],
+    index: TagIndex,
+    specs: list[dict[str, Any]],
+    aliases: dict[str, str],
+    limit: int,
+) -> list[dict[str, Any]]:
+    """Each spec's top `limit` from one shared score table, as the report lists them."""
+    sets = []
+    for spec in specs:
+        items = index.filter(spec["include"], spec["exclude"])
+        ranked = sorted(
+            ((canonical_id, score_by_canonical[canonical_id]) for canonical_id in group_by_canonical(items, aliases)),
+            key=lambda entry: (-entry[1], entry[0]),
+        )
+        top = ranked[: max(0, limit)]
+        sets.append(
+            {
+                **spec,
+                "candidates": len(ranked),
+                "ids": [word_id for word_id, _ in top],
+                "scores": [round(score, 6) for _, score in top],
+            }
+        )
+    return sets
+
+
+def apply_selection(
+    scored: list[tuple[str, float]],
+    vocab_files: list[tuple[Path, dict[str, Any]]],
+    items: list[dict[str, Any]],
+    aliases: dict[str, str],
+    args: argparse.Namespace,
+) -> int:
+    """Pick the top --limit and, unless --dry-run, write the tag into the vocab files."""
+    item_ids = {str(item.get("id", "")).strip() for item in items if item.get("id")}
+    score_by_canonical = dict(scored)
+    scored = sorted(scored, key=lambda entry: (-entry[1], entry[0]))
     top_items = scored[: max(0, args.limit)]
     today_ids = {word_id for word_id, _ in top_items}
 
-    print(f"Loaded {len(rows)} results rows")
     print(f"Scored {len(scored)} items, selecting {len(today_ids)} for tag '{args.today_tag}'")
 
     if args.dry_run:
@@ -516,43 +821,266 @@ def run_with_rows(rows: list[dict[str, Any]], args: argparse.Namespace) -> int:
     return 0
 
 
+def load_rows(
+    args: argparse.Namespace,
+    since: str | None = None,
+    word_ids: list[str] | None = None,
+    modes: tuple[str, ...] | None = None,
+) -> list[dict[str, Any]] | None:
+    """Result rows from Supabase, or from --results; None (after saying why) on failure.
 
-def main() -> int:
-    args = parse_args()
-
-    supabase = supabase_config()
-    if supabase and not args.results:
+    `since` asks Supabase for events at or after that answered_at only, and
+    `word_ids`/`modes` for those ids and modes only (see load_results_supabase).
+    The other sources have no way to express them and always return everything.
+    Several --results are merged into one list in time order (see merged_records).
+    """
+    sources = results_sources(args)
+    if len(sources) > 1:
+        records = merged_records(args, sources, since, word_ids, modes)
+        if records is None:
+            return None
         try:
-            rows = load_results_supabase(*supabase)
+            return [dict(zip(RECORD_FIELDS, record)) for record in records]
         except Exception as exc:
-            print(f"ERROR: Failed to load results from Supabase: {exc}")
-            return 2
-        print(f"Loaded {len(rows)} event(s) from Supabase")
-        return run_with_rows(rows, args)
+            print(f"ERROR: Failed to load results: {exc}")
+            return None
+    if not reads_file_source(args):
+        return load_remote_rows(args, since, word_ids, modes)
+
+    located = file_source(args)
+    if located is None:
+        return None
+    results_source, api_key = located
+    try:
+        rows = load_results(results_source)
+    except Exception as exc:
+        print(f"ERROR: Failed to load results: {exc}")
+        return None
+    if not rows:
+        warn_no_rows(api_key)
+    return rows
+
+
+def load_remote_rows(
+    args: argparse.Namespace,
+    since: str | None = None,
+    word_ids: list[str] | None = None,
+    modes: tuple[str, ...] | None = None,
+) -> list[dict[str, Any]] | None:
+    """Rows from the --mirror if given, else from Supabase; None (after saying why) on failure."""
+    mirror = getattr(args, "mirror", "")
+    if mirror:
+        # Imported here: results_mirror builds on this module.
+        from results_mirror import load_mirrored_rows
+
+        return load_mirrored_rows(mirror, since=since)
 
-    results_source = resolve_results_source(args.results)
+    supabase = supabase_config()
+    if supabase is None:
+        print("ERROR: --results supabase needs the keys under resources/access_keys/")
+        return None
+    try:
+        rows = load_results_supabase(
+            *supabase,
+            since=since,
+            parallel=getattr(args, "parallel_read", False),
+            word_ids=word_ids,
+            modes=modes,
+        )
+    except Exception as exc:
+        print(f"ERROR: Failed to load results from Supabase: {exc}")
+        return None
+    print(f"Loaded {len(rows)} event(s) from Supabase")
+    return rows
+
+
+def results_sources(args: argparse.Namespace) -> list[str]:
+    """--results as a list. build_today's parser appends; the other scripts' give one string."""
+    value = getattr(args, "results", None)
+    if isinstance(value, str):
+        return [value] if value else []
+    return [source for source in value or [] if source]
+
+
+def reads_file_source(args: argparse.Namespace) -> bool:
+    """Whether load_rows would read --results/RESULTS_SOURCE rather than Supabase or the mirror."""
+    sources = results_sources(args)
+    if sources:
+        return sources != [SUPABASE_SOURCE]
+    return not (getattr(args, "mirror", "") or supabase_config())
+
+
+def file_source(args: argparse.Namespace) -> tuple[str, str | None] | None:
+    """(path or URL to read, API key) for --results/RESULTS_SOURCE; None (after saying why) if unset."""
+    sources = results_sources(args)
+    results_source = resolve_results_source(sources[0] if sources else "")
     if not results_source:
         print("ERROR: --results or RESULTS_SOURCE is required")
         print("Hint: add the URL to resources/access_keys/google_sheets.txt")
-        return 2
+        return None
+    return locate_source(results_source)
+
 
+def locate_source(results_source: str) -> tuple[str, str | None]:
+    """(path or URL to read, API key): a sheet URL gets the key and CSV format added."""
     api_key = read_api_key(RESULTS_API_KEY_PATH)
     if results_source.startswith("http://") or results_source.startswith("https://"):
         results_source = build_results_csv_url(results_source, api_key)
         if not api_key:
             print(f"WARNING: No API key found in {RESULTS_API_KEY_PATH}.")
+    return results_source, api_key
+
+
+def merged_records(
+    args: argparse.Namespace,
+    sources: list[str],
+    since: str | None = None,
+    word_ids: list[str] | None = None,
+    modes: tuple[str, ...] | None = None,
+) -> Iterator[Record] | None:
+    """Every --results source as one record stream in time order; None (after saying why) on failure.
+
+    "supabase" names the configured project (or --mirror). Files and URLs are
+    streamed; Supabase comes back as one ordered read. An answer present in
+    two sources, as the sheet archive and its migrated copy in Supabase are,
+    counts once: merge_records drops the second copy, so EventStore only
+    reports repeats within one source.
+    """
+    streams: list[Iterable[Record]] = []
+    for source in sources:
+        if source == SUPABASE_SOURCE:
+            rows = load_remote_rows(args, since, word_ids, modes)
+            if rows is None:
+                return None
+            streams.append(records_from_rows(rows))
+        else:
+            streams.append(iter_records(locate_source(source)[0]))
+    return merge_records(streams)
+
+
+def warn_no_rows(api_key: str | None) -> None:
+    print("WARNING: No rows returned from results source.")
+    if api_key:
+        print("Check that the API key is valid and has access.")
+
 
+def load_events(
+    args: argparse.Namespace,
+    aliases: dict[str, str],
+    word_ids: list[str] | None = None,
+    modes: tuple[str, ...] | None = None,
+) -> Any | None:
+    """The results as an EventStore; None (after saying why) on failure.
+
+    A file or URL source is streamed straight into the store and never held
+    as rows, so memory grows with the compact store only. Supabase and the
+    mirror go through load_rows, with `word_ids`/`modes` pushed down.
+    """
+    # Imported here: event_store builds on this module.
+    from event_store import EventStore
+
+    if not reads_file_source(args):
+        rows = load_rows(args, word_ids=word_ids, modes=modes)
+        return None if rows is None else EventStore.from_rows(rows, aliases)
+
+    sources = results_sources(args)
+    if len(sources) > 1:
+        records = merged_records(args, sources, word_ids=word_ids, modes=modes)
+        if records is None:
+            return None
+        try:
+            return EventStore.from_records(records, aliases)
+        except Exception as exc:
+            print(f"ERROR: Failed to load results: {exc}")
+            return None
+
+    located = file_source(args)
+    if located is None:
+        return None
+    results_source, api_key = located
     try:
-        rows = load_results(results_source)
+        events = EventStore.from_records(iter_records(results_source), aliases)
     except Exception as exc:
         print(f"ERROR: Failed to load results: {exc}")
+        return None
+    if not events.rows:
+        warn_no_rows(api_key)
+    return events
+
+
+def pushdown(args: argparse.Namespace) -> tuple[list[str] | None, tuple[str, ...] | None]:
+    """The word ids and modes a plain run needs answers for, to filter the read by.
+
+    Ids only when a tag filter narrows the deck to at most PUSHDOWN_MAX_CHUNKS
+    requests' worth; past that one unfiltered read is cheaper. Answers to ids
+    outside the filter never reach a score, so dropping them changes nothing.
+    """
+    modes = parse_modes(args.mode)
+    if not (args.include_tag or args.exclude_tag):
+        return None, modes
+    items = filter_items(
+        list(iter_items(load_vocab_files())),
+        set(args.include_tag or []),
+        set(args.exclude_tag or []),
+    )
+    word_ids = pushdown_ids(items, load_aliases())
+    if len(in_filters("word_id", word_ids)) > PUSHDOWN_MAX_CHUNKS:
+        return None, modes
+    return word_ids, modes
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        return run(args)
+    except AliasCycleError as exc:
+        print(f"ERROR: {exc}")
+        return 1
+
+
+def run(args: argparse.Namespace) -> int:
+    """Every mode reads data/aliases.json through load_aliases; main reports a cycle in it."""
+    if args.at:
+        times = [parse_timestamp(value) for value in args.at]
+        if None in times:
+            print("ERROR: --at takes an ISO timestamp such as 2026-10-18T08:00")
+            return 2
+        # Imported here: practice_schedule builds on this module.
+        from practice_schedule import run_schedule
+
+        return run_schedule(args, times)
+
+    if args.filters or args.each_tag_prefix:
+        rows = load_rows(args)
+        if rows is None:
+            return 2
+        return run_batch(rows, args)
+
+    if args.snapshot:
+        # Imported here: compact_results builds on this module.
+        from compact_results import run_with_snapshot
+
+        return run_with_snapshot(args)
+
+    if args.aggregates:
+        # Imported here: score_aggregates builds on this module.
+        from score_aggregates import run_with_aggregates
+
+        return run_with_aggregates(args)
+
+    if args.state:
+        # Imported here: score_state builds on this module.
+        from score_state import run_with_state
+
+        return run_with_state(args)
+
+    aliases = load_aliases()
+    word_ids, modes = (None, None) if reads_file_source(args) else pushdown(args)
+    events = load_events(args, aliases, word_ids=word_ids, modes=modes)
+    if events is None:
         return 2
-    if not rows:
-        print("WARNING: No rows returned from results source.")
-        if api_key:
-            print("Check that the API key is valid and has access.")
+    return run_with_events(events, aliases, args)
 
-    return run_with_rows(rows, args)
 
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Write many rows to a PostgREST table: batched by size, concurrent, resumable.
+
+The migration posted fixed 500-row batches and the audio upload fixed 20-clip
+ones, one after another on a fresh connection each, and stopped dead on the
+first error. A row count is a poor proxy for a request body (a results row is
+about 150 bytes, a clip 10 KB or more), and an interrupted run could only
+start over.
+
+BulkWriter packs rows into batches of up to `batch_bytes` of JSON, keeps
+`concurrency` POSTs in flight over SupabaseClient's pooled connections, and
+retries a batch the server turns away for now (429, 5xx, a dropped
+connection) after an exponential backoff, honouring Retry-After. A 413 splits
+the batch in two instead. Any other error stops the run.
+
+With a checkpoint file it resumes: each committed batch appends its row keys
+(client_event_id, word) as one JSON line, and the next run skips those rows.
+Batches finish out of order, so this records exactly what landed rather than a
+high-water mark. Both tables take duplicates as no-ops (ignore-duplicates,
+merge-duplicates), so a batch that landed just before a crash, unrecorded, is
+merely sent again. The file is removed once a run completes.
+
+    with SupabaseClient(url, anon, secret, connections=4) as client:
+        writer = BulkWriter(client, "results", on_conflict="client_event_id", checkpoint=path)
+        writer.write(records, key=lambda record: record["client_event_id"])
+"""
+
+from __future__ import annotations
+
+import email.utils
+import json
+import random
+import time
+import urllib.error
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+from supabase_client import STALE_CONNECTION, SupabaseClient
+
+BATCH_BYTES = 512 * 1024
+CONCURRENCY = 4
+ATTEMPTS = 6
+BACKOFF_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+
+
+def retryable(exc: BaseException) -> bool:
+    """Whether the same batch may succeed if sent again later."""
+    if isinstance(exc, urllib.error.HTTPError):
+        return exc.code == 429 or exc.code >= 500
+    return isinstance(exc, (*STALE_CONNECTION, TimeoutError, ConnectionError))
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Seconds the server asked to wait, from a Retry-After header, if any."""
+    value = exc.headers.get("Retry-After") if isinstance(exc, urllib.error.HTTPError) and exc.headers else None
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, (email.utils.parsedate_to_datetime(value) - datetime.now(tz=UTC)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class BulkResult:
+    sent: int = 0
+    skipped: int = 0
+    batches: int = 0
+    retries: int = 0
+
+
+class Checkpoint:
+    """The keys of rows already committed, as an append-only file of JSON lines."""
+
+    def __init__(self, path: Path | None, target: str) -> None:
+        self.path = path
+        self.target = target
+        self.done: set[str] = set()
+        self._handle = None
+        if path is None or not path.exists():
+            return
+        lines = path.read_text(encoding="utf-8").splitlines()
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except json.JSONDecodeError:
+            header = {}
+        if header.get("target") != target:
+            print(f"WARNING: {path} was written for {header.get('target')!r}, not {target!r}; starting over")
+            path.unlink()
+            return
+        for line in lines[1:]:
+            try:
+                self.done.update(json.loads(line))
+            except json.JSONDecodeError:
+                pass  # a line cut short by the interruption; those rows go again
+
+    def record(self, keys: list[str]) -> None:
+        if self.path is None:
+            return
+        if self._handle is None:
+            fresh = not self.path.exists()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = self.path.open("a", encoding="utf-8")
+            if fresh:
+                self._handle.write(json.dumps({"target": self.target}) + "\n")
+        self._handle.write(json.dumps(keys, ensure_ascii=False) + "\n")
+        self._handle.flush()
+        self.done.update(keys)
+
+    def close(self, finished: bool) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        if finished and self.path is not None and self.path.exists():
+            self.path.unlink()
+
+
+class BulkWriter:
+    """POST rows to one table in byte-budgeted batches, several at a time."""
+
+    def __init__(
+        self,
+        client: SupabaseClient,
+        table: str,
+        on_conflict: str,
+        resolution: str = "ignore-duplicates",
+        checkpoint: Path | None = None,
+        batch_bytes: int = BATCH_BYTES,
+        concurrency: int = CONCURRENCY,
+        attempts: int = ATTEMPTS,
+        backoff: float = BACKOFF_SECONDS,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.client = client
+        self.path = f"/rest/v1/{table}?on_conflict={on_conflict}"
+        self.headers = {
+            "Content-Type": "application/json",
+            "Prefer": f"resolution={resolution},return=minimal",
+        }
+        self.checkpoint = Checkpoint(checkpoint, f"{client.host}{self.path}")
+        self.batch_bytes = batch_bytes
+        # More POSTs in flight than pooled connections would only queue.
+        self.concurrency = max(1, min(concurrency, client.connections))
+        self.attempts = attempts
+        self.backoff = backoff
+        self.sleep = sleep
+        self.result = BulkResult()
+
+    @property
+    def done(self) -> set[str]:
+        """Keys a previous, interrupted run already committed."""
+        return self.checkpoint.done
+
+    def batches(self, records: Iterable[Any], key: Callable[[Any], str]) -> Iterator[tuple[list[str], list[bytes]]]:
+        """(keys, encoded rows) per batch, each at most batch_bytes unless one row alone is larger."""
+        keys: list[str] = []
+        encoded: list[bytes] = []
+        size = 2  # the brackets
+        for record in records:
+            record_key = key(record)
+            if record_key in self.done:
+                self.result.skipped += 1
+                continue
+            body = json.dumps(record, ensure_ascii=False).encode("utf-8")
+            if encoded and size + 1 + len(body) > self.batch_bytes:
+                yield keys, encoded
+                keys, encoded, size = [], [], 2
+            size += len(body) + (1 if encoded else 0)
+            keys.append(record_key)
+            encoded.append(body)
+        if encoded:
+            yield keys, encoded
+
+    def post(self, encoded: list[bytes]) -> int:
+        """Send one batch until it lands, returning how many retries that took. Raises once it cannot."""
+        retries = 0
+        for attempt in range(1, self.attempts + 1):
+            try:
+                self.client.request("POST", self.path, self.headers, b"[" + b",".join(encoded) + b"]")
+                return retries
+            except urllib.error.HTTPError as exc:
+                if exc.code == 413 and len(encoded) > 1:
+                    # Too large for the gateway whatever the budget said: halve
+                    # it, and the budget for the batches still to come.
+                    self.batch_bytes = min(self.batch_bytes, max(1, sum(map(len, encoded)) // 2))
+                    middle = len(encoded) // 2
+                    return retries + self.post(encoded[:middle]) + self.post(encoded[middle:])
+                if not retryable(exc) or attempt == self.attempts:
+                    raise
+                delay = retry_after(exc)
+            except Exception as exc:
+                if not retryable(exc) or attempt == self.attempts:
+                    raise
+                delay = None
+            retries += 1
+            if delay is None:
+                delay = min(BACKOFF_MAX_SECONDS, self.backoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            self.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def write(
+        self,
+        records: Iterable[Any],
+        key: Callable[[Any], str],
+        progress: Callable[[BulkResult], None] | None = None,
+    ) -> BulkResult:
+        """Send every record not already checkpointed; `progress` hears after each batch.
+
+        At most twice `concurrency` batches are encoded ahead, so `records`
+        may be a generator over more data than fits in memory at once.
+        """
+        pending: dict[Future[int], list[str]] = {}
+        finished = False
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                try:
+                    for keys, encoded in self.batches(records, key):
+                        if len(pending) >= 2 * self.concurrency:
+                            self._collect(pending, wait(pending, return_when=FIRST_COMPLETED).done, progress)
+                        pending[pool.submit(self.post, encoded)] = keys
+                    while pending:
+                        self._collect(pending, wait(pending, return_when=FIRST_COMPLETED).done, progress)
+                except BaseException:
+                    for future in pending:
+                        future.cancel()
+                    raise
+            finished = True
+        finally:
+            # After a failure the batches already in flight have finished by
+            # now; the ones that landed still go into the checkpoint.
+            self._collect(pending, [future for future in pending if future.done()], None, raising=False)
+            self.checkpoint.close(finished)
+        return self.result
+
+    def _collect(
+        self,
+        pending: dict[Future[int], list[str]],
+        completed: Iterable[Future[int]],
+        progress: Callable[[BulkResult], None] | None,
+        raising: bool = True,
+    ) -> None:
+        for future in list(completed):
+            keys = pending.pop(future)
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is not None:
+                if raising:
+                    raise error
+                continue
+            self.result.retries += future.result()
+            self.result.sent += len(keys)
+            self.result.batches += 1
+            self.checkpoint.record(keys)
+            if progress is not None:
+                progress(self.result)
@@ -33,6 +33,8 @@ import urllib.parse
 import urllib.request
 from pathlib import Path
 
+from export_quiz import load_quiz
+
 ROOT = Path(__file__).resolve().parents[1]
 QUIZ = ROOT / "web" / "data" / "quiz.json"
 UA = {"User-Agent": "kielikone-pron/1.0 (personal vocabulary deck; github valpola/kielikone)"}
@@ -95,7 +97,7 @@ def main() -> int:
     ap.add_argument("--delay", type=float, default=0.4)
     args = ap.parse_args()
 
-    items = json.loads(QUIZ.read_text(encoding="utf-8"))["items"]
+    items = load_quiz(QUIZ)["items"]
     if args.unit:
         items = [i for i in items if args.unit in i.get("tags", [])]
     if args.words:
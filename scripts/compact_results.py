@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""Compact the results log into a score snapshot plus the tail after it.
+
+Decay composes exactly, so everything answered up to a cutoff reduces to the
+five numbers ScoreState holds per (word, mode). `compact` folds them into
+resources/results_snapshot.json; after that a reader needs only the snapshot
+and the rows answered after the cutoff, however many years lie before it:
+
+    .venv/bin/python scripts/compact_results.py compact --keep-days 30
+    .venv/bin/python scripts/compact_results.py verify
+    .venv/bin/python scripts/build_today.py --snapshot resources/results_snapshot.json
+
+Two choices keep it lossless rather than merely close:
+
+- States are keyed on the raw word id as recorded, not the canonical one, so
+  an alias added or removed later still resolves correctly. Ids that an alias
+  joins are merged on read by decaying each to the later of their last
+  answers and adding, which is the same sum rounded differently.
+- The right-answer tau depends on a word's frequency tags, which can change,
+  so every tau in ScoreConfig gets its own right sum.
+
+`verify` reads the full log, scores every (word, mode) both ways and compares;
+on a log already replaced by its tail there is nothing to compare against.
+Keys that one raw id feeds come out equal to the bit; merged ones within
+rounding. It also catches rows answered before the cutoff that arrived after
+the compaction, which the snapshot cannot hold: compact again when it does.
+
+For a file source, `--tail-out` writes the rows after the cutoff as a CSV that
+can replace the log. Supabase rows are never deleted; there the snapshot lets
+each read ask only for answered_at >= cutoff.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+from dataclasses import dataclass, field, replace
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable
+
+from alias_table import AliasCycleError
+from build_today import (
+    DEFAULT_CONFIG,
+    ROOT,
+    SUPABASE_SOURCE,
+    ScoreConfig,
+    apply_selection,
+    compute_scores,
+    decay,
+    filter_items,
+    group_by_canonical,
+    iter_items,
+    load_aliases,
+    load_rows,
+    load_vocab_files,
+    parse_modes,
+    parse_timestamp,
+    reads_file_source,
+    results_sources,
+)
+from score_state import ScoreState, deck_taus, rank_states
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT_PATH = ROOT / "resources" / "results_snapshot.json"
+# Merged keys are the same sum in a different order; anything past this is a bug.
+TOLERANCE = 1e-9
+
+
+def config_taus(config: ScoreConfig = DEFAULT_CONFIG) -> list[float]:
+    """Every right-answer tau the config can give a word."""
+    return sorted({config.tau_right_default_days, *config.tau_right_by_freq.values()})
+
+
+@dataclass
+class SnapshotEntry:
+    """One raw (word, mode) history up to the cutoff: a ScoreState per tau column."""
+
+    states: list[ScoreState]
+
+    def to_json(self) -> list[Any]:
+        first = self.states[0]
+        return [
+            first.wrong,
+            first.last_wrong.isoformat() if first.last_wrong else None,
+            [state.right for state in self.states],
+            first.last_right.isoformat() if first.last_right else None,
+            first.total,
+        ]
+
+    @classmethod
+    def from_json(cls, raw: list[Any]) -> SnapshotEntry:
+        wrong, last_wrong, rights, last_right, total = raw
+        return cls(
+            [ScoreState.from_json([wrong, last_wrong, right, last_right, total]) for right in rights]
+        )
+
+
+@dataclass
+class Snapshot:
+    cutoff: datetime
+    tau_wrong_days: float
+    taus: list[float]
+    # Raw rows at or before the cutoff, repeats included, as the log held them.
+    rows: int = 0
+    events: int = 0
+    entries: dict[tuple[str, str], SnapshotEntry] = field(default_factory=dict)
+
+    @classmethod
+    def build(
+        cls,
+        rows: Iterable[dict[str, Any]],
+        cutoff: datetime,
+        config: ScoreConfig = DEFAULT_CONFIG,
+    ) -> Snapshot:
+        # Imported here: event_store builds on build_today, which loads first.
+        from event_store import EventStore
+
+        rows = list(rows)
+        snapshot = cls(cutoff, config.tau_wrong_days, config_taus(config))
+        snapshot.rows = sum(1 for row in rows if _at_or_before(row, cutoff))
+        # No aliases: the raw ids are the keys (see the module docstring).
+        for timestamp, word_id, mode, correct in EventStore.from_rows(rows, {}):
+            if timestamp > cutoff:
+                break
+            entry = snapshot.entries.get((word_id, mode))
+            if entry is None:
+                entry = snapshot.entries[(word_id, mode)] = SnapshotEntry([ScoreState() for _ in snapshot.taus])
+            for state, tau_right_days in zip(entry.states, snapshot.taus):
+                state.fold(timestamp, correct, config.tau_wrong_days, tau_right_days)
+            snapshot.events += 1
+        return snapshot
+
+    @classmethod
+    def load(cls, path: Path) -> Snapshot:
+        raw = json.loads(Path(path).read_text(encoding="utf-8"))
+        if not isinstance(raw, dict) or raw.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} results snapshot")
+        snapshot = cls(
+            datetime.fromisoformat(raw["cutoff"]),
+            float(raw["tau_wrong_days"]),
+            [float(tau) for tau in raw["taus"]],
+            int(raw.get("rows", 0)),
+            int(raw.get("events", 0)),
+        )
+        for word_id, mode, *entry in raw.get("states", []):
+            snapshot.entries[(word_id, mode)] = SnapshotEntry.from_json(entry)
+        return snapshot
+
+    def save(self, path: Path) -> None:
+        payload = {
+            "version": SNAPSHOT_VERSION,
+            "cutoff": self.cutoff.isoformat(),
+            "tau_wrong_days": self.tau_wrong_days,
+            "taus": self.taus,
+            "rows": self.rows,
+            "events": self.events,
+            "states": [[word_id, mode, *entry.to_json()] for (word_id, mode), entry in sorted(self.entries.items())],
+        }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload, ensure_ascii=True), encoding="utf-8")
+
+    def check_config(self, config: ScoreConfig, taus: Iterable[float]) -> None:
+        """Raise ValueError unless the snapshot holds sums for `config` and every tau in `taus`."""
+        if config.tau_wrong_days != self.tau_wrong_days:
+            raise ValueError(
+                f"snapshot was folded with tau_wrong_days={self.tau_wrong_days}, "
+                f"not {config.tau_wrong_days}; compact again"
+            )
+        missing = sorted(set(taus) - set(self.taus))
+        if missing:
+            raise ValueError(f"snapshot holds no right sums for tau {missing}; compact again")
+
+    def index(self, aliases: dict[str, str]) -> dict[tuple[str, str], list[SnapshotEntry]]:
+        """(canonical id, mode) -> the raw entries that feed it under `aliases`."""
+        grouped: dict[tuple[str, str], list[SnapshotEntry]] = {}
+        for (word_id, mode), entry in sorted(self.entries.items()):
+            grouped.setdefault((aliases.get(word_id, word_id), mode), []).append(entry)
+        return grouped
+
+    def state(self, entries: list[SnapshotEntry], tau_right_days: float, config: ScoreConfig) -> ScoreState:
+        """A fresh ScoreState for one canonical key, merging its raw entries if several."""
+        column = self.taus.index(tau_right_days)
+        if not entries:
+            return ScoreState()
+        if len(entries) == 1:
+            return replace(entries[0].states[column])
+        parts = [entry.states[column] for entry in entries]
+        merged = ScoreState(total=sum(part.total for part in parts))
+        merged.last_wrong = max((part.last_wrong for part in parts if part.last_wrong), default=None)
+        merged.last_right = max((part.last_right for part in parts if part.last_right), default=None)
+        for part in parts:
+            if part.last_wrong:
+                merged.wrong += decay(part.wrong, part.last_wrong, merged.last_wrong, config.tau_wrong_days)
+            if part.last_right:
+                merged.right += decay(part.right, part.last_right, merged.last_right, tau_right_days)
+        return merged
+
+    def states_for(
+        self,
+        aliases: dict[str, str],
+        taus: dict[str, float],
+        config: ScoreConfig = DEFAULT_CONFIG,
+    ) -> dict[tuple[str, str], ScoreState]:
+        """ScoreState per (canonical id, mode) as of the cutoff, each with its word's tau."""
+        self.check_config(config, taus.values())
+        return {
+            (canonical_id, mode): self.state(entries, taus.get(canonical_id, config.tau_right_default_days), config)
+            for (canonical_id, mode), entries in self.index(aliases).items()
+        }
+
+    def tail(self, rows: Iterable[dict[str, Any]]) -> tuple[list[dict[str, Any]], int]:
+        """(rows answered after the cutoff, how many rows at or before it were read)."""
+        after: list[dict[str, Any]] = []
+        before = 0
+        for row in rows:
+            timestamp = parse_timestamp(row.get("timestamp", ""))
+            if timestamp is None:
+                continue
+            if timestamp > self.cutoff:
+                after.append(row)
+            else:
+                before += 1
+        return after, before
+
+    def changed_below(self, before: int) -> bool:
+        """Whether `before` rows read up to the cutoff mean rows were added or removed there.
+
+        None at all is the log replaced by its --tail-out, which the snapshot
+        stands in for; a back-dated row in that tail still counts.
+        """
+        return before not in (0, self.rows)
+
+
+def _at_or_before(row: dict[str, Any], cutoff: datetime) -> bool:
+    timestamp = parse_timestamp(row.get("timestamp", ""))
+    return timestamp is not None and timestamp <= cutoff
+
+
+def resume(
+    state: ScoreState,
+    history: Iterable[tuple[datetime, bool]],
+    config: ScoreConfig,
+    tau_right_days: float,
+) -> ScoreState:
+    """Fold the tail of one key's history onto its snapshot state, in place."""
+    for timestamp, correct in history:
+        state.fold(timestamp, correct, config.tau_wrong_days, tau_right_days)
+    return state
+
+
+def fold_tail(
+    snapshot: Snapshot,
+    rows: list[dict[str, Any]],
+    aliases: dict[str, str],
+    taus: dict[str, float],
+    config: ScoreConfig = DEFAULT_CONFIG,
+) -> dict[tuple[str, str], ScoreState]:
+    """Snapshot states with the rows after the cutoff folded on top."""
+    # Imported here: event_store builds on build_today, which loads first.
+    from event_store import EventStore
+
+    states = snapshot.states_for(aliases, taus, config)
+    tail, _ = snapshot.tail(rows)
+    for (word_id, mode), history in EventStore.from_rows(tail, aliases).by_key().items():
+        tau_right_days = taus.get(word_id, config.tau_right_default_days)
+        resume(states.setdefault((word_id, mode), ScoreState()), history, config, tau_right_days)
+    return states
+
+
+def run_with_snapshot(args: argparse.Namespace) -> int:
+    """build_today.py --snapshot: rank from the snapshot plus the rows after its cutoff."""
+    modes = parse_modes(args.mode)
+    if modes is None:
+        print("ERROR: --mode must be en-tr, tr-en, or both")
+        return 2
+    try:
+        snapshot = Snapshot.load(Path(args.snapshot))
+    except (OSError, ValueError, KeyError) as exc:
+        print(f"ERROR: Could not read the snapshot {args.snapshot}: {exc}")
+        return 2
+
+    aliases = load_aliases()
+    vocab_files = load_vocab_files()
+    all_items = list(iter_items(vocab_files))
+    taus = deck_taus(all_items, aliases)
+
+    # Supabase and the mirror are asked for the tail only; a file source is read
+    # whole and cut here.
+    rows = load_rows(args, since=snapshot.cutoff.isoformat())
+    if rows is None:
+        return 2
+    tail, before = snapshot.tail(rows)
+    # Only a log read whole can be counted below the cutoff: Supabase and the
+    # mirror return just the rows at or after it, which is `before` too.
+    whole = reads_file_source(args) and SUPABASE_SOURCE not in results_sources(args)
+    if whole and snapshot.changed_below(before):
+        print(
+            f"WARNING: the log holds {before} row(s) up to the cutoff, the snapshot {snapshot.rows}; "
+            "rows were added or removed below it. Run compact_results.py verify"
+        )
+    try:
+        states = fold_tail(snapshot, rows, aliases, taus)
+    except ValueError as exc:
+        print(f"ERROR: {exc}")
+        return 2
+    print(f"Snapshot to {snapshot.cutoff.isoformat()} ({snapshot.events} events) plus {len(tail)} row(s) after it")
+
+    items = filter_items(all_items, set(args.include_tag or []), set(args.exclude_tag or []))
+    scored = rank_states(states, taus, group_by_canonical(items, aliases), modes, datetime.now(tz=UTC))
+    return apply_selection(scored, vocab_files, items, aliases, args)
+
+
+def compare(
+    snapshot: Snapshot,
+    rows: list[dict[str, Any]],
+    aliases: dict[str, str],
+    taus: dict[str, float],
+    now: datetime,
+    config: ScoreConfig = DEFAULT_CONFIG,
+) -> tuple[int, int, float, list[tuple[str, str]]]:
+    """(keys equal to the bit, keys compared, worst difference, keys past TOLERANCE).
+
+    Every (canonical id, mode) in the deck or the log is scored from the full
+    log and from the snapshot plus tail.
+    """
+    # Imported here: event_store builds on build_today, which loads first.
+    from event_store import EventStore
+
+    full = EventStore.from_rows(rows, aliases).by_key()
+    resumed = fold_tail(snapshot, rows, aliases, taus, config)
+    keys = sorted({*full, *resumed, *((word_id, mode) for word_id in taus for mode in ("en-tr", "tr-en"))})
+    exact = 0
+    worst = 0.0
+    drifted: list[tuple[str, str]] = []
+    for key in keys:
+        tau_right_days = taus.get(key[0], config.tau_right_default_days)
+        expected = compute_scores(full.get(key, []), now, config, tau_right_days)
+        actual = resumed.get(key, ScoreState()).score(now, config, tau_right_days)
+        if actual == expected:
+            exact += 1
+            continue
+        delta = max(abs(a - b) for a, b in zip(actual, expected))
+        worst = max(worst, delta)
+        if delta > TOLERANCE:
+            drifted.append(key)
+    return exact, len(keys), worst, drifted
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compact the results log into a score snapshot plus tail.")
+    parser.add_argument("command", choices=("compact", "verify"))
+    parser.add_argument(
+        "--snapshot",
+        default=os.environ.get("RESULTS_SNAPSHOT", "").strip() or str(DEFAULT_SNAPSHOT_PATH),
+        help="Snapshot file (or RESULTS_SNAPSHOT env; default: %(default)s).",
+    )
+    parser.add_argument(
+        "--results",
+        default=os.environ.get("RESULTS_SOURCE", "").strip(),
+        help="CSV/JSON source path or URL (or RESULTS_SOURCE env); Supabase when configured.",
+    )
+    parser.add_argument(
+        "--mirror",
+        default=os.environ.get("RESULTS_MIRROR", "").strip(),
+        help="Read Supabase through this local SQLite mirror (see results_mirror.py).",
+    )
+    parser.add_argument("--cutoff", help="compact: fold everything answered up to this ISO time.")
+    parser.add_argument(
+        "--keep-days",
+        type=float,
+        default=30.0,
+        help="compact: without --cutoff, leave this many days in the tail (default: %(default)s).",
+    )
+    parser.add_argument("--tail-out", help="compact: also write the rows after the cutoff to this CSV.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    rows = load_rows(args)
+    if rows is None:
+        return 2
+    path = Path(args.snapshot)
+
+    if args.command == "compact":
+        cutoff = parse_timestamp(args.cutoff) if args.cutoff else datetime.now(tz=UTC) - timedelta(days=args.keep_days)
+        if cutoff is None:
+            print("ERROR: --cutoff takes an ISO timestamp such as 2026-09-01T00:00")
+            return 2
+        snapshot = Snapshot.build(rows, cutoff)
+        snapshot.save(path)
+        tail, _ = snapshot.tail(rows)
+        print(
+            f"Folded {snapshot.events} event(s) from {snapshot.rows} row(s) up to {cutoff.isoformat()} "
+            f"into {len(snapshot.entries)} key(s) in {path}; {len(tail)} row(s) after it"
+        )
+        if args.tail_out:
+            with open(args.tail_out, "w", encoding="utf-8", newline="") as handle:
+                writer = csv.DictWriter(
+                    handle, fieldnames=["timestamp", "word_id", "mode", "correct"], extrasaction="ignore"
+                )
+                writer.writeheader()
+                writer.writerows(tail)
+            print(f"Wrote the tail to {args.tail_out}")
+        return 0
+
+    try:
+        snapshot = Snapshot.load(path)
+    except (OSError, ValueError, KeyError) as exc:
+        print(f"ERROR: Could not read the snapshot {path}: {exc}")
+        return 2
+    _, before = snapshot.tail(rows)
+    if snapshot.changed_below(before):
+        print(
+            f"FAIL  the log holds {before} row(s) up to the cutoff, the snapshot was built from {snapshot.rows}: "
+            "compact again from the full log"
+        )
+        return 1
+    if not before and snapshot.rows:
+        print("The log holds only the rows after the cutoff, so there is no full history to score against.")
+        return 0
+    try:
+        aliases = load_aliases()
+    except AliasCycleError as exc:
+        print(f"ERROR: {exc}")
+        return 1
+    taus = deck_taus(list(iter_items(load_vocab_files())), aliases)
+    try:
+        exact, total, worst, drifted = compare(snapshot, rows, aliases, taus, datetime.now(tz=UTC))
+    except ValueError as exc:
+        print(f"ERROR: {exc}")
+        return 2
+    print(f"{exact} of {total} key(s) score identically to the bit; worst difference elsewhere {worst:.3g}")
+    if drifted:
+        print(f"FAIL  {len(drifted)} key(s) differ by more than {TOLERANCE}: {drifted[:5]}")
+        return 1
+    print("Snapshot plus tail scores as the full log does.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""The deck rules from CLAUDE.md, as functions over a list of items.
+
+test_deck_invariants.py checks the whole exported deck against them; the
+watcher (watch_deck.py) checks only the items an edit touched, so a curation
+session hears about a broken rule as soon as the file is saved. Each rule
+exists because breaking it produced a real defect: a prompt with no
+determinable answer, a word that could not be found by unit, a tip that gave
+the answer away.
+
+`only`, when given, is a set of item ids: a rule about single items then looks
+at those items alone, and a rule about groups (two prompts alike, homographs,
+duplicate ids) reports only the groups that contain one of them.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter, defaultdict
+from typing import Any, Iterable
+
+SUBUNIT = re.compile(r"^unit-a[12]-\d[abc]$")
+# Tags that stand in for a subunit: the alphabet unit and the cross-unit
+# Cases & Verbs supplement, which has no subunit to assign.
+SUBUNIT_EQUIVALENT = {"unit-a1-0a", "unit-a1-cases"}
+SESSION_TAG = "practice"
+TURKISH_ONLY = set("çğışöü")
+
+Item = dict[str, Any]
+# (rule name, offending lines, hint)
+Violation = tuple[str, list[str], str]
+
+
+def norm_gloss(text: str) -> str:
+    return " ".join(re.sub(r"\([^)]*\)", "", text).lower().split())
+
+
+def norm_hint(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def deck_rules(
+    items: list[Item],
+    registry: set[str],
+    sourced: Iterable[Item],
+    only: set[str] | None = None,
+) -> list[Violation]:
+    """Every rule's result, in the order the test reports them; an empty list is a pass.
+
+    `items` is the exported deck, `registry` its tag ids, and `sourced` the
+    candidate-file items, which still carry the `source` the export drops.
+    """
+
+    def picked(item: Item) -> bool:
+        return only is None or item.get("id") in only
+
+    def touched(group: list[Item]) -> bool:
+        return only is None or any(item.get("id") in only for item in group)
+
+    results: list[Violation] = []
+
+    # Every tag on an item must be declared, or the filter UI cannot show it.
+    results.append((
+        "every tag is in the registry",
+        sorted({f"{it['id']}: {t}" for it in items if picked(it) for t in it.get("tags", []) if t not in registry}),
+        "",
+    ))
+
+    # The practice set is per-device; shipping one would override what the device computed.
+    results.append((
+        "no practice-set tag is shipped",
+        [it["id"] for it in items if picked(it) and SESSION_TAG in it.get("tags", [])],
+        "",
+    ))
+
+    # Every word must be findable by where it came from.
+    results.append((
+        "every item has a unit-level marker",
+        [
+            f"{it['turkish']} ({it['id']}) tags={[t for t in it.get('tags', []) if t.startswith('unit')]}"
+            for it in items
+            if picked(it) and not any(SUBUNIT.match(t) or t in SUBUNIT_EQUIVALENT for t in it.get("tags", []))
+        ],
+        "give it a subunit, or the -extra marker plus the subunit whose list owns the topic",
+    ))
+
+    # Two items showing the identical EN->TR prompt cannot both be answered.
+    by_prompt: dict[tuple[str, str], list[Item]] = defaultdict(list)
+    for it in items:
+        by_prompt[(norm_gloss(it["english"]), norm_hint(it.get("hint_en_tr")))].append(it)
+    results.append((
+        "no two items share an EN->TR prompt",
+        [
+            f'"{gloss}" -> ' + ", ".join(x["turkish"] for x in group)
+            for (gloss, _hint), group in sorted(by_prompt.items())
+            if len(group) > 1 and touched(group)
+        ],
+        "give the marked sense a hint_en_tr; leave the default sense unmarked",
+    ))
+
+    # Same Turkish, different meanings: TR->EN needs something to tell them apart.
+    by_turkish: dict[str, list[Item]] = defaultdict(list)
+    for it in items:
+        by_turkish[it["turkish"].lower()].append(it)
+    results.append((
+        "every homograph has a TR->EN hint",
+        [
+            f"{word}: " + ", ".join(f'{x["english"]}' for x in group if not x.get("hint_tr_en"))
+            for word, group in sorted(by_turkish.items())
+            if len(group) > 1 and any(not x.get("hint_tr_en") for x in group) and touched(group)
+        ],
+        "",
+    ))
+
+    # An EN->TR tip containing Turkish letters is giving away the answer.
+    results.append((
+        "no hint_en_tr leaks Turkish",
+        [
+            f'{it["turkish"]} ({it["id"]}): {it["hint_en_tr"]}'
+            for it in items
+            if picked(it) and it.get("hint_en_tr") and (set(it["hint_en_tr"].lower()) & TURKISH_ONLY)
+        ],
+        "",
+    ))
+
+    # A gloss is shown verbatim as the TR->EN answer to type, and the matcher strips
+    # brackets but keeps what is inside them — so "in the middle (of)" silently
+    # requires the "of". Symbols carried on both sides, like kilometre (km), are the
+    # intended exception: the bracket is part of the term in either language.
+    results.append((
+        "no gloss carries a one-sided parenthetical",
+        [
+            f'{it["turkish"]} ({it["id"]}): {it["english"]}'
+            for it in items
+            if picked(it) and "(" in it["english"] and "(" not in it["turkish"]
+        ],
+        "move the qualifier into hint_tr_en / hint_en_tr, or make it part of the gloss",
+    ))
+
+    # A gap-fill is my addition, not the course's, and must say so both ways: the
+    # source field and the -extra marker have to agree. gelişmek carried a source
+    # copied from its batch, claiming an attestation it did not have.
+    #
+    # Read from the candidate files, not the deck: export_quiz.py drops `source`,
+    # so checking the exported items would call everything attested.
+    results.append((
+        "the -extra marker agrees with the source",
+        [
+            f'{it["turkish"]} ({it["id"]}): '
+            + ("source says gap-fill, no -extra tag" if it.get("source", "").lower().startswith("gap-fill")
+               else "carries -extra, but the source claims an attestation")
+            for it in sourced
+            if picked(it)
+            and it.get("source", "").lower().startswith("gap-fill")
+            != any(t.endswith("-extra") for t in it.get("tags", []))
+        ],
+        "a gap-fill needs the -extra marker; an attested word must not carry it",
+    ))
+
+    # ids are the key the answer history hangs on.
+    dupe_ids = [i for i, n in Counter(it["id"] for it in items).items() if n > 1 and (only is None or i in only)]
+    results.append(("ids are unique", sorted(dupe_ids), ""))
+
+    results.append((
+        "no item is missing a field",
+        [
+            f'{it.get("id", "?")}: missing {field}'
+            for it in items
+            if picked(it)
+            for field in ("id", "turkish", "english")
+            if not it.get(field)
+        ],
+        "",
+    ))
+    return results
@@ -6,6 +6,9 @@ import re
 from pathlib import Path
 from typing import Any
 
+from alias_table import AliasCycleError, flatten_aliases
+from build_manifest import BuildManifest, scripts
+
 
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_VOCAB = ROOT / "data" / "vocab" / "reviewed.json"
@@ -96,15 +99,6 @@ def find_same_english_different_turkish(items: list[dict[str, Any]]) -> list[lis
     return result
 
 
-def canonicalize(item_id: str, aliases: dict[str, str]) -> str:
-    current = item_id
-    seen: set[str] = set()
-    while current in aliases and current not in seen:
-        seen.add(current)
-        current = aliases[current]
-    return current
-
-
 def merge_tags(primary: list[str], incoming: list[str]) -> list[str]:
     seen = set(primary)
     merged = list(primary)
@@ -119,10 +113,11 @@ def apply_aliases(items: list[dict[str, Any]], aliases: dict[str, str]) -> int:
     by_id = {str(item.get("id", "")): item for item in items}
     removed = set()
     merged = 0
+    roots = flatten_aliases(aliases)
 
-    for alias_id, canonical_id in aliases.items():
+    for alias_id in aliases:
         alias_key = str(alias_id).strip()
-        canonical_key = canonicalize(str(canonical_id).strip(), aliases)
+        canonical_key = roots.get(alias_key, "")
         if not alias_key or not canonical_key or alias_key == canonical_key:
             continue
 
@@ -175,6 +170,11 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Scan for duplicate Turkish/English pairs.",
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="With --apply, merge even if the vocab and aliases are unchanged since the last run.",
+    )
     return parser.parse_args()
 
 
@@ -187,20 +187,37 @@ def main() -> int:
         print(f"Vocab file not found: {vocab_path}")
         return 1
 
+    manifest = BuildManifest()
+    step_files = [vocab_path, aliases_path, *scripts("dedupe_vocab.py", "alias_table.py")]
+    if args.apply and not (args.add or args.scan or args.force):
+        if manifest.up_to_date("dedupe_vocab", step_files, [vocab_path]):
+            print(f"{vocab_path} already has the aliases merged")
+            return 0
+
     raw, items = load_vocab(vocab_path)
     aliases = load_aliases(aliases_path)
 
     if args.add:
         for alias_id, canonical_id in args.add:
             aliases[str(alias_id).strip()] = str(canonical_id).strip()
+        try:
+            flatten_aliases(aliases)
+        except AliasCycleError as exc:
+            print(f"Not saved: {exc}")
+            return 1
         save_aliases(aliases_path, aliases)
         print(f"Saved aliases to {aliases_path}")
 
     did_apply = False
     if args.apply:
-        merged = apply_aliases(items, aliases)
+        try:
+            merged = apply_aliases(items, aliases)
+        except AliasCycleError as exc:
+            print(f"Not merged: {exc}")
+            return 1
         raw["items"] = items
         vocab_path.write_text(json.dumps(raw, ensure_ascii=True, indent=2), encoding="utf-8")
+        manifest.record("dedupe_vocab", step_files, [vocab_path])
         print(f"Merged {merged} alias pairs into {vocab_path}")
         did_apply = True
 
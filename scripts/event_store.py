@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""The answer history as typed arrays rather than a list of tuples.
+
+event_stream() returns one `(datetime, str, str, bool)` tuple per event and
+keeps a `seen` set of the same tuples; grouping by key then copies it all again.
+That is a few hundred bytes an event. EventStore holds the same events in
+parallel columns:
+
+    time     array("q")  epoch microseconds
+    word     array("i")  index into `words`, the interned canonical ids
+    mode     array("H")  index into `modes`
+    correct  bytearray   one bit per event
+
+about 14 bytes an event, so a history of millions stays in tens of megabytes.
+Microseconds rather than milliseconds because that is what a datetime holds: the
+store dedupes and scores exactly as event_stream does, not to within a rounding.
+
+Semantics follow event_stream: rows that fail to parse are skipped, exact
+repeats of the raw (timestamp, word_id, mode, correct) row are dropped — keyed
+on the id as recorded, before canonicalising — and events come out sorted by
+time, ties in arrival order. The one exception is a log of junk with more than
+MAX_MODES distinct modes: rows past that are rejected as a bad mode.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any, Iterable, Iterator, Sequence
+
+from build_today import TimestampParser, canonicalize, parse_correct
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+MICROSECOND = timedelta(microseconds=1)
+# Fixed codes for the two real modes, so a store's mode column means the same
+# thing whichever mode happened to arrive first.
+KNOWN_MODES = ("en-tr", "tr-en")
+# What the mode column's unsigned 16-bit codes can tell apart; there are two
+# real modes, so only hand-edited or junk rows ever come near it.
+MAX_MODES = 1 << 16
+
+
+def to_micros(timestamp: datetime) -> int:
+    return (timestamp - EPOCH) // MICROSECOND
+
+
+def from_micros(micros: int) -> datetime:
+    return EPOCH + timedelta(microseconds=micros)
+
+
+@dataclass
+class IngestReport:
+    """What one EventStore.from_records pass saw besides the events it kept."""
+
+    rows: int = 0
+    # Rows skipped, by the first field that would not parse.
+    rejected: Counter[str] = field(default_factory=Counter)
+    # ((timestamp, word_id as recorded, mode, correct), 0-based row positions),
+    # the same list duplicate_rows returns.
+    duplicates: list[tuple[tuple[datetime, str, str, bool], list[int]]] = field(default_factory=list)
+    # The format TimestampParser settled on; None is ISO 8601.
+    timestamp_format: str | None = None
+
+
+class EventStore:
+    """Deduplicated, time-sorted events in compact columns. Build with from_rows() or from_records()."""
+
+    def __init__(self) -> None:
+        self.time = array("q")
+        self.word = array("i")
+        self.mode = array("H")
+        self.correct = bytearray()
+        self.words: list[str] = []
+        self.modes: list[str] = list(KNOWN_MODES)
+        self._word_index: dict[str, int] = {}
+        self._mode_index: dict[str, int] = {mode: code for code, mode in enumerate(KNOWN_MODES)}
+        # Records read to build the store, including the ones skipped.
+        self.rows = 0
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def intern_word(self, word_id: str) -> int:
+        index = self._word_index.get(word_id)
+        if index is None:
+            index = self._word_index[word_id] = len(self.words)
+            self.words.append(word_id)
+        return index
+
+    def intern_mode(self, mode: str) -> int | None:
+        """The mode's code; None for a new mode once MAX_MODES are held."""
+        code = self._mode_index.get(mode)
+        if code is None:
+            if len(self.modes) >= MAX_MODES:
+                return None
+            code = self._mode_index[mode] = len(self.modes)
+            self.modes.append(mode)
+        return code
+
+    def is_correct(self, index: int) -> bool:
+        return bool(self.correct[index >> 3] & (1 << (index & 7)))
+
+    def _append(self, micros: int, word: int, mode: int, correct: bool) -> None:
+        index = len(self.time)
+        self.time.append(micros)
+        self.word.append(word)
+        self.mode.append(mode)
+        if index & 7 == 0:
+            self.correct.append(0)
+        if correct:
+            self.correct[index >> 3] |= 1 << (index & 7)
+
+    @classmethod
+    def from_rows(
+        cls, rows: Iterable[dict[str, Any]], aliases: dict[str, str], report: IngestReport | None = None
+    ) -> EventStore:
+        return cls.from_records(
+            ((row.get("timestamp", ""), row.get("word_id", ""), row.get("mode", ""), row.get("correct", "")) for row in rows),
+            aliases,
+            report,
+        )
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[tuple[Any, Any, Any, Any]],
+        aliases: dict[str, str],
+        report: IngestReport | None = None,
+    ) -> EventStore:
+        """Build from raw (timestamp, word_id, mode, correct) records, as results_stream yields them.
+
+        Records are consumed one at a time and not kept, so a streamed source
+        never exists as a list; `rows` counts them, parsed or not. Given a
+        `report`, the same pass fills in why rows were rejected and where the
+        repeats are, as duplicate_rows would find them.
+        """
+        store = cls()
+        parse = TimestampParser()
+        # Raw ids are interned separately: the dedupe key is the row as recorded,
+        # so an alias and its canonical answered in the same second stay two events.
+        raw_index: dict[str, int] = {}
+        raw_names: list[str] = []
+        canonical_of: list[int] = []
+        # Each event's raw id (and row position, for a report), only until the
+        # repeats are dropped.
+        raw_ids = array("i")
+        positions = array("q") if report is not None else None
+        for raw_ts, raw_word, raw_mode, raw_correct in records:
+            store.rows += 1
+            ts = parse(raw_ts)
+            word_id = str(raw_word).strip()
+            mode = str(raw_mode).strip()
+            correct = parse_correct(raw_correct)
+            mode_code = store.intern_mode(mode) if ts and word_id and mode else None
+            if not ts or not word_id or mode_code is None or correct is None:
+                if report is not None:
+                    report.rejected[
+                        "timestamp" if not ts else "word_id" if not word_id else "mode" if mode_code is None else "correct"
+                    ] += 1
+                continue
+            raw = raw_index.get(word_id)
+            if raw is None:
+                raw = raw_index[word_id] = len(canonical_of)
+                raw_names.append(word_id)
+                canonical_of.append(store.intern_word(canonicalize(word_id, aliases)))
+            store._append(to_micros(ts), canonical_of[raw], mode_code, correct)
+            raw_ids.append(raw)
+            if positions is not None:
+                positions.append(store.rows - 1)
+        if report is not None:
+            report.rows = store.rows
+            report.timestamp_format = parse.format
+        store._sort_and_dedupe(raw_ids, positions, raw_names, report)
+        return store
+
+    def _sort_and_dedupe(
+        self,
+        raw_ids: array,
+        positions: array | None = None,
+        raw_names: list[str] | None = None,
+        report: IngestReport | None = None,
+    ) -> None:
+        """Order by time, stably, keeping the first of each exact repeat.
+
+        Repeats share their timestamp, so once sorted they sit in the same run
+        of equal times and a set per run finds them; a set over the whole
+        history, which cost more than the columns themselves, is not needed.
+        """
+        time = self.time
+        in_order = all(time[i] <= time[i + 1] for i in range(len(time) - 1))
+        order: Sequence[int] = range(len(time)) if in_order else sorted(range(len(time)), key=time.__getitem__)
+        keep = array("q")
+        run_time = None
+        # Key -> the index that first had it, within the current run.
+        run: dict[int, int] = {}
+        repeats: dict[int, list[int]] = {}
+        for index in order:
+            if time[index] != run_time:
+                run_time = time[index]
+                run.clear()
+            # Mode codes fit in 16 bits, so (raw id, mode, correct) packs into one int.
+            key = (raw_ids[index] << 17) | (self.mode[index] << 1) | self.is_correct(index)
+            first = run.get(key)
+            if first is None:
+                run[key] = index
+                keep.append(index)
+            elif positions is not None:
+                repeats.setdefault(first, [positions[first]]).append(positions[index])
+        if report is not None and raw_names is not None:
+            found = [
+                (
+                    (from_micros(time[first]), raw_names[raw_ids[first]], self.modes[self.mode[first]], self.is_correct(first)),
+                    found_at,
+                )
+                for first, found_at in repeats.items()
+            ]
+            # In time order, ties by first appearance, as duplicate_rows sorts them.
+            report.duplicates = sorted(found, key=lambda item: (item[0][0], item[1][0]))
+        if in_order and len(keep) == len(time):
+            return
+        self._take(keep)
+
+    def _take(self, order: Sequence[int]) -> None:
+        """Keep only the events at `order`, in that order."""
+        time, word, mode = self.time, self.word, self.mode
+        correct = bytearray((len(order) + 7) // 8)
+        for index, source in enumerate(order):
+            if self.is_correct(source):
+                correct[index >> 3] |= 1 << (index & 7)
+        self.time = array("q", (time[i] for i in order))
+        self.word = array("i", (word[i] for i in order))
+        self.mode = array("H", (mode[i] for i in order))
+        self.correct = correct
+
+    def __iter__(self) -> Iterator[tuple[datetime, str, str, bool]]:
+        """Events in event_stream's shape: (timestamp, canonical id, mode, correct)."""
+        words, modes = self.words, self.modes
+        for index in range(len(self.time)):
+            yield (
+                from_micros(self.time[index]),
+                words[self.word[index]],
+                modes[self.mode[index]],
+                self.is_correct(index),
+            )
+
+    def by_key(self) -> dict[tuple[str, str], list[tuple[datetime, bool]]]:
+        """(canonical id, mode) -> [(timestamp, correct)], the input compute_scores takes."""
+        grouped: dict[tuple[str, str], list[tuple[datetime, bool]]] = {}
+        for timestamp, word_id, mode, correct in self:
+            grouped.setdefault((word_id, mode), []).append((timestamp, correct))
+        return grouped
+
+    def nbytes(self) -> int:
+        """Bytes held by the event columns, not counting the interned id strings."""
+        return (
+            self.time.itemsize * len(self.time)
+            + self.word.itemsize * len(self.word)
+            + self.mode.itemsize * len(self.mode)
+            + len(self.correct)
+        )
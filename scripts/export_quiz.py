@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 
+import argparse
+import hashlib
 import json
+from collections import Counter
 from pathlib import Path
 from typing import Any
 
+from alias_table import AliasCycleError, flatten_aliases
+from build_manifest import BuildManifest, scripts
+from tag_index import TagIndex
+
 
 ROOT = Path(__file__).resolve().parents[1]
 LEXICON_PATH = ROOT / "data" / "lexicon.json"
@@ -12,12 +19,26 @@ TAGS_PATH = ROOT / "data" / "tags.json"
 ALIASES_PATH = ROOT / "data" / "aliases.json"
 OUT_PATH = ROOT / "web" / "data" / "quiz.json"
 OUT_ALIASES_PATH = ROOT / "web" / "data" / "aliases.json"
+OUT_TAG_INDEX_PATH = ROOT / "web" / "data" / "tag_index.json"
+OUT_SHARDS_DIR = ROOT / "web" / "data" / "shards"
+OUT_SHARDS_MANIFEST_PATH = OUT_SHARDS_DIR / "manifest.json"
 
 # Stripped from every exported item: this tag marks the current study batch, which
 # each device recomputes locally. build_today.py still writes it into the vocab
 # files for offline analysis; it just never ships.
 SESSION_TAG = "practice"
 
+# The compact quiz.json: one array per item, in this field order, trailing
+# absent fields dropped and absent ones before a present one left null. Tags
+# are positions in the registry (`tags`), then in `unregistered_tags`.
+QUIZ_FIELDS = ["id", "turkish", "english", "priority", "tags", "hint_tr_en", "hint_en_tr", "pron_tr", "infl_tr"]
+COMPACT_FORMAT = "compact-1"
+
+# Registry group whose tags name the shards; an item goes to the rarest of its
+# unit tags (its subunit rather than its level), or to OTHER_SHARD without one.
+UNIT_GROUP = "unit"
+OTHER_SHARD = "other"
+
 
 def load_tags() -> list[dict[str, Any]]:
     if not TAGS_PATH.exists():
@@ -88,43 +109,197 @@ def validate_item_tags(items: list[dict[str, Any]], tags: list[dict[str, Any]])
         raise ValueError(message)
 
 
-def main() -> None:
-    tags = load_tags()
-    items = load_items()
-    aliases = load_aliases()
-    validate_item_tags(items, tags)
+def quiz_entry(item: dict[str, Any]) -> dict[str, Any] | None:
+    """The fields of `item` the web app needs; None for an item it cannot quiz."""
+    if not item.get("turkish") or not item.get("english"):
+        return None
+    entry = {
+        "id": item.get("id", ""),
+        "turkish": item.get("turkish", ""),
+        "english": item.get("english", ""),
+        "priority": int(item.get("priority", 1)),
+        # The session list is computed in the app, per device, from the live
+        # history — never baked into the deck. A shipped one would be stale on
+        # arrival and would silently override what the device worked out.
+        "tags": [t for t in (item.get("tags", []) or []) if t != SESSION_TAG],
+    }
+    if item.get("hint_tr_en"):
+        entry["hint_tr_en"] = item["hint_tr_en"]
+    if item.get("hint_en_tr"):
+        entry["hint_en_tr"] = item["hint_en_tr"]
+    # Pronunciation is shown only on reveal, so it can never leak the answer.
+    if item.get("pron_tr"):
+        entry["pron_tr"] = item["pron_tr"]
+    # The inflected form rides along for the same reason: it contains the
+    # Turkish stem, so it may only appear once the answer is out.
+    if item.get("infl_tr"):
+        entry["infl_tr"] = item["infl_tr"]
+    return entry
+
+
+def quiz_entries(items: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [entry for entry in map(quiz_entry, items) if entry is not None]
+
+
+def encode_deck(quiz_items: list[dict[str, Any]], tags: list[dict[str, Any]]) -> dict[str, Any]:
+    """quiz.json in the compact form the app decodes with DeckFormat.decodeDeck."""
+    positions = {tag["id"]: position for position, tag in enumerate(tags)}
+    unregistered: list[str] = []
+
+    def tag_position(tag_id: str) -> int:
+        # Only possible without a registry; validate_tags rejects them otherwise.
+        if tag_id not in positions:
+            positions[tag_id] = len(tags) + len(unregistered)
+            unregistered.append(tag_id)
+        return positions[tag_id]
+
+    rows = []
+    for entry in quiz_items:
+        row = [entry.get(field) for field in QUIZ_FIELDS]
+        row[QUIZ_FIELDS.index("tags")] = [tag_position(tag) for tag in entry.get("tags", [])]
+        while row[-1] is None:
+            row.pop()
+        rows.append(row)
+    deck: dict[str, Any] = {"format": COMPACT_FORMAT, "fields": QUIZ_FIELDS, "tags": tags, "items": rows}
+    if unregistered:
+        deck["unregistered_tags"] = unregistered
+    return deck
+
+
+def decode_deck(data: dict[str, Any]) -> dict[str, Any]:
+    """{"items", "tags"} as the readable quiz.json has them, from either form."""
+    if data.get("format") != COMPACT_FORMAT:
+        return data
+    tags = data.get("tags", [])
+    names = [tag["id"] for tag in tags] + list(data.get("unregistered_tags", []))
+    fields = data["fields"]
+    items = []
+    for row in data["items"]:
+        entry = {field: value for field, value in zip(fields, row) if value is not None}
+        entry["tags"] = [names[position] for position in entry.get("tags", [])]
+        items.append(entry)
+    return {"items": items, "tags": tags}
+
+
+def load_quiz(path: Path = OUT_PATH) -> dict[str, Any]:
+    """The exported deck, decoded: what the app sees once it has loaded quiz.json."""
+    return decode_deck(json.loads(path.read_text(encoding="utf-8")))
+
+
+def write_shards(quiz_items: list[dict[str, Any]], tags: list[dict[str, Any]]) -> dict[str, Any]:
+    """Write the deck as one compact file per unit, and their manifest; returns the manifest.
+
+    quiz.json is one file, so the app downloads every unit to practise one, and
+    any edit invalidates all of it. A shard holds only the encoded rows; the
+    registry, the field order and the tag counts are in the manifest. Each
+    shard is named by its content hash, so an unchanged shard keeps its URL and
+    the app fetches it once (see loadShards in app.js). `tags` per shard says
+    how many of its items carry each tag, which is how the app tells which
+    shards an include filter needs. Shards no longer listed are removed.
+    """
+    deck = encode_deck(quiz_items, tags)
+    counts = Counter(tag for entry in quiz_items for tag in entry.get("tags", []))
+    rank = {tag["id"]: (counts[tag["id"]], position) for position, tag in enumerate(tags) if tag["group"] == UNIT_GROUP}
+    rows: dict[str, list[list[Any]]] = {}
+    carried: dict[str, Counter[str]] = {}
+    for entry, row in zip(quiz_items, deck["items"]):
+        units = [tag for tag in entry.get("tags", []) if tag in rank]
+        unit = min(units, key=rank.__getitem__) if units else OTHER_SHARD
+        rows.setdefault(unit, []).append(row)
+        carried.setdefault(unit, Counter()).update(entry.get("tags", []))
+
+    OUT_SHARDS_DIR.mkdir(parents=True, exist_ok=True)
+    order = {tag["id"]: position for position, tag in enumerate(tags)}
+    shards = []
+    for unit in sorted(rows, key=lambda unit: order.get(unit, len(order))):
+        text = json.dumps({"items": rows[unit]}, ensure_ascii=False, separators=(",", ":"))
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        name = f"{unit}-{digest[:12]}.json"
+        path = OUT_SHARDS_DIR / name
+        if not path.exists():
+            path.write_text(text, encoding="utf-8")
+        shards.append({
+            "unit": unit,
+            "file": name,
+            "hash": digest,
+            "items": len(rows[unit]),
+            "tags": dict(sorted(carried[unit].items())),
+        })
+
+    manifest = {key: value for key, value in deck.items() if key != "items"}
+    manifest["items"] = len(quiz_items)
+    manifest["counts"] = {tag["id"]: counts[tag["id"]] for tag in tags} | dict(counts)
+    manifest["shards"] = shards
+    OUT_SHARDS_MANIFEST_PATH.write_text(
+        json.dumps(manifest, ensure_ascii=False, separators=(",", ":")),
+        encoding="utf-8",
+    )
+    listed = {shard["file"] for shard in shards}
+    for path in OUT_SHARDS_DIR.glob("*.json"):
+        if path != OUT_SHARDS_MANIFEST_PATH and path.name not in listed:
+            path.unlink()
+    return manifest
 
-    # Keep only fields the web app needs.
-    quiz_items = []
-    for item in items:
-        if not item.get("turkish") or not item.get("english"):
-            continue
-        entry = {
-            "id": item.get("id", ""),
-            "turkish": item.get("turkish", ""),
-            "english": item.get("english", ""),
-            "priority": int(item.get("priority", 1)),
-            # The session list is computed in the app, per device, from the live
-            # history — never baked into the deck. A shipped one would be stale on
-            # arrival and would silently override what the device worked out.
-            "tags": [t for t in (item.get("tags", []) or []) if t != SESSION_TAG],
-        }
-        if item.get("hint_tr_en"):
-            entry["hint_tr_en"] = item["hint_tr_en"]
-        if item.get("hint_en_tr"):
-            entry["hint_en_tr"] = item["hint_en_tr"]
-        # Pronunciation is shown only on reveal, so it can never leak the answer.
-        if item.get("pron_tr"):
-            entry["pron_tr"] = item["pron_tr"]
-        # The inflected form rides along for the same reason: it contains the
-        # Turkish stem, so it may only appear once the answer is out.
-        if item.get("infl_tr"):
-            entry["infl_tr"] = item["infl_tr"]
-        quiz_items.append(entry)
 
+def remove_shards() -> None:
+    """Drop the shard output, so the app cannot load shards older than quiz.json."""
+    if OUT_SHARDS_DIR.exists():
+        for path in OUT_SHARDS_DIR.glob("*.json"):
+            path.unlink()
+        OUT_SHARDS_DIR.rmdir()
+
+
+def shard_outputs() -> list[Path]:
+    """The manifest and the shard files it lists, as outputs for BuildManifest."""
+    try:
+        manifest = json.loads(OUT_SHARDS_MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return [OUT_SHARDS_MANIFEST_PATH]
+    return [OUT_SHARDS_MANIFEST_PATH, *(OUT_SHARDS_DIR / shard["file"] for shard in manifest.get("shards", []))]
+
+
+def deck_outputs(shards: bool = False) -> list[Path]:
+    """What write_deck writes, as outputs for BuildManifest."""
+    return [OUT_PATH, OUT_ALIASES_PATH, OUT_TAG_INDEX_PATH, *(shard_outputs() if shards else [])]
+
+
+def write_deck(
+    quiz_items: list[dict[str, Any]],
+    tags: list[dict[str, Any]],
+    aliases: dict[str, str],
+    readable: bool = False,
+    shards: bool = False,
+) -> dict[str, Any]:
+    """Write quiz.json, tag_index.json and the flat aliases.json; returns the tag index.
+
+    quiz.json is every device's first download, so by default it goes out
+    compact (encode_deck): minified, real UTF-8 rather than a \\u escape per
+    Turkish letter, and each tag an index instead of its repeated name.
+    `readable` writes the indented object form the app also accepts, for
+    reading a deck by eye or diffing two exports.
+
+    `shards` also writes web/data/shards/ (write_shards); without it any
+    shards from an earlier export are removed, since the app prefers them.
+    """
     OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    OUT_PATH.write_text(
-        json.dumps({"items": quiz_items, "tags": tags}, ensure_ascii=True, indent=2),
+    if readable:
+        text = json.dumps({"items": quiz_items, "tags": tags}, ensure_ascii=True, indent=2)
+    else:
+        text = json.dumps(encode_deck(quiz_items, tags), ensure_ascii=False, separators=(",", ":"))
+    OUT_PATH.write_text(text, encoding="utf-8")
+
+    # Postings (tag -> positions in quiz.json's items) and counts, so the app
+    # builds its tag bitmasks and per-tag counts without walking every item's
+    # tags. Kept out of quiz.json and minified: indented, the ~7000 positions
+    # would add a line each. `items` lets the app notice a mismatched pair.
+    index = TagIndex(quiz_items)
+    tag_index = {
+        "items": len(quiz_items),
+        "counts": index.counts([tag["id"] for tag in tags]),
+        "postings": index.postings(),
+    }
+    OUT_TAG_INDEX_PATH.write_text(
+        json.dumps(tag_index, ensure_ascii=True, separators=(",", ":")),
         encoding="utf-8",
     )
 
@@ -133,8 +308,62 @@ def main() -> None:
         encoding="utf-8",
     )
 
+    if shards:
+        write_shards(quiz_items, tags)
+    else:
+        remove_shards()
+    return tag_index
+
+
+def step_inputs() -> list[Path]:
+    return [
+        TAGS_PATH,
+        ALIASES_PATH,
+        LEXICON_PATH,
+        *sorted(VOCAB_DIR.glob("*.json")),
+        *scripts("export_quiz.py", "alias_table.py", "tag_index.py"),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the deck the app loads to web/data/.")
+    parser.add_argument("--force", action="store_true", help="Export even if no input changed.")
+    parser.add_argument(
+        "--readable",
+        action="store_true",
+        help="Write quiz.json indented, with tag names, instead of the compact form.",
+    )
+    parser.add_argument(
+        "--shards",
+        action="store_true",
+        help="Also write the deck as per-unit shards with a hashed manifest, under web/data/shards/.",
+    )
+    args = parser.parse_args()
+
+    manifest = BuildManifest()
+    options = {"readable": args.readable, "shards": args.shards}
+    if not args.force and manifest.up_to_date("export_quiz", step_inputs(), deck_outputs(args.shards), options):
+        print(f"{OUT_PATH} and the files beside it are up to date")
+        return
+
+    tags = load_tags()
+    items = load_items()
+    # Flattened here so the app canonicalises with one lookup; a cycle stops the build.
+    try:
+        aliases = flatten_aliases(load_aliases())
+    except AliasCycleError as exc:
+        print(f"Not exported: {exc}")
+        raise SystemExit(1)
+    validate_item_tags(items, tags)
+    quiz_items = quiz_entries(items)
+    tag_index = write_deck(quiz_items, tags, aliases, args.readable, args.shards)
+
+    manifest.record("export_quiz", step_inputs(), deck_outputs(args.shards), options)
     print(f"Wrote {len(quiz_items)} items to {OUT_PATH}")
     print(f"Wrote {len(aliases)} aliases to {OUT_ALIASES_PATH}")
+    print(f"Wrote postings for {len(tag_index['postings'])} tags to {OUT_TAG_INDEX_PATH}")
+    if args.shards:
+        print(f"Wrote {len(shard_outputs()) - 1} shards to {OUT_SHARDS_DIR}")
 
 
 if __name__ == "__main__":
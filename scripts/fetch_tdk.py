@@ -40,6 +40,8 @@ import urllib.request
 from datetime import datetime, timezone
 from pathlib import Path
 
+from export_quiz import load_quiz
+
 ROOT = Path(__file__).resolve().parents[1]
 QUIZ = ROOT / "web" / "data" / "quiz.json"
 CACHE = ROOT / "resources" / "tdk_cache.jsonl"
@@ -101,7 +103,7 @@ def main() -> int:
     if args.refetch and CACHE.exists():
         CACHE.unlink()
 
-    items = json.loads(QUIZ.read_text(encoding="utf-8"))["items"]
+    items = load_quiz(QUIZ)["items"]
     words = sorted({w for i in items for w in forms(i["turkish"])})
     # A recorded failure still needs fetching — otherwise a transient network
     # error becomes a permanent hole that looks like a completed cache.
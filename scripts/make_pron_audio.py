@@ -34,6 +34,8 @@ import urllib.parse
 import urllib.request
 from pathlib import Path
 
+from export_quiz import load_quiz
+
 ROOT = Path(__file__).resolve().parents[1]
 QUIZ = ROOT / "web" / "data" / "quiz.json"
 OUT = ROOT / "resources" / "pron_audio"
@@ -103,7 +105,7 @@ def main() -> int:
     ap.add_argument("--limit", type=int)
     args = ap.parse_args()
 
-    items = json.loads(QUIZ.read_text(encoding="utf-8"))["items"]
+    items = load_quiz(QUIZ)["items"]
     if args.words:
         wanted = {w.strip() for w in args.words.split(",")}
         items = [i for i in items if i["turkish"] in wanted
@@ -8,6 +8,11 @@ Each row gets a deterministic client_event_id derived from the event itself, so
 the import is idempotent: re-running it inserts nothing new, and any duplicate
 rows still present in the sheet collapse into one.
 
+Rows go through bulk_writer: batches of about --batch-bytes of JSON, a few
+POSTs at a time, retried through rate limits and 5xx. The ids of committed
+batches are kept in --checkpoint, so an interrupted import resumes where it
+stopped instead of sending everything again.
+
 Usage:
   python3 scripts/migrate_results_to_supabase.py --dry-run
   python3 scripts/migrate_results_to_supabase.py
@@ -18,7 +23,6 @@ import argparse
 import csv
 import hashlib
 import io
-import json
 import sys
 import urllib.error
 import urllib.request
@@ -32,6 +36,8 @@ from build_today import (  # noqa: E402
     read_api_key,
     resolve_results_source,
 )
+from bulk_writer import BATCH_BYTES, CONCURRENCY, BulkWriter  # noqa: E402
+from supabase_client import SupabaseClient  # noqa: E402
 
 ROOT = Path(__file__).resolve().parents[1]
 KEYS = ROOT / "resources" / "access_keys"
@@ -39,7 +45,7 @@ SHEET_KEY_PATH = KEYS / "personal_key.txt"
 SUPABASE_URL_PATH = KEYS / "supabase_url.txt"
 SUPABASE_ANON_PATH = KEYS / "supabase_anon_key.txt"
 SUPABASE_SECRET_PATH = KEYS / "supabase_app_secret.txt"
-BATCH = 500
+CHECKPOINT_PATH = ROOT / "resources" / "migrate_results.checkpoint"
 
 
 def read_text(path: Path, what: str) -> str:
@@ -101,36 +107,49 @@ def to_records(rows: list[dict[str, str]]) -> list[dict[str, object]]:
     return sorted(records.values(), key=lambda r: str(r["answered_at"]))
 
 
-def insert(records: list[dict[str, object]], url: str, anon: str, secret: str) -> None:
+def insert(
+    records: list[dict[str, object]],
+    url: str,
+    anon: str,
+    secret: str,
+    checkpoint: Path | None = None,
+    batch_bytes: int = BATCH_BYTES,
+    concurrency: int = CONCURRENCY,
+) -> None:
     # on_conflict names the unique key so ignore-duplicates actually applies:
     # without it PostgREST targets the primary key and a repeat raises 409.
-    endpoint = url.rstrip("/") + "/rest/v1/results?on_conflict=client_event_id"
-    for start in range(0, len(records), BATCH):
-        chunk = records[start : start + BATCH]
-        request = urllib.request.Request(
-            endpoint,
-            data=json.dumps(chunk).encode("utf-8"),
-            method="POST",
-            headers={
-                "apikey": anon,
-                "Authorization": f"Bearer {anon}",
-                "Content-Type": "application/json",
-                # ignore-duplicates makes re-running the import a no-op
-                "Prefer": "resolution=ignore-duplicates,return=minimal",
-                "x-app-secret": secret,
-            },
+    # ignore-duplicates makes re-running the import a no-op.
+    with SupabaseClient(url, anon, secret, connections=concurrency) as client:
+        writer = BulkWriter(
+            client,
+            "results",
+            on_conflict="client_event_id",
+            checkpoint=checkpoint,
+            batch_bytes=batch_bytes,
+            concurrency=concurrency,
         )
+        if writer.done:
+            print(f"resuming: {len(writer.done)} event(s) already sent per {checkpoint}")
         try:
-            with urllib.request.urlopen(request, timeout=120) as response:
-                print(f"  rows {start + 1}-{start + len(chunk)}: HTTP {response.status}")
+            result = writer.write(
+                records,
+                key=lambda record: str(record["client_event_id"]),
+                progress=lambda done: print(f"  {done.sent + done.skipped}/{len(records)} rows", flush=True),
+            )
         except urllib.error.HTTPError as error:
             body = error.read().decode("utf-8", "replace")[:500]
-            raise SystemExit(f"insert failed at row {start + 1}: HTTP {error.code}\n{body}")
+            raise SystemExit(f"insert failed: HTTP {error.code}\n{body}\nre-run to resume from {checkpoint}")
+    if result.retries:
+        print(f"  {result.retries} batch(es) retried after a refusal")
 
 
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--dry-run", action="store_true", help="parse only, do not insert")
+    parser.add_argument("--checkpoint", type=Path, default=CHECKPOINT_PATH,
+                        help="where committed batches are recorded, so a re-run resumes")
+    parser.add_argument("--batch-bytes", type=int, default=BATCH_BYTES, help="JSON bytes per POST")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="POSTs in flight at once")
     args = parser.parse_args()
 
     rows = load_sheet_rows()
@@ -147,6 +166,9 @@ def main() -> None:
         read_text(SUPABASE_URL_PATH, "Supabase project URL"),
         read_text(SUPABASE_ANON_PATH, "Supabase anon key"),
         read_text(SUPABASE_SECRET_PATH, "Supabase app secret"),
+        checkpoint=args.checkpoint,
+        batch_bytes=args.batch_bytes,
+        concurrency=args.concurrency,
     )
     print(f"done: {len(records)} event(s) submitted")
 
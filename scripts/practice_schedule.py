@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Predict the practice set at future times from when scores cross the cutoff.
+
+With no new answers, every score is a closed-form function of time. Per (word,
+mode), measured in days t from the key's last answer:
+
+    s(t) = a·exp(-t/tau_wrong) - b·exp(-t/tau_right) + c
+
+where a and b are the weighted wrong and right counts and c the novelty bonus.
+Two exponentials give s at most one turning point, and that point has a closed
+form, so s crosses any fixed cutoff at most twice and each crossing lies on a
+monotone stretch where bisection cannot miss it (with one exponential left the
+crossing is itself closed-form).
+
+PracticeScheduler fixes a cutoff and keeps every future crossing of it in one
+time-ordered heap. Asking for the set at time T
+pops only the crossings before T; the thousands of words nowhere near the cutoff
+are never looked at. Everything at or above the cutoff outranks everything below
+it, so the top `limit` of the words above it is exactly the top `limit` overall.
+The cutoff sits at the score of the word ranked `limit + slack`, not `limit`:
+the leaders' wrong counts fade from the moment they are set, and a cutoff at the
+limit-th score would leave too few words above it almost at once. When decay
+still leaves fewer than `limit` above it, the cutoff is reset at T, which costs
+one full pass.
+
+    .venv/bin/python scripts/build_today.py --dry-run \\
+        --at 2026-10-18T08:00 --at 2026-10-19T08:00
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import math
+from datetime import UTC, datetime
+from typing import Iterable, Sequence
+
+from build_today import (
+    DEFAULT_CONFIG,
+    ScoreConfig,
+    decay,
+    filter_items,
+    group_by_canonical,
+    iter_items,
+    load_aliases,
+    load_rows,
+    load_vocab_files,
+    parse_modes,
+)
+from score_state import ScoreState, deck_taus
+
+DAY = 86400.0
+
+
+def curve(state: ScoreState, config: ScoreConfig, tau_right_days: float) -> tuple[float, float, float, float]:
+    """(origin, a, b, c) such that the score is a·e^(-t/tau_wrong) - b·e^(-t/tau_right) + c.
+
+    `origin` is the key's last answer in epoch days and t counts days after it.
+    """
+    last = max((moment for moment in (state.last_wrong, state.last_right) if moment), default=None)
+    if last is None:
+        return 0.0, 0.0, 0.0, config.novelty_bonus
+    wrong = decay(state.wrong, state.last_wrong, last, config.tau_wrong_days) if state.last_wrong else 0.0
+    right = decay(state.right, state.last_right, last, tau_right_days) if state.last_right else 0.0
+    return (
+        last.timestamp() / DAY,
+        config.weight_wrong * wrong if config.tau_wrong_days > 0 else 0.0,
+        config.weight_right * right if tau_right_days > 0 else 0.0,
+        config.novelty_bonus / (1.0 + state.total),
+    )
+
+
+def crossings(
+    a: float, tau_a: float, b: float, tau_b: float, c: float, cutoff: float
+) -> list[float]:
+    """Every t >= 0 at which a·e^(-t/tau_a) - b·e^(-t/tau_b) + c changes side of `cutoff`."""
+
+    def f(t: float) -> float:
+        return a * math.exp(-t / tau_a) - b * math.exp(-t / tau_b) + c - cutoff
+
+    limit = c - cutoff
+    if a == 0.0 and b == 0.0:
+        return []
+    if a == 0.0 or b == 0.0:
+        # One exponential: k·e^(-t/tau) = cutoff - c, solved directly.
+        k, tau = (a, tau_a) if b == 0.0 else (-b, tau_b)
+        ratio = k / -limit if limit else 0.0
+        return [tau * math.log(ratio)] if ratio > 1.0 else []
+
+    # Turning point, where a/tau_a·e^(-t/tau_a) = b/tau_b·e^(-t/tau_b).
+    breaks = [0.0]
+    if tau_a != tau_b:
+        ratio = (a * tau_b) / (b * tau_a)
+        turn = math.log(ratio) * tau_a * tau_b / (tau_b - tau_a)
+        if turn > 0.0:
+            breaks.append(turn)
+
+    found: list[float] = []
+    for index, low in enumerate(breaks):
+        f_low = f(low)
+        if index + 1 < len(breaks):
+            high = breaks[index + 1]
+        else:
+            if not limit or (f_low >= 0.0) == (limit >= 0.0):
+                continue
+            # The last stretch runs to infinity; walk out until it changes side.
+            high = max(low, 1.0) * 2.0
+            while (f(high) >= 0.0) == (f_low >= 0.0):
+                high *= 2.0
+        if (f_low >= 0.0) == (f(high) >= 0.0):
+            continue
+        for _ in range(100):
+            middle = (low + high) / 2.0
+            if (f(middle) >= 0.0) == (f_low >= 0.0):
+                low = middle
+            else:
+                high = middle
+            if high - low < 1e-9:
+                break
+        found.append(high)
+    return found
+
+
+class PracticeScheduler:
+    """The top `limit` words over time, recomputing only words whose side of the cutoff changes."""
+
+    def __init__(
+        self,
+        states: dict[tuple[str, str], ScoreState],
+        taus: dict[str, float],
+        modes: Sequence[str],
+        limit: int,
+        start: datetime,
+        config: ScoreConfig = DEFAULT_CONFIG,
+        slack: int | None = None,
+    ) -> None:
+        self.states = states
+        self.taus = taus
+        self.modes = tuple(modes)
+        self.limit = max(0, limit)
+        # Words kept above the cutoff beyond the limit; each query ranks
+        # `limit + slack` words at most, so this trades query cost for rebases.
+        self.slack = self.limit if slack is None else max(0, slack)
+        self.config = config
+        self.now = start
+        self.rebases = 0
+        self.popped = 0
+        self._rebase(start)
+
+    def score(self, word_id: str, at: datetime) -> float:
+        tau_right_days = self.taus.get(word_id, self.config.tau_right_default_days)
+        return max(
+            self.states.get((word_id, mode), ScoreState()).score(at, self.config, tau_right_days)[2]
+            for mode in self.modes
+        )
+
+    def _value(self, key: tuple[str, str], at_days: float) -> float:
+        """The score on the curve the crossings are solved on.
+
+        Sides and the cutoff are all read from here, never from ScoreState.score,
+        so a score within rounding of the cutoff cannot disagree with its roots.
+        """
+        origin, a, b, c = self.curves[key]
+        age = max(0.0, at_days - origin)
+        value = c
+        if a:
+            value += a * math.exp(-age / self.config.tau_wrong_days)
+        if b:
+            value -= b * math.exp(-age / self.taus[key[0]])
+        return value
+
+    def _rebase(self, at: datetime) -> None:
+        """Fix the cutoff at the (limit + slack)-th score as of `at` and schedule every crossing."""
+        at_days = at.timestamp() / DAY
+        self.curves: dict[tuple[str, str], tuple[float, float, float, float]] = {
+            (word_id, mode): curve(self.states.get((word_id, mode), ScoreState()), self.config, tau_right_days)
+            for word_id, tau_right_days in self.taus.items()
+            for mode in self.modes
+        }
+        ranked = sorted(
+            (max(self._value((word_id, mode), at_days) for mode in self.modes) for word_id in self.taus),
+            reverse=True,
+        )
+        depth = min(self.limit + self.slack, len(ranked))
+        self.cutoff = ranked[depth - 1] if self.limit and depth else -math.inf
+        self.heap: list[tuple[float, str, str, int]] = []
+        self.generation: dict[tuple[str, str], int] = {}
+        self.above: dict[tuple[str, str], bool] = {}
+        self.members: dict[str, int] = {}
+        for key in self.curves:
+            self._schedule(key, at_days)
+
+    def _set_side(self, key: tuple[str, str], at_days: float) -> None:
+        was_above = self.above.get(key, False)
+        is_above = self.above[key] = self._value(key, at_days) >= self.cutoff
+        if is_above != was_above:
+            self.members[key[0]] = self.members.get(key[0], 0) + (1 if is_above else -1)
+
+    def _schedule(self, key: tuple[str, str], at_days: float) -> None:
+        self._set_side(key, at_days)
+        generation = self.generation[key] = self.generation.get(key, 0) + 1
+        origin, a, b, c = self.curves[key]
+        for offset in crossings(a, self.config.tau_wrong_days, b, self.taus[key[0]], c, self.cutoff):
+            if origin + offset > at_days:
+                heapq.heappush(self.heap, (origin + offset, key[0], key[1], generation))
+
+    def record(self, timestamp: datetime, word_id: str, mode: str, correct: bool) -> None:
+        """Fold a new answer in; only this key's crossings are recomputed."""
+        self._advance(timestamp)
+        tau_right_days = self.taus.get(word_id, self.config.tau_right_default_days)
+        state = self.states.setdefault((word_id, mode), ScoreState())
+        state.fold(timestamp, correct, self.config.tau_wrong_days, tau_right_days)
+        key = (word_id, mode)
+        if key in self.curves:
+            self.curves[key] = curve(state, self.config, tau_right_days)
+            self._schedule(key, timestamp.timestamp() / DAY)
+
+    def _advance(self, at: datetime) -> None:
+        if at < self.now:
+            raise ValueError(f"the scheduler only moves forward: {at.isoformat()} is before {self.now.isoformat()}")
+        at_days = at.timestamp() / DAY
+        while self.heap and self.heap[0][0] <= at_days:
+            _, word_id, mode, generation = heapq.heappop(self.heap)
+            key = (word_id, mode)
+            if self.generation.get(key) != generation:
+                continue  # superseded by a newer answer to this key
+            # Read the side at `at` rather than flipping: a root found within
+            # rounding of where it truly lies cannot then leave the word stuck.
+            self._set_side(key, at_days)
+            self.popped += 1
+        self.now = at
+
+    def practice_set(self, at: datetime) -> list[tuple[str, float]]:
+        """The top `limit` (id, score) pairs at `at`, best first."""
+        self._advance(at)
+        candidates = [word_id for word_id, count in self.members.items() if count > 0]
+        if len(candidates) < self.limit:
+            self.rebases += 1
+            self._rebase(at)
+            candidates = [word_id for word_id, count in self.members.items() if count > 0]
+        ranked = sorted(((word_id, self.score(word_id, at)) for word_id in candidates), key=lambda e: (-e[1], e[0]))
+        return ranked[: self.limit]
+
+
+def run_schedule(args: argparse.Namespace, times: Iterable[datetime]) -> int:
+    """build_today.py --at: print the predicted practice set at each time."""
+    # Imported here: event_store builds on build_today, which loads first.
+    from event_store import EventStore
+
+    modes = parse_modes(args.mode)
+    if modes is None:
+        print("ERROR: --mode must be en-tr, tr-en, or both")
+        return 2
+    rows = load_rows(args)
+    if rows is None:
+        return 2
+
+    aliases = load_aliases()
+    all_items = list(iter_items(load_vocab_files()))
+    taus = deck_taus(all_items, aliases)
+    items = filter_items(all_items, set(args.include_tag or []), set(args.exclude_tag or []))
+    selected = {canonical_id: taus[canonical_id] for canonical_id in group_by_canonical(items, aliases)}
+
+    states: dict[tuple[str, str], ScoreState] = {}
+    for timestamp, word_id, mode, correct in EventStore.from_rows(rows, aliases):
+        states.setdefault((word_id, mode), ScoreState()).fold(
+            timestamp, correct, DEFAULT_CONFIG.tau_wrong_days,
+            taus.get(word_id, DEFAULT_CONFIG.tau_right_default_days),
+        )
+
+    scheduler = PracticeScheduler(states, selected, modes, args.limit, datetime.now(tz=UTC))
+    for at in sorted(times):
+        if at < scheduler.now:
+            print(f"Skipping {at.isoformat()}: it is in the past")
+            continue
+        picked = scheduler.practice_set(at)
+        print(f"\n{at.isoformat()}: {len(picked)} word(s) "
+              f"(cutoff {scheduler.cutoff:.3f}, {scheduler.popped} crossing(s) so far)")
+        for word_id, score in picked:
+            print(f"  {word_id}: {score:.3f}")
+    if scheduler.rebases:
+        print(f"\nThe cutoff was reset {scheduler.rebases} time(s) as the set drained below --limit")
+    return 0
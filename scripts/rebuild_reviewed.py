@@ -2,42 +2,87 @@
 
 from __future__ import annotations
 
+import argparse
+import hashlib
 import json
 from pathlib import Path
 
+from build_manifest import BuildManifest, ParsedCache, content_hash, scripts
 
 ROOT = Path(__file__).resolve().parents[1]
 CANDIDATES_DIR = ROOT / "data" / "candidates"
 OUT_PATH = ROOT / "data" / "vocab" / "reviewed.json"
+ALIASES_PATH = ROOT / "data" / "aliases.json"
 
 
-def load_candidates() -> list[dict]:
+def candidate_files() -> list[Path]:
+    return sorted(CANDIDATES_DIR.glob("*.candidates.json"))
+
+
+def approved_items(data: dict) -> list[dict]:
+    """One candidate file's approved items, without scoring debris or session tags."""
     items: list[dict] = []
-    for path in sorted(CANDIDATES_DIR.glob("*.candidates.json")):
-        data = json.loads(path.read_text(encoding="utf-8"))
-        for item in data.get("items", []):
-            if item.get("status") != "approved":
-                continue
-            entry = dict(item)
-            entry.pop("today_score", None)
-            entry.pop("today_score_debug", None)
-            tags = entry.get("tags") or []
-            if tags:
-                entry["tags"] = [tag for tag in tags if tag not in ("practice", "today")]
-            items.append(entry)
+    for item in data.get("items", []):
+        if item.get("status") != "approved":
+            continue
+        entry = dict(item)
+        entry.pop("today_score", None)
+        entry.pop("today_score_debug", None)
+        tags = entry.get("tags") or []
+        if tags:
+            entry["tags"] = [tag for tag in tags if tag not in ("practice", "today")]
+        items.append(entry)
+    return items
+
+
+def parsed_cache() -> ParsedCache:
+    # Keyed by this file too: approved_items decides what a cached entry holds.
+    return ParsedCache(parser=content_hash(Path(__file__).resolve()))
+
+
+def load_candidates(cache: ParsedCache | None = None) -> list[dict]:
+    items: list[dict] = []
+    for path in candidate_files():
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        file_items = cache.get(path, digest) if cache is not None else None
+        if file_items is None:
+            file_items = approved_items(json.loads(raw.decode("utf-8")))
+            if cache is not None:
+                cache.put(path, digest, file_items)
+        items.extend(file_items)
     items.sort(key=lambda item: str(item.get("id", "")))
     return items
 
 
+def step_inputs() -> list[Path]:
+    # aliases.json too, though this step never reads it: dedupe_vocab --apply
+    # merges into reviewed.json in place, so a changed alias needs the
+    # unmerged file back first.
+    return [*candidate_files(), ALIASES_PATH, *scripts("rebuild_reviewed.py")]
+
+
 def main() -> int:
-    items = load_candidates()
+    parser = argparse.ArgumentParser(description="Merge the approved candidates into data/vocab/reviewed.json.")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if no input changed.")
+    args = parser.parse_args()
+
+    manifest = BuildManifest()
+    if not args.force and manifest.up_to_date("rebuild_reviewed", step_inputs(), [OUT_PATH]):
+        print(f"{OUT_PATH} is up to date")
+        return 0
+    # --force re-parses every file rather than trusting the cache.
+    cache = None if args.force else parsed_cache()
+    items = load_candidates(cache)
     payload = {"source": "reviewed", "items": items}
     OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
     OUT_PATH.write_text(
         json.dumps(payload, ensure_ascii=True, indent=2) + "\n",
         encoding="utf-8",
     )
-    print(f"Rebuilt {OUT_PATH} with {len(items)} items")
+    manifest.record("rebuild_reviewed", step_inputs(), [OUT_PATH])
+    parsed = len(candidate_files()) if cache is None else cache.misses
+    print(f"Rebuilt {OUT_PATH} with {len(items)} items ({parsed} of {len(candidate_files())} files parsed)")
     return 0
 
 
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""A local SQLite copy of the Supabase results table, kept current incrementally.
+
+load_results_supabase downloads the whole history, a thousand rows a request,
+on every run. The mirror holds it in resources/results_mirror.sqlite and asks
+Supabase only for what is new, with the same two markers app.js uses
+(refreshHistoryFromRemote) to notice the changes an incremental read misses:
+
+    rows answered at or after the newest answered_at held   <- the tail
+    the remote row count, and the newest created_at          <- the checks
+
+A count that differs from the mirror's (a deleted row, or an answer queued
+offline and synced with an old answered_at) triggers a full resync. So does a
+row created since the last sync that the tail did not bring in (a correction:
+delete plus reinsert, same count, old answered_at). app.js re-reads whenever
+created_at moves; counting the rows created since then, remotely and in the
+tail, is what lets the mirror tell an ordinary new answer from a correction.
+Both markers are read before the rows, so a row landing mid-sync is picked up
+next time rather than hidden.
+
+Rows are keyed on the table's id, so the inclusive tail read can overlap what is
+held without duplicating it.
+
+    .venv/bin/python scripts/build_today.py --mirror resources/results_mirror.sqlite
+    .venv/bin/python scripts/results_mirror.py            # just sync and report
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote
+
+from build_today import ROOT, parse_correct, parse_timestamp, supabase_config
+from event_store import to_micros
+from supabase_client import SupabaseClient
+
+DEFAULT_MIRROR_PATH = ROOT / "resources" / "results_mirror.sqlite"
+SCHEMA = """
+create table if not exists results (
+    id          integer primary key,
+    answered_at text    not null,
+    answered_us integer not null,
+    word_id     text    not null,
+    mode        text    not null,
+    correct     integer not null
+);
+create index if not exists results_answered_idx on results (answered_us, id);
+create table if not exists meta (key text primary key, value text not null);
+"""
+
+
+@dataclass
+class SyncReport:
+    fetched: int = 0
+    resynced: bool = False
+    reason: str = ""
+
+
+def _epoch_micros(value: str) -> int | None:
+    parsed = parse_timestamp(value)
+    return to_micros(parsed) if parsed else None
+
+
+RESULT_COLUMNS = "id,answered_at,created_at,word_id,mode,correct"
+
+
+def remote_total(client: SupabaseClient, written_after: str = "") -> int:
+    """Rows in the table, or only those created after `written_after`."""
+    return client.count("results", [f"created_at=gt.{quote(written_after)}"] if written_after else [])
+
+
+def remote_watermark(client: SupabaseClient) -> str:
+    """The newest created_at in the table, or "" when it is empty."""
+    rows = client.get_json("/rest/v1/results?select=created_at&order=created_at.desc&limit=1")
+    return str(rows[0].get("created_at") or "") if rows else ""
+
+
+def fetch_results(client: SupabaseClient, since: str | None = None) -> list[dict[str, Any]]:
+    """Raw rows with their ids, answered at or after `since` when given."""
+    filters = [f"answered_at=gte.{quote(since)}"] if since else []
+    return client.read_all("results", RESULT_COLUMNS, order=("answered_at", "id"), filters=filters)
+
+
+class ResultsMirror:
+    def __init__(self, path: Path = DEFAULT_MIRROR_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def count(self) -> int:
+        return self.db.execute("select count(*) from results").fetchone()[0]
+
+    def get_meta(self, key: str) -> str:
+        row = self.db.execute("select value from meta where key = ?", (key,)).fetchone()
+        return row[0] if row else ""
+
+    def set_meta(self, key: str, value: str) -> None:
+        self.db.execute("insert or replace into meta (key, value) values (?, ?)", (key, value))
+
+    def newest_answered(self) -> str | None:
+        row = self.db.execute("select answered_at from results order by answered_us desc, id desc limit 1").fetchone()
+        return row[0] if row else None
+
+    def upsert(self, raw_rows: list[dict[str, Any]]) -> int:
+        """Store rows as PostgREST returns them; a row already held is overwritten."""
+        records = []
+        for raw in raw_rows:
+            micros = _epoch_micros(str(raw.get("answered_at", "")))
+            correct = parse_correct(raw.get("correct"))
+            if raw.get("id") is None or micros is None or correct is None:
+                continue
+            records.append(
+                (int(raw["id"]), str(raw["answered_at"]), micros, str(raw.get("word_id", "")),
+                 str(raw.get("mode", "")), int(correct))
+            )
+        self.db.executemany(
+            "insert or replace into results (id, answered_at, answered_us, word_id, mode, correct) "
+            "values (?, ?, ?, ?, ?, ?)",
+            records,
+        )
+        return len(records)
+
+    def rows(self, since: str | None = None) -> list[dict[str, Any]]:
+        """Held rows in the pipeline's shape, oldest first; `since` is inclusive."""
+        query = "select answered_at, word_id, mode, correct from results"
+        params: tuple[Any, ...] = ()
+        floor = _epoch_micros(since) if since else None
+        if floor is not None:
+            query += " where answered_us >= ?"
+            params = (floor,)
+        query += " order by answered_us, id"
+        return [
+            {"timestamp": answered_at, "word_id": word_id, "mode": mode, "correct": bool(correct)}
+            for answered_at, word_id, mode, correct in self.db.execute(query, params)
+        ]
+
+    def sync(self, url: str, anon: str, secret: str) -> SyncReport:
+        with SupabaseClient(url, anon, secret) as client:
+            return self._sync(client)
+
+    def _sync(self, client: SupabaseClient) -> SyncReport:
+        report = SyncReport()
+        held_watermark = self.get_meta("created_at_watermark")
+        # Markers first, then rows: see the module docstring.
+        total = remote_total(client)
+        watermark = remote_watermark(client)
+        moved = bool(held_watermark) and _is_newer(watermark, held_watermark)
+        written = remote_total(client, held_watermark) if moved else 0
+
+        with self.db:
+            tail = fetch_results(client, self.newest_answered())
+            report.fetched = self.upsert(tail)
+            # Every row written since the last sync should have come in with the
+            # tail; one that did not was written below it.
+            in_tail = sum(1 for row in tail if _is_newer(str(row.get("created_at") or ""), held_watermark))
+            if self.count() != total:
+                report.reason = f"row count differs ({self.count()} held, {total} remote)"
+            elif not held_watermark and self.count() != report.fetched:
+                report.reason = "no baseline watermark yet"
+            elif written > in_tail:
+                report.reason = f"{written - in_tail} row(s) were written below the newest answered_at"
+            if report.reason:
+                self.db.execute("delete from results")
+                report.fetched = self.upsert(fetch_results(client))
+                report.resynced = True
+            self.set_meta("created_at_watermark", watermark)
+            self.set_meta("synced_at", datetime.now().astimezone().isoformat())
+        return report
+
+
+def _is_newer(candidate: str, reference: str) -> bool:
+    if not candidate:
+        return False
+    if not reference:
+        return True
+    new, old = parse_timestamp(candidate), parse_timestamp(reference)
+    return bool(new and old and new > old)
+
+
+def load_mirrored_rows(path: str | Path, since: str | None = None) -> list[dict[str, Any]] | None:
+    """Sync the mirror at `path` and return its rows; None (after saying why) on failure.
+
+    When Supabase cannot be reached the mirror is used as it stands, so offline
+    analysis still works from the last sync.
+    """
+    supabase = supabase_config()
+    mirror = ResultsMirror(Path(path))
+    try:
+        if supabase is None:
+            print("WARNING: Supabase is not configured; using the mirror as it stands")
+        else:
+            try:
+                report = mirror.sync(*supabase)
+            except Exception as exc:
+                if not mirror.count():
+                    print(f"ERROR: Failed to sync the results mirror: {exc}")
+                    return None
+                print(f"WARNING: Failed to sync the results mirror ({exc}); using the last sync")
+            else:
+                detail = f"full resync: {report.reason}" if report.resynced else "incremental"
+                print(f"Mirror synced: {report.fetched} row(s) fetched ({detail}), {mirror.count()} held")
+        return mirror.rows(since)
+    finally:
+        mirror.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Sync the local mirror of the Supabase results table.")
+    parser.add_argument("--mirror", default=str(DEFAULT_MIRROR_PATH), help="SQLite file (default: %(default)s).")
+    args = parser.parse_args()
+    rows = load_mirrored_rows(args.mirror)
+    if rows is None:
+        return 2
+    newest = rows[-1]["timestamp"] if rows else "none"
+    print(f"{len(rows)} row(s) in {args.mirror}, newest answered_at {newest}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Read a results export as a stream of records instead of one big string.
+
+load_text() read the whole file or HTTP body into memory, load_results() then
+turned every line into a dict, and only after that did event_stream() start.
+A history of a few million answers held the text, the dicts and the events at
+once. This reads the source a chunk at a time, decodes incrementally and
+yields one positional record per answer:
+
+    (timestamp, word_id, mode, correct)
+
+as raw values, so EventStore.from_records can dedupe and intern them straight
+away and nothing else per row is kept.
+
+Accepted, by content rather than file name:
+
+- CSV with a header row naming the four columns, in any order (the sheet's
+  export). Other columns are ignored.
+- A JSON array of row objects, decoded one element at a time.
+- NDJSON: one row object per line.
+- Any of those gzip-compressed, detected from the magic bytes.
+
+merge_records combines several sources, each already in time order, into one
+stream without sorting the lot, taking an answer found in more than one of
+them once.
+
+A JSON object wrapping the rows ({"rows": [...]} or {"items": [...]}) is
+still accepted, but has to be decoded whole; it is the one shape that does
+not stream.
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import heapq
+import io
+import json
+import urllib.request
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from itertools import chain
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator
+
+RECORD_FIELDS = ("timestamp", "word_id", "mode", "correct")
+CHUNK_CHARS = 1 << 16
+# How far back in a source an answer may arrive and still be merged in place:
+# one queued offline and synced later lands a few rows after its time.
+REORDER_WINDOW = 1024
+GZIP_MAGIC = b"\x1f\x8b"
+
+Record = tuple[Any, Any, Any, Any]
+# Sorts before any real answer.
+UNPARSED = datetime.min.replace(tzinfo=UTC)
+
+
+@contextmanager
+def open_source(source: str) -> Iterator[io.TextIOBase]:
+    """`source` (a path or an http(s) URL) as text, gunzipped when it is gzip."""
+    if source.startswith("http://") or source.startswith("https://"):
+        opened: BinaryIO = urllib.request.urlopen(source, timeout=30)
+    else:
+        opened = Path(source).open("rb")
+    with opened:
+        binary: BinaryIO = opened if hasattr(opened, "peek") else io.BufferedReader(opened)
+        if binary.peek(2)[:2] == GZIP_MAGIC:
+            binary = gzip.GzipFile(fileobj=binary)
+        # utf-8-sig: a spreadsheet saved by hand may start with a BOM, which
+        # would otherwise end up in the first header name.
+        yield io.TextIOWrapper(binary, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def iter_records(source: str) -> Iterator[Record]:
+    """Every row of `source` as (timestamp, word_id, mode, correct), in file order."""
+    with open_source(source) as text:
+        yield from records_from_text(text)
+
+
+def records_from_text(text: io.TextIOBase) -> Iterator[Record]:
+    """Records from a text stream, whichever format it turns out to be."""
+    chunks = iter(lambda: text.read(CHUNK_CHARS), "")
+    first = ""
+    for chunk in chunks:
+        first += chunk
+        if first.strip():
+            break
+    head = first.lstrip()[:1]
+    if not head:
+        return
+    stream = chain([first], chunks)
+    if head == "[":
+        yield from _records_from_rows(_iter_json_array(stream))
+    elif head == "{":
+        lines = (line for line in _lines(stream) if line.strip())
+        first_line = next(lines)
+        try:
+            row = json.loads(first_line)
+        except json.JSONDecodeError:
+            row = None
+        if isinstance(row, dict) and _wrapped_rows(row) is None:
+            yield from _records_from_rows(_iter_ndjson(chain([first_line], lines)))
+        else:
+            payload = json.loads(first_line + "".join(lines))
+            yield from _records_from_rows((_wrapped_rows(payload) or []) if isinstance(payload, dict) else [])
+    else:
+        yield from _records_from_csv(_lines(stream))
+
+
+def merge_records(streams: Iterable[Iterable[Record]], window: int = REORDER_WINDOW) -> Iterator[Record]:
+    """Several record streams, each about in time order, as one in time order.
+
+    A k-way heap merge: O(n log k) for n records from k sources, holding one
+    pending record per source plus each source's reorder buffer, never a
+    whole history. Every record's timestamp is parsed once here, with a
+    TimestampParser per source, and passed on as a datetime, so the store it
+    feeds does not parse it again. Equal times keep the order the sources
+    were given in, as concatenating them did.
+
+    A record further out of order than `window` still comes out, only out of
+    place; EventStore notices and sorts. Records whose time does not parse go
+    first and are rejected there as usual.
+
+    An answer present in several sources, as the sheet archive and its
+    migrated copy in Supabase are, comes out once: of the copies of one
+    (time, word_id, mode, correct), as many are kept as the source holding
+    the most of them has. A repeat within one source (a retried POST) still
+    reaches EventStore, which drops it and reports it as a duplicate of that
+    source, not of the overlap.
+    """
+    # Imported here: build_today imports this module.
+    from build_today import TimestampParser, parse_correct
+
+    def ordered(stream: Iterable[Record]) -> Iterator[tuple[datetime, Record]]:
+        parse = TimestampParser()
+        pending: list[tuple[datetime, int, Record]] = []
+        for sequence, (raw_ts, word_id, mode, correct) in enumerate(stream):
+            timestamp = parse(raw_ts)
+            record = (timestamp or raw_ts, word_id, mode, correct)
+            heapq.heappush(pending, (timestamp or UNPARSED, sequence, record))
+            if len(pending) > window:
+                key, _, record = heapq.heappop(pending)
+                yield key, record
+        while pending:
+            key, _, record = heapq.heappop(pending)
+            yield key, record
+
+    def tagged(source: int, stream: Iterable[Record]) -> Iterator[tuple[datetime, int, Record]]:
+        for key, record in ordered(stream):
+            yield key, source, record
+
+    # Copies of an answer all share its time, so only the current time's are counted.
+    current: datetime | None = None
+    # answer -> copies seen per source, and copies let through
+    seen: dict[tuple[Any, ...], dict[int, int]] = {}
+    kept: dict[tuple[Any, ...], int] = {}
+    merged = heapq.merge(*(tagged(source, stream) for source, stream in enumerate(streams)), key=lambda item: item[0])
+    for key, source, record in merged:
+        if key != current:
+            current = key
+            seen.clear()
+            kept.clear()
+        answer = (str(record[1]).strip(), str(record[2]).strip(), parse_correct(record[3]))
+        copies = seen.setdefault(answer, {})
+        copies[source] = copies.get(source, 0) + 1
+        if copies[source] <= kept.get(answer, 0):
+            continue  # the same answer, already taken from another source
+        kept[answer] = copies[source]
+        yield record
+
+
+def records_from_rows(rows: Iterable[dict[str, Any]]) -> Iterator[Record]:
+    """Records from row dicts, as load_results and the Supabase reader return them."""
+    return _records_from_rows(rows)
+
+
+def _records_from_rows(rows: Iterable[Any]) -> Iterator[Record]:
+    for row in rows:
+        if isinstance(row, dict):
+            yield (row.get("timestamp", ""), row.get("word_id", ""), row.get("mode", ""), row.get("correct", ""))
+
+
+def _wrapped_rows(payload: dict[str, Any]) -> list[Any] | None:
+    for key in ("rows", "items"):
+        if isinstance(payload.get(key), list):
+            return payload[key]
+    return None
+
+
+def _records_from_csv(lines: Iterable[str]) -> Iterator[Record]:
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    names = [name.strip() for name in header]
+    # A column the header lacks reads as "", which the parsers reject.
+    positions = [names.index(field) if field in names else None for field in RECORD_FIELDS]
+    for row in reader:
+        if not row:
+            continue  # DictReader skipped blank lines too
+        yield tuple(row[index] if index is not None and index < len(row) else "" for index in positions)
+
+
+def _lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Chunks re-cut at newlines, keeping them, as csv.reader wants its input."""
+    pending: list[str] = []
+    for chunk in chunks:
+        if "\n" not in chunk:
+            pending.append(chunk)  # a long line; joined once it ends
+            continue
+        first, *middle, last = chunk.split("\n")
+        yield "".join(pending) + first + "\n"
+        for line in middle:
+            yield line + "\n"
+        pending = [last] if last else []
+    if pending:
+        yield "".join(pending)
+
+
+def _iter_ndjson(lines: Iterable[str]) -> Iterator[Any]:
+    for number, line in enumerate(lines, start=1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"NDJSON line {number}: {exc}") from exc
+
+
+def _iter_json_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """The elements of a top-level JSON array, decoded as the text arrives."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    opened = False
+
+    for chunk in chunks:
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position >= len(buffer):
+                break
+            if not opened:
+                if buffer[position] != "[":
+                    raise ValueError("expected a JSON array")
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break  # the element runs on into the next chunk
+            if end == len(buffer) and not isinstance(value, (dict, list)):
+                break  # a bare number may continue past the chunk
+            yield value
+            position = end
+    if buffer[position:].strip():
+        raise ValueError("JSON array is truncated or malformed")
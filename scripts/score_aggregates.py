@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Score from per-word aggregates that Supabase folds, instead of from raw events.
+
+supabase/score_aggregates.sql folds the five numbers ScoreState holds for
+every (word, mode) inside Postgres, step for step as ScoreState.fold does.
+This asks for them and ranks the deck from the result, so the read is about
+two rows per deck word however long the history grows:
+
+    .venv/bin/python scripts/build_today.py --aggregates
+
+The database cannot see the deck's tags, so it is sent every right-answer tau
+the deck uses and returns one right sum per tau; each word then takes the sum
+for its own tau (deck_taus, as --state uses). The flat alias map goes along
+too, so answers land on the canonical id before they are folded.
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import UTC, datetime
+from typing import Any, Iterable
+
+from build_today import (
+    DEFAULT_CONFIG,
+    ScoreConfig,
+    apply_selection,
+    filter_items,
+    group_by_canonical,
+    iter_items,
+    load_aliases,
+    load_vocab_files,
+    parse_modes,
+    parse_timestamp,
+    supabase_config,
+)
+from score_state import ScoreState, deck_taus, rank_states
+from supabase_client import SupabaseClient
+
+AGGREGATE_COLUMNS = "word_id,mode,wrong,last_wrong,rights,last_right,total"
+
+
+def tau_columns(taus: dict[str, float], config: ScoreConfig = DEFAULT_CONFIG) -> list[float]:
+    """The distinct right-answer taus, in the order the RPC returns their sums."""
+    return sorted({*taus.values(), config.tau_right_default_days})
+
+
+def fetch_aggregates(
+    client: SupabaseClient,
+    columns: list[float],
+    aliases: dict[str, str],
+    config: ScoreConfig = DEFAULT_CONFIG,
+) -> list[dict[str, Any]]:
+    """The RPC's rows, one per (canonical id, mode) with any answers."""
+    return client.read_all(
+        "rpc/score_aggregates",
+        AGGREGATE_COLUMNS,
+        order=("word_id", "mode"),
+        body={"taus": columns, "tau_wrong": config.tau_wrong_days, "aliases": aliases},
+    )
+
+
+def states_from_aggregates(
+    rows: Iterable[dict[str, Any]],
+    taus: dict[str, float],
+    columns: list[float],
+    config: ScoreConfig = DEFAULT_CONFIG,
+) -> dict[tuple[str, str], ScoreState]:
+    """ScoreState per key, taking each word's right sum for its own tau."""
+    position = {tau: index for index, tau in enumerate(columns)}
+    states: dict[tuple[str, str], ScoreState] = {}
+    for row in rows:
+        word_id = str(row["word_id"])
+        index = position[taus.get(word_id, config.tau_right_default_days)]
+        # A key with no right answers has no sums at all.
+        rights = row.get("rights") or []
+        states[(word_id, str(row["mode"]))] = ScoreState(
+            wrong=float(row.get("wrong") or 0.0),
+            last_wrong=parse_timestamp(row.get("last_wrong") or ""),
+            right=float(rights[index]) if index < len(rights) else 0.0,
+            last_right=parse_timestamp(row.get("last_right") or ""),
+            total=int(row.get("total") or 0),
+        )
+    return states
+
+
+def run_with_aggregates(args: argparse.Namespace) -> int:
+    """build_today.py --aggregates: rank from the RPC's per-key states."""
+    modes = parse_modes(args.mode)
+    if modes is None:
+        print("ERROR: --mode must be en-tr, tr-en, or both")
+        return 2
+    supabase = supabase_config()
+    if supabase is None:
+        print("ERROR: --aggregates needs Supabase; add the keys under resources/access_keys/")
+        return 2
+
+    aliases = load_aliases()
+    vocab_files = load_vocab_files()
+    all_items = list(iter_items(vocab_files))
+    taus = deck_taus(all_items, aliases)
+    columns = tau_columns(taus)
+    try:
+        with SupabaseClient(*supabase) as client:
+            rows = fetch_aggregates(client, columns, aliases)
+    except Exception as exc:
+        print(f"ERROR: Failed to read score aggregates from Supabase: {exc}")
+        print("Hint: run supabase/score_aggregates.sql in the SQL editor first")
+        return 2
+    states = states_from_aggregates(rows, taus, columns)
+    print(f"Loaded aggregates for {len(states)} word/mode key(s) from Supabase")
+
+    items = filter_items(all_items, set(args.include_tag or []), set(args.exclude_tag or []))
+    scored = rank_states(states, taus, group_by_canonical(items, aliases), modes, datetime.now(tz=UTC))
+    return apply_selection(scored, vocab_files, items, aliases, args)
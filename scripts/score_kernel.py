@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Score every (word, mode) key at once with NumPy.
+
+compute_scores walks each key's events in Python, one math.exp per event. That
+is fine for one learner's practice set and slow for a stats run over the full
+history, or for many learners in a row. This computes the same numbers with a
+handful of array operations over columns:
+
+    epoch seconds (float64), word index (int32), mode index (uint16), correct (bool)
+
+It rests on the same identity as score_state.py: chaining decay() through a
+sorted history is a sum of exponentials,
+
+    wrongScore(now) = sum over wrong answers of exp(-(now - t) / tau_wrong)
+
+and likewise for rightScore with the word's own tau. A sum does not care about
+order, so the events need not be sorted or grouped first — bincount does the
+grouping. Agrees with compute_scores to within 1e-9; test_scoring_engines.py
+holds it to that.
+
+NumPy is optional: only --engine numpy and the callers that ask for this module
+need it.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable
+
+import numpy as np
+
+from build_today import DEFAULT_CONFIG, ScoreConfig
+from event_store import KNOWN_MODES, EventStore
+
+MODES = KNOWN_MODES
+MODE_INDEX = {mode: index for index, mode in enumerate(MODES)}
+
+
+def columns(
+    events: Iterable[tuple[datetime, str, str, bool]],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, list[str]]:
+    """event_stream() output as (epoch, word index, mode index, correct, words).
+
+    Events in a mode other than the two known ones are dropped; compute_scores
+    would never be asked for them either. An EventStore is already columnar and
+    is viewed in place rather than copied through Python objects.
+    """
+    if isinstance(events, EventStore):
+        return store_columns(events)
+    words: list[str] = []
+    word_index: dict[str, int] = {}
+    epoch: list[float] = []
+    word_ids: list[int] = []
+    mode_ids: list[int] = []
+    correct: list[bool] = []
+    for timestamp, word_id, mode, is_correct in events:
+        mode_id = MODE_INDEX.get(mode)
+        if mode_id is None:
+            continue
+        index = word_index.get(word_id)
+        if index is None:
+            index = word_index[word_id] = len(words)
+            words.append(word_id)
+        epoch.append(timestamp.timestamp())
+        word_ids.append(index)
+        mode_ids.append(mode_id)
+        correct.append(is_correct)
+    return (
+        np.asarray(epoch, dtype=np.float64),
+        np.asarray(word_ids, dtype=np.int32),
+        np.asarray(mode_ids, dtype=np.uint16),
+        np.asarray(correct, dtype=bool),
+        words,
+    )
+
+
+def store_columns(
+    store: EventStore,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, list[str]]:
+    count = len(store)
+    epoch = np.frombuffer(store.time, dtype=np.int64, count=count) / 1e6
+    word_ids = np.frombuffer(store.word, dtype=np.int32, count=count)
+    mode_ids = np.frombuffer(store.mode, dtype=np.uint16, count=count)
+    correct = np.unpackbits(
+        np.frombuffer(bytes(store.correct), dtype=np.uint8), count=count, bitorder="little"
+    ).astype(bool)
+    known = mode_ids < len(MODES)
+    if not known.all():
+        epoch, word_ids, mode_ids, correct = epoch[known], word_ids[known], mode_ids[known], correct[known]
+    return epoch, word_ids, mode_ids, correct, store.words
+
+
+def decayed_sums(
+    epoch: np.ndarray,
+    key: np.ndarray,
+    tau_days: np.ndarray,
+    now: float,
+    key_count: int,
+) -> np.ndarray:
+    """Per key, sum of exp(-(ref - t) / tau), with ref = max(now, newest event).
+
+    decay() refuses to grow a score when `now` precedes the last event, leaving
+    it as of that event instead. Measuring from whichever is later reproduces
+    that, rather than handing a future event a weight above one.
+    """
+    newest = np.full(key_count, -np.inf)
+    np.maximum.at(newest, key, epoch)
+    reference = np.maximum(newest, now)
+    delta_days = (reference[key] - epoch) / 86400.0
+    # decay() zeroes the score outright for a non-positive tau.
+    live = tau_days > 0
+    weights = np.where(live, np.exp(-delta_days / np.where(live, tau_days, 1.0)), 0.0)
+    return np.bincount(key, weights=weights, minlength=key_count)
+
+
+def score_columns(
+    epoch: np.ndarray,
+    word_ids: np.ndarray,
+    mode_ids: np.ndarray,
+    correct: np.ndarray,
+    tau_right_days: np.ndarray,
+    now: datetime,
+    config: ScoreConfig = DEFAULT_CONFIG,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(wrong, right, score, total) arrays of shape (words, modes).
+
+    `tau_right_days` holds one tau per word index. Keys with no events come out
+    as compute_scores([]) would: zero sums and the full novelty bonus.
+    """
+    word_count = len(tau_right_days)
+    key_count = word_count * len(MODES)
+    key = word_ids.astype(np.int64) * len(MODES) + mode_ids
+    now_epoch = now.timestamp()
+
+    wrong_mask = ~correct
+    wrong = decayed_sums(
+        epoch[wrong_mask],
+        key[wrong_mask],
+        np.full(int(wrong_mask.sum()), config.tau_wrong_days),
+        now_epoch,
+        key_count,
+    )
+    right = decayed_sums(
+        epoch[correct],
+        key[correct],
+        tau_right_days[word_ids[correct]],
+        now_epoch,
+        key_count,
+    )
+    total = np.bincount(key, minlength=key_count)
+    score = (
+        config.weight_wrong * wrong
+        - config.weight_right * right
+        + config.novelty_bonus / (1.0 + total)
+    )
+    shape = (word_count, len(MODES))
+    return wrong.reshape(shape), right.reshape(shape), score.reshape(shape), total.reshape(shape)
+
+
+def score_events(
+    events: Iterable[tuple[datetime, str, str, bool]],
+    taus: dict[str, float],
+    now: datetime,
+    config: ScoreConfig = DEFAULT_CONFIG,
+) -> dict[tuple[str, str], tuple[float, float, float]]:
+    """(wrong, right, score) per (word, mode) key that has events.
+
+    The dict-shaped counterpart of compute_scores, for callers that group by
+    key; words missing from `taus` use the default right-answer tau. `events`
+    is event_stream() output or an EventStore.
+    """
+    epoch, word_ids, mode_ids, correct, words = columns(events)
+    tau_right_days = np.asarray(
+        [taus.get(word_id, config.tau_right_default_days) for word_id in words],
+        dtype=np.float64,
+    )
+    wrong, right, score, total = score_columns(
+        epoch, word_ids, mode_ids, correct, tau_right_days, now, config
+    )
+    table: dict[tuple[str, str], tuple[float, float, float]] = {}
+    for word_index, mode_index in zip(*np.nonzero(total)):
+        table[(words[word_index], MODES[mode_index])] = (
+            float(wrong[word_index, mode_index]),
+            float(right[word_index, mode_index]),
+            float(score[word_index, mode_index]),
+        )
+    return table
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""A resident scoring process: load once, then answer top-N queries over HTTP.
+
+Each build_today.py run re-reads the vocab files, the aliases and the whole
+history before it can rank anything. This loads them once, folds the history
+into a StateStore, and then keeps it current from the events posted to it, so a
+query only decays the held five numbers per word to the present:
+
+    .venv/bin/python scripts/score_service.py --port 8765
+    curl 'localhost:8765/top?n=10&mode=both&include=unit-a2-5a'
+    curl -X POST localhost:8765/events -d '[{"timestamp": "2026-10-17T09:00:00Z",
+        "word_id": "...", "mode": "en-tr", "correct": false}]'
+
+GET /top takes n, mode (en-tr, tr-en or both) and repeatable include/exclude
+tags, with build_today.py's filter semantics; each distinct filter is resolved
+to its canonical ids once and remembered. POST /events takes the rows as
+results_schema describes them, one object each, and folds those newer than the
+newest event held; older ones are reported as stale rather than folded out of
+order. GET /health reports what is held.
+
+Scores use the deck-wide right-answer taus, as --state does (see deck_taus).
+It binds to localhost and has no authentication: it is for one machine.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+from datetime import UTC, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterable, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+from alias_table import AliasCycleError
+from build_today import (
+    DEFAULT_CONFIG,
+    ScoreConfig,
+    canonicalize,
+    group_by_canonical,
+    iter_items,
+    load_aliases,
+    load_rows,
+    load_vocab_files,
+    parse_modes,
+)
+from score_state import ScoreState, StateStore, deck_taus, fingerprint
+from tag_index import TagIndex
+
+# Distinct filters remembered; a tuning session rarely uses more than a handful.
+FILTER_CACHE_SIZE = 256
+
+
+class ScoreService:
+    """The deck and the folded history, behind a lock so requests can share it."""
+
+    def __init__(
+        self,
+        items: Iterable[dict[str, Any]],
+        aliases: dict[str, str],
+        config: ScoreConfig = DEFAULT_CONFIG,
+    ) -> None:
+        items = list(items)
+        self.aliases = aliases
+        self.config = config
+        self.taus = deck_taus(items, aliases, config)
+        # A filter keeps a canonical id when any item mapping to it passes, as
+        # filtering the items first would; ids come out in first-item order.
+        self.index = TagIndex(items)
+        self.canonical_of = [canonicalize(str(item.get("id", "")).strip(), aliases) for item in items]
+        self.words = list(group_by_canonical(items, aliases))
+        self.store = StateStore(fingerprint(config, aliases, self.taus))
+        self.lock = threading.Lock()
+        self._filters: dict[tuple[frozenset[str], frozenset[str]], list[str]] = {}
+
+    def ingest(self, rows: Iterable[dict[str, Any]]) -> tuple[int, int]:
+        """Fold raw result rows in. Returns (folded, stale)."""
+        # Imported here: event_store builds on build_today, which loads first.
+        from event_store import EventStore
+
+        events = EventStore.from_rows(rows, self.aliases)
+        with self.lock:
+            folded = self.store.fold(events, self.taus, self.config)
+        return folded, len(events) - folded
+
+    def matching(self, include: Iterable[str] = (), exclude: Iterable[str] = ()) -> list[str]:
+        """Canonical ids with at least one item carrying every include tag and no exclude tag."""
+        key = (frozenset(include), frozenset(exclude))
+        cached = self._filters.get(key)
+        if cached is not None:
+            return cached
+        ids = list(
+            dict.fromkeys(
+                self.canonical_of[position]
+                for position in self.index.select(*key)
+                if self.canonical_of[position] in self.taus
+            )
+        )
+        if len(self._filters) >= FILTER_CACHE_SIZE:
+            self._filters.pop(next(iter(self._filters)))
+        self._filters[key] = ids
+        return ids
+
+    def top(
+        self,
+        limit: int,
+        modes: Sequence[str],
+        include: Iterable[str] = (),
+        exclude: Iterable[str] = (),
+        now: datetime | None = None,
+    ) -> list[tuple[str, float]]:
+        """The best `limit` (id, score) pairs under the filter, as build_today.py ranks them."""
+        now = now or datetime.now(tz=UTC)
+        empty = ScoreState()
+        states = self.store.states
+        scored: list[tuple[str, float]] = []
+        with self.lock:
+            for canonical_id in self.matching(include, exclude):
+                tau_right_days = self.taus[canonical_id]
+                scores = [
+                    states.get((canonical_id, mode), empty).score(now, self.config, tau_right_days)[2]
+                    for mode in modes
+                ]
+                scored.append((canonical_id, max(scores) if scores else 0.0))
+        scored.sort(key=lambda entry: (-entry[1], entry[0]))
+        return scored[: max(0, limit)]
+
+    def health(self) -> dict[str, Any]:
+        watermark = self.store.watermark
+        return {
+            "words": len(self.words),
+            "events": self.store.events,
+            "keys": len(self.store.states),
+            "watermark": watermark.isoformat() if watermark else None,
+        }
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    service: ScoreService
+
+    def reply(self, status: int, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=True).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server's naming
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/health":
+            self.reply(200, self.service.health())
+            return
+        if url.path != "/top":
+            self.reply(404, {"error": f"no route {url.path}"})
+            return
+        modes = parse_modes(query.get("mode", ["en-tr"])[0])
+        if modes is None:
+            self.reply(400, {"error": "mode must be en-tr, tr-en, or both"})
+            return
+        try:
+            limit = int(query.get("n", ["30"])[0])
+        except ValueError:
+            self.reply(400, {"error": "n must be an integer"})
+            return
+        now = datetime.now(tz=UTC)
+        picked = self.service.top(limit, modes, query.get("include", []), query.get("exclude", []), now)
+        self.reply(
+            200,
+            {
+                "now": now.isoformat(),
+                "mode": list(modes),
+                "items": [{"id": word_id, "score": score} for word_id, score in picked],
+            },
+        )
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server's naming
+        if urlsplit(self.path).path != "/events":
+            self.reply(404, {"error": f"no route {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # A negative length would read until the client hangs up.
+            self.reply(400, {"error": "Content-Length must be a non-negative integer"})
+            return
+        try:
+            rows = json.loads(self.rfile.read(length) or b"[]")
+        except json.JSONDecodeError as exc:
+            self.reply(400, {"error": f"body is not JSON: {exc}"})
+            return
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            self.reply(400, {"error": "body must be a result row or a list of them"})
+            return
+        folded, stale = self.service.ingest(rows)
+        self.reply(200, {"folded": folded, "stale": stale, **self.service.health()})
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        if os.environ.get("SCORE_SERVICE_VERBOSE"):
+            super().log_message(format, *args)
+
+
+def make_server(service: ScoreService, host: str, port: int) -> ThreadingHTTPServer:
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve top-N practice sets from an in-memory score state.")
+    parser.add_argument(
+        "--results",
+        default=os.environ.get("RESULTS_SOURCE", "").strip(),
+        help="CSV/JSON source path or URL (or RESULTS_SOURCE env); Supabase when configured.",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8765, help="Port to bind (default: 8765).")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    rows = load_rows(args)
+    if rows is None:
+        return 2
+
+    try:
+        aliases = load_aliases()
+    except AliasCycleError as exc:
+        print(f"ERROR: {exc}")
+        return 1
+    service = ScoreService(iter_items(load_vocab_files()), aliases)
+    folded, _ = service.ingest(rows)
+    print(f"Holding {folded} events over {len(service.words)} words")
+
+    server = make_server(service, args.host, args.port)
+    print(f"Serving on http://{args.host}:{server.server_address[1]} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
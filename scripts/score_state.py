@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Per-word scoring state that folds one event at a time.
+
+Decay composes exactly, so a (word, mode) history reduces to five numbers —
+wrongScore, lastWrong, rightScore, lastRight, totalEvents — and the next answer
+only has to be folded into them. `compute_scores` replays the whole list every
+run; this keeps the five numbers on disk between runs, with a watermark, so a
+run costs time in proportion to the answers given since the last one.
+
+    .venv/bin/python scripts/build_today.py --state resources/score_state.json
+
+The state is only valid for the aliases and taus it was folded under, since
+both decide which sum an event lands in and how fast it fades. Those are
+fingerprinted, and a mismatch rebuilds the state from the full history.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Iterable
+
+from build_today import (
+    DEFAULT_CONFIG,
+    SUPABASE_SOURCE,
+    ScoreConfig,
+    apply_selection,
+    decay,
+    event_stream,
+    filter_items,
+    group_by_canonical,
+    iter_items,
+    load_aliases,
+    load_rows,
+    load_vocab_files,
+    parse_modes,
+    reads_file_source,
+    representative,
+    results_sources,
+    tau_right_for,
+)
+
+STATE_VERSION = 1
+
+
+@dataclass
+class ScoreState:
+    """The five numbers a (word, mode) history reduces to.
+
+    Scores are held as of their own last event, not as of now: decaying to the
+    present happens in score(), so folding never depends on the clock.
+    """
+
+    wrong: float = 0.0
+    last_wrong: datetime | None = None
+    right: float = 0.0
+    last_right: datetime | None = None
+    total: int = 0
+
+    def fold(
+        self,
+        timestamp: datetime,
+        correct: bool,
+        tau_wrong_days: float,
+        tau_right_days: float,
+    ) -> None:
+        # Step for step what compute_scores does inside its loop, so folding the
+        # same events in the same order gives bit-identical numbers.
+        self.total += 1
+        if correct:
+            if self.last_right:
+                self.right = decay(self.right, self.last_right, timestamp, tau_right_days)
+            self.right += 1.0
+            self.last_right = timestamp
+        else:
+            if self.last_wrong:
+                self.wrong = decay(self.wrong, self.last_wrong, timestamp, tau_wrong_days)
+            self.wrong += 1.0
+            self.last_wrong = timestamp
+
+    def score(
+        self,
+        now: datetime,
+        config: ScoreConfig,
+        tau_right_days: float,
+    ) -> tuple[float, float, float]:
+        """(wrong, right, score) as of `now` — the same triple compute_scores returns."""
+        wrong_score = self.wrong
+        right_score = self.right
+        if self.last_wrong:
+            wrong_score = decay(wrong_score, self.last_wrong, now, config.tau_wrong_days)
+        if self.last_right:
+            right_score = decay(right_score, self.last_right, now, tau_right_days)
+        novelty_bonus = config.novelty_bonus / (1.0 + self.total)
+        score = (
+            config.weight_wrong * wrong_score
+            - config.weight_right * right_score
+            + novelty_bonus
+        )
+        return wrong_score, right_score, score
+
+    def to_json(self) -> list[Any]:
+        return [
+            self.wrong,
+            self.last_wrong.isoformat() if self.last_wrong else None,
+            self.right,
+            self.last_right.isoformat() if self.last_right else None,
+            self.total,
+        ]
+
+    @classmethod
+    def from_json(cls, raw: list[Any]) -> ScoreState:
+        wrong, last_wrong, right, last_right, total = raw
+        return cls(
+            wrong=float(wrong),
+            last_wrong=datetime.fromisoformat(last_wrong) if last_wrong else None,
+            right=float(right),
+            last_right=datetime.fromisoformat(last_right) if last_right else None,
+            total=int(total),
+        )
+
+
+def deck_taus(
+    items: Iterable[dict[str, Any]],
+    aliases: dict[str, str],
+    config: ScoreConfig = DEFAULT_CONFIG,
+) -> dict[str, float]:
+    """canonical id -> right-answer tau, taken from the whole deck.
+
+    run_with_events picks the representative among the *filtered* items; a stored
+    state cannot depend on the filter, so it uses the unfiltered deck. The two
+    only differ for an alias whose frequency tags disagree with its canonical's.
+    """
+    return {
+        canonical_id: tau_right_for(
+            representative(canonical_id, grouped).get("tags", []) or [], config
+        )
+        for canonical_id, grouped in group_by_canonical(items, aliases).items()
+    }
+
+
+def fingerprint(config: ScoreConfig, aliases: dict[str, str], taus: dict[str, float]) -> str:
+    payload = json.dumps(
+        {
+            "tau_wrong_days": config.tau_wrong_days,
+            "tau_right_default_days": config.tau_right_default_days,
+            "aliases": aliases,
+            "taus": taus,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class StateStore:
+    """ScoreState per (canonical id, mode), plus how far into the history it reaches.
+
+    `watermark` is the newest answered_at folded in. Events sharing that exact
+    timestamp are remembered in `boundary`, so a read that starts *at* the
+    watermark can skip the ones already counted without dropping a new one
+    that happens to share the second.
+    """
+
+    def __init__(self, fingerprint: str) -> None:
+        self.fingerprint = fingerprint
+        self.states: dict[tuple[str, str], ScoreState] = {}
+        self.watermark: datetime | None = None
+        self.boundary: set[tuple[str, str, bool]] = set()
+        self.events = 0
+
+    @classmethod
+    def load(cls, path: Path) -> StateStore | None:
+        if not path.exists():
+            return None
+        raw = json.loads(path.read_text(encoding="utf-8"))
+        if not isinstance(raw, dict) or raw.get("version") != STATE_VERSION:
+            return None
+        store = cls(str(raw.get("fingerprint", "")))
+        watermark = raw.get("watermark")
+        store.watermark = datetime.fromisoformat(watermark) if watermark else None
+        store.boundary = {(word_id, mode, bool(correct)) for word_id, mode, correct in raw.get("boundary", [])}
+        store.events = int(raw.get("events", 0))
+        for word_id, mode, *state in raw.get("states", []):
+            store.states[(word_id, mode)] = ScoreState.from_json(state)
+        return store
+
+    def save(self, path: Path) -> None:
+        payload = {
+            "version": STATE_VERSION,
+            "fingerprint": self.fingerprint,
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+            "boundary": sorted([word_id, mode, correct] for word_id, mode, correct in self.boundary),
+            "events": self.events,
+            "states": [
+                [word_id, mode, *state.to_json()]
+                for (word_id, mode), state in sorted(self.states.items())
+            ],
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload, ensure_ascii=True), encoding="utf-8")
+
+    def is_held(self, timestamp: datetime, word_id: str, mode: str, correct: bool) -> bool:
+        if self.watermark is None or timestamp > self.watermark:
+            return False
+        if timestamp < self.watermark:
+            return True
+        return (word_id, mode, correct) in self.boundary
+
+    def fold(
+        self,
+        events: Iterable[tuple[datetime, str, str, bool]],
+        taus: dict[str, float],
+        config: ScoreConfig = DEFAULT_CONFIG,
+    ) -> int:
+        """Fold events newer than the watermark, in order. Returns how many were new.
+
+        `events` must be sorted by time, as event_stream returns them; anything
+        at or below the watermark is taken to be held already.
+        """
+        folded = 0
+        for timestamp, word_id, mode, correct in events:
+            if self.is_held(timestamp, word_id, mode, correct):
+                continue
+            state = self.states.get((word_id, mode))
+            if state is None:
+                state = self.states[(word_id, mode)] = ScoreState()
+            state.fold(
+                timestamp,
+                correct,
+                config.tau_wrong_days,
+                taus.get(word_id, config.tau_right_default_days),
+            )
+            if self.watermark is None or timestamp > self.watermark:
+                self.watermark = timestamp
+                self.boundary = set()
+            self.boundary.add((word_id, mode, correct))
+            self.events += 1
+            folded += 1
+        return folded
+
+
+def rank_states(
+    states: dict[tuple[str, str], ScoreState],
+    taus: dict[str, float],
+    canonical_ids: Iterable[str],
+    modes: tuple[str, ...],
+    now: datetime,
+    config: ScoreConfig = DEFAULT_CONFIG,
+) -> list[tuple[str, float]]:
+    """(canonical id, best score over `modes`) from held states, as score_canonicals gives it."""
+    empty = ScoreState()
+    scored: list[tuple[str, float]] = []
+    for canonical_id in canonical_ids:
+        tau_right_days = taus.get(canonical_id, config.tau_right_default_days)
+        scores = [states.get((canonical_id, mode), empty).score(now, config, tau_right_days)[2] for mode in modes]
+        scored.append((canonical_id, max(scores) if scores else 0.0))
+    return scored
+
+
+def run_with_state(args: argparse.Namespace) -> int:
+    """build_today.py --state: score from the stored state plus whatever is new."""
+    modes = parse_modes(args.mode)
+    if modes is None:
+        print("ERROR: --mode must be en-tr, tr-en, or both")
+        return 2
+
+    aliases = load_aliases()
+    vocab_files = load_vocab_files()
+    all_items = list(iter_items(vocab_files))
+    taus = deck_taus(all_items, aliases)
+    current = fingerprint(DEFAULT_CONFIG, aliases, taus)
+
+    path = Path(args.state)
+    store = None if args.rebuild_state else StateStore.load(path)
+    if store is not None and store.fingerprint != current:
+        print("Stored state was folded under different aliases or taus; rebuilding it")
+        store = None
+    if store is None:
+        store = StateStore(current)
+
+    # Only Supabase and the --mirror can be asked for the tail, also when
+    # "supabase" is one of several --results; every other source returns the
+    # full history, which at least lets us check nothing changed underneath.
+    since = store.watermark.isoformat() if store.watermark else None
+    remote = not reads_file_source(args) or SUPABASE_SOURCE in results_sources(args)
+    incremental = since is not None and remote
+    rows = load_rows(args, since=since)
+    if rows is None:
+        return 2
+    events = event_stream(rows, aliases)
+
+    if not incremental and store.watermark is not None:
+        held = sum(1 for ts, word_id, mode, correct in events if store.is_held(ts, word_id, mode, correct))
+        if held != store.events:
+            # A row back-dated below the watermark, or one deleted: the tail
+            # alone cannot express either, so start over from what was read.
+            print(f"History below the watermark changed ({store.events} held, {held} read); rebuilding")
+            store = StateStore(current)
+
+    folded = store.fold(events, taus)
+    store.save(path)
+    watermark = store.watermark.isoformat() if store.watermark else "none"
+    print(f"Folded {folded} new event(s); {store.events} held in {len(store.states)} keys (watermark {watermark})")
+    if incremental:
+        print("Note: a row back-dated below the watermark is not seen; use --rebuild-state to catch it")
+
+    items = filter_items(
+        all_items,
+        set(args.include_tag or []),
+        set(args.exclude_tag or []),
+    )
+    scored = rank_states(store.states, taus, group_by_canonical(items, aliases), modes, datetime.now(tz=UTC))
+    return apply_selection(scored, vocab_files, items, aliases, args)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""Score the deck under many ScoreConfigs in one pass over the history.
+
+Tuning used to mean editing MY_CONFIG in stats_analysis.py and re-running the
+cells, each of which rescans every event per word. Most of a config does not
+touch the events at all: the weights and the novelty bonus only combine the
+decayed counts. The counts depend on the taus alone, so one pass accumulates
+them for every distinct tau in the grid, and each config is then a cheap
+combination of numbers already summed.
+
+    .venv/bin/python scripts/score_sweep.py --tau-wrong 14 21 28 \\
+        --weight-wrong 1 1.5 2 --novelty-bonus 0.5 1 --limit 10
+
+The counts are summed as exponentials measured from `now` (see score_kernel.py
+for why that equals chaining decay()), so they agree with compute_scores to
+floating-point error, not bit for bit.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import math
+import os
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any, Iterable, Sequence
+
+from alias_table import AliasCycleError
+from build_today import (
+    DEFAULT_CONFIG,
+    ScoreConfig,
+    filter_items,
+    group_by_canonical,
+    iter_items,
+    load_aliases,
+    load_rows,
+    load_vocab_files,
+    parse_modes,
+    representative,
+    tau_right_for,
+)
+
+
+@dataclass(frozen=True)
+class SweepResult:
+    config: ScoreConfig
+    top_ids: list[str]
+    scores: dict[str, float]
+
+
+def config_grid(
+    tau_wrong_days: Sequence[float] = (DEFAULT_CONFIG.tau_wrong_days,),
+    tau_right_by_freq: Sequence[dict[str, float]] = (DEFAULT_CONFIG.tau_right_by_freq,),
+    weight_wrong: Sequence[float] = (DEFAULT_CONFIG.weight_wrong,),
+    weight_right: Sequence[float] = (DEFAULT_CONFIG.weight_right,),
+    novelty_bonus: Sequence[float] = (DEFAULT_CONFIG.novelty_bonus,),
+    tau_right_default_days: float = DEFAULT_CONFIG.tau_right_default_days,
+) -> list[ScoreConfig]:
+    """Every combination of the given values, DEFAULT_CONFIG's where none are given."""
+    return [
+        ScoreConfig(
+            tau_wrong_days=tau_wrong,
+            tau_right_default_days=tau_right_default_days,
+            tau_right_by_freq=dict(by_freq),
+            weight_wrong=w_wrong,
+            weight_right=w_right,
+            novelty_bonus=bonus,
+        )
+        for tau_wrong, by_freq, w_wrong, w_right, bonus in itertools.product(
+            tau_wrong_days, tau_right_by_freq, weight_wrong, weight_right, novelty_bonus
+        )
+    ]
+
+
+def deck_tags(items: Iterable[dict[str, Any]], aliases: dict[str, str]) -> dict[str, set[str]]:
+    """canonical id -> the tags of the item that represents it, as run_with_events picks it."""
+    return {
+        canonical_id: set(representative(canonical_id, grouped).get("tags", []) or [])
+        for canonical_id, grouped in group_by_canonical(items, aliases).items()
+    }
+
+
+def sweep(
+    events: Iterable[tuple[datetime, str, str, bool]],
+    deck: dict[str, set[str]],
+    configs: Sequence[ScoreConfig],
+    modes: Sequence[str],
+    now: datetime,
+    limit: int,
+) -> list[SweepResult]:
+    """Top `limit` of `deck` under each config, from a single pass over `events`.
+
+    `events` is event_stream() output or an EventStore; events for words outside
+    the deck are skipped. A word's final score is its best over `modes`, as in
+    build_today.py.
+    """
+    wanted_modes = set(modes)
+    wrong_taus = sorted({config.tau_wrong_days for config in configs})
+    # Per word, the right-answer taus some config in the grid would give it.
+    right_taus = {
+        word_id: sorted({tau_right_for(tags, config) for config in configs})
+        for word_id, tags in deck.items()
+    }
+
+    now_days = now.timestamp() / 86400.0
+    wrong_sums: dict[tuple[str, str], list[float]] = {}
+    right_sums: dict[tuple[str, str], list[float]] = {}
+    totals: dict[tuple[str, str], int] = {}
+    newest: dict[tuple[str, str, bool], float] = {}
+    for timestamp, word_id, mode, correct in events:
+        taus = right_taus.get(word_id)
+        if taus is None or mode not in wanted_modes:
+            continue
+        key = (word_id, mode)
+        days = timestamp.timestamp() / 86400.0
+        age = now_days - days
+        totals[key] = totals.get(key, 0) + 1
+        newest[(word_id, mode, correct)] = max(days, newest.get((word_id, mode, correct), days))
+        if correct:
+            sums = right_sums.setdefault(key, [0.0] * len(taus))
+        else:
+            taus = wrong_taus
+            sums = wrong_sums.setdefault(key, [0.0] * len(taus))
+        for index, tau in enumerate(taus):
+            if tau > 0:
+                sums[index] += math.exp(-age / tau)
+
+    # decay() never grows a score, so when `now` precedes a key's newest event
+    # the count stays as of that event: shift the sum forward to it.
+    for (word_id, mode, correct), days in newest.items():
+        if days <= now_days:
+            continue
+        taus = right_taus[word_id] if correct else wrong_taus
+        sums = (right_sums if correct else wrong_sums)[(word_id, mode)]
+        for index, tau in enumerate(taus):
+            if tau > 0:
+                sums[index] *= math.exp((now_days - days) / tau)
+
+    wrong_slot = {tau: index for index, tau in enumerate(wrong_taus)}
+    no_sums = [0.0] * max(len(wrong_taus), max((len(taus) for taus in right_taus.values()), default=0))
+    results: list[SweepResult] = []
+    for config in configs:
+        w_slot = wrong_slot[config.tau_wrong_days]
+        scores: dict[str, float] = {}
+        for word_id, tags in deck.items():
+            r_slot = right_taus[word_id].index(tau_right_for(tags, config))
+            best = None
+            for mode in modes:
+                key = (word_id, mode)
+                score = (
+                    config.weight_wrong * wrong_sums.get(key, no_sums)[w_slot]
+                    - config.weight_right * right_sums.get(key, no_sums)[r_slot]
+                    + config.novelty_bonus / (1.0 + totals.get(key, 0))
+                )
+                best = score if best is None else max(best, score)
+            scores[word_id] = best if best is not None else 0.0
+        ranked = sorted(scores.items(), key=lambda entry: (-entry[1], entry[0]))
+        results.append(SweepResult(config, [word_id for word_id, _ in ranked[: max(0, limit)]], scores))
+    return results
+
+
+def overlap(first: Sequence[str], second: Sequence[str]) -> float:
+    """Share of the top-N two configs agree on: 1.0 is the same set, 0.0 disjoint."""
+    size = max(len(first), len(second))
+    return len(set(first) & set(second)) / size if size else 1.0
+
+
+def overlap_matrix(results: Sequence[SweepResult]) -> list[list[float]]:
+    return [[overlap(a.top_ids, b.top_ids) for b in results] for a in results]
+
+
+def describe(config: ScoreConfig) -> str:
+    by_freq = ",".join(f"{tag.removeprefix('freq-')}:{tau:g}" for tag, tau in sorted(config.tau_right_by_freq.items()))
+    return (
+        f"tau_wrong={config.tau_wrong_days:g} tau_right={config.tau_right_default_days:g}[{by_freq}] "
+        f"w_wrong={config.weight_wrong:g} w_right={config.weight_right:g} novelty={config.novelty_bonus:g}"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare top-N selections across a grid of ScoreConfigs.")
+    parser.add_argument(
+        "--results",
+        default=os.environ.get("RESULTS_SOURCE", "").strip(),
+        help="CSV/JSON source path or URL (or RESULTS_SOURCE env); Supabase when configured.",
+    )
+    parser.add_argument("--mode", default="en-tr", help="en-tr, tr-en, or both (default: en-tr).")
+    parser.add_argument("--limit", type=int, default=30, help="Size of each top-N set (default: 30).")
+    parser.add_argument("--include-tag", action="append", default=[], help="Only items with this tag.")
+    parser.add_argument("--exclude-tag", action="append", default=[], help="Drop items with this tag.")
+    parser.add_argument("--tau-wrong", type=float, nargs="+", default=[DEFAULT_CONFIG.tau_wrong_days])
+    parser.add_argument(
+        "--tau-right-scale",
+        type=float,
+        nargs="+",
+        default=[1.0],
+        help="Multiply every right-answer tau (default and per-frequency) by each value.",
+    )
+    parser.add_argument("--weight-wrong", type=float, nargs="+", default=[DEFAULT_CONFIG.weight_wrong])
+    parser.add_argument("--weight-right", type=float, nargs="+", default=[DEFAULT_CONFIG.weight_right])
+    parser.add_argument("--novelty-bonus", type=float, nargs="+", default=[DEFAULT_CONFIG.novelty_bonus])
+    return parser.parse_args()
+
+
+def main() -> int:
+    # Imported here: event_store builds on build_today, which this CLI loads first.
+    from event_store import EventStore
+
+    args = parse_args()
+    modes = parse_modes(args.mode)
+    if modes is None:
+        print("ERROR: --mode must be en-tr, tr-en, or both")
+        return 2
+
+    configs = [
+        config
+        for scale in args.tau_right_scale
+        for config in config_grid(
+            tau_wrong_days=args.tau_wrong,
+            tau_right_by_freq=[{tag: tau * scale for tag, tau in DEFAULT_CONFIG.tau_right_by_freq.items()}],
+            weight_wrong=args.weight_wrong,
+            weight_right=args.weight_right,
+            novelty_bonus=args.novelty_bonus,
+            tau_right_default_days=DEFAULT_CONFIG.tau_right_default_days * scale,
+        )
+    ]
+
+    rows = load_rows(args)
+    if rows is None:
+        return 2
+    try:
+        aliases = load_aliases()
+    except AliasCycleError as exc:
+        print(f"ERROR: {exc}")
+        return 1
+    events = EventStore.from_rows(rows, aliases)
+    items = filter_items(
+        list(iter_items(load_vocab_files())),
+        set(args.include_tag or []),
+        set(args.exclude_tag or []),
+    )
+    deck = deck_tags(items, aliases)
+
+    results = sweep(events, deck, configs, modes, datetime.now(tz=UTC), args.limit)
+    baseline = results[0].top_ids
+    print(f"Swept {len(configs)} config(s) over {len(events)} events and {len(deck)} words\n")
+    print("overlap with the first config, then the config:")
+    for result in results:
+        print(f"  {overlap(baseline, result.top_ids):5.2f}  {describe(result.config)}")
+
+    if len(results) > 1:
+        matrix = overlap_matrix(results)
+        pairs = [matrix[i][j] for i in range(len(results)) for j in range(i + 1, len(results))]
+        print(f"\nPairwise overlap: mean {sum(pairs) / len(pairs):.2f}, min {min(pairs):.2f}")
+        # Words every config picks are the robust core; the rest is what tuning moves.
+        core = set.intersection(*(set(result.top_ids) for result in results))
+        print(f"In every top-{args.limit}: {len(core)} word(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,7 @@
 # %%
 from __future__ import annotations
 
+import argparse
 from collections import defaultdict
 from datetime import UTC, datetime
 from pathlib import Path
@@ -8,22 +9,25 @@ import json
 import os
 import re
 
+from alias_table import AliasCycleError
 from build_today import (
     DEFAULT_CONFIG,
     ScoreConfig,
     build_results_csv_url,
     canonicalize,
     compute_scores,
-    duplicate_rows,
-    event_stream,
     filter_items,
     load_aliases,
     load_results,
+    load_rows,
     load_results_supabase,
     read_api_key,
     resolve_results_source,
     supabase_config,
 )
+from compact_results import Snapshot, resume
+from event_store import EventStore, IngestReport
+from results_mirror import load_mirrored_rows
 
 ROOT = Path(__file__).resolve().parents[1]
 API_KEY_PATH = ROOT / "resources" / "access_keys" / "personal_key.txt"
@@ -51,6 +55,13 @@ def resolve_results_source_with_key() -> str:
 
 RESULTS_SOURCE = resolve_results_source_with_key()
 
+# --results on the command line, repeatable, merges those histories in time
+# order instead (say the sheet archive and "supabase"); see merged_records.
+# parse_known_args, because a notebook kernel passes arguments of its own.
+_cli = argparse.ArgumentParser(add_help=False)
+_cli.add_argument("--results", action="append", default=[])
+RESULTS_SOURCES: list[str] = _cli.parse_known_args()[0].results
+
 # %%
 # Filter settings for scoring subsets.
 INCLUDE_TAGS = ["verb"][:0]
@@ -59,10 +70,18 @@ MODE = ["tr-en", "en-tr"][1]
 
 # %%
 # Load aliases and results.
-aliases = load_aliases()
+try:
+    aliases = load_aliases()
+except AliasCycleError as exc:
+    raise SystemExit(f"ERROR: {exc}")
 results_source = RESULTS_SOURCE
 
-if not results_source and not supabase_config():
+if (
+    not RESULTS_SOURCES
+    and not results_source
+    and not supabase_config()
+    and not os.environ.get("RESULTS_MIRROR", "").strip()
+):
     raise ValueError(
         "No results source found. Configure Supabase in resources/access_keys/ "
         "(supabase_url.txt, supabase_anon_key.txt, supabase_app_secret.txt), set "
@@ -71,24 +90,48 @@ if not results_source and not supabase_config():
 
 # Supabase is the live backend; the sheet is a frozen archive, so only fall back
 # to it when Supabase is not configured (or RESULTS_SOURCE forces a source).
+# RESULTS_MIRROR names a local SQLite mirror (see results_mirror.py): it is synced
+# incrementally and then read locally, and still works offline.
+# RESULTS_SNAPSHOT names a snapshot from compact_results.py: only the rows after
+# its cutoff are read, and scores resume from the snapshot. The cells that list
+# events then see that tail only.
 _supabase = supabase_config()
-if _supabase and not os.environ.get("RESULTS_SOURCE", "").strip():
-    rows = load_results_supabase(*_supabase)
+_mirror = os.environ.get("RESULTS_MIRROR", "").strip()
+_snapshot_path = os.environ.get("RESULTS_SNAPSHOT", "").strip()
+snapshot = Snapshot.load(Path(_snapshot_path)) if _snapshot_path else None
+_since = snapshot.cutoff.isoformat() if snapshot else None
+if RESULTS_SOURCES:
+    rows = load_rows(argparse.Namespace(results=RESULTS_SOURCES, mirror=_mirror), since=_since)
+    if rows is None:
+        raise ValueError(f"Could not read {', '.join(RESULTS_SOURCES)}")
+    print(f"Loaded {len(rows)} result rows from {len(RESULTS_SOURCES)} source(s)")
+elif _mirror and not os.environ.get("RESULTS_SOURCE", "").strip():
+    rows = load_mirrored_rows(_mirror, since=_since)
+    if rows is None:
+        raise ValueError(f"Could not read the results mirror {_mirror}")
+    print(f"Loaded {len(rows)} result rows from the mirror")
+elif _supabase and not os.environ.get("RESULTS_SOURCE", "").strip():
+    rows = load_results_supabase(*_supabase, since=_since)
     print(f"Loaded {len(rows)} result rows from Supabase")
 else:
     rows = load_results(results_source)
     print(f"Loaded {len(rows)} result rows from {results_source.split('?')[0]}")
+if snapshot:
+    rows, _ = snapshot.tail(rows)
+    print(f"Resuming from the snapshot to {_since} ({snapshot.events} events): {len(rows)} row(s) after it")
 
 # %%
-# Build canonicalized event stream.
-events = event_stream(rows, aliases)
-print(f"Parsed {len(events)} events")
+# Build canonicalized event stream, kept in compact columns. The same pass
+# counts the rows it had to skip and finds the repeats reported further down.
+ingest = IngestReport()
+events = EventStore.from_rows(rows, aliases, ingest)
+print(f"Parsed {len(events)} events ({events.nbytes() / 1e6:.1f} MB of columns)")
+if ingest.rejected:
+    print("Rows skipped: " + ", ".join(f"{count} bad {reason}" for reason, count in ingest.rejected.most_common()))
 
 # %%
 # Group events by (word_id, mode).
-events_by_key: dict[tuple[str, str], list[tuple[datetime, bool]]] = defaultdict(list)
-for timestamp, word_id, mode, correct in events:
-    events_by_key[(word_id, mode)].append((timestamp, correct))
+events_by_key: dict[tuple[str, str], list[tuple[datetime, bool]]] = events.by_key()
 
 print(f"Unique word+mode keys: {len(events_by_key)}")
 
@@ -105,6 +148,16 @@ for word_id, count in sorted(activity.items(), key=lambda item: -item[1])[:10]:
 # Score a specific word with build_today logic.
 MY_CONFIG = DEFAULT_CONFIG
 # MY_CONFIG = ScoreConfig(weight_wrong=1.0)
+snapshot_index = snapshot.index(aliases) if snapshot else {}
+
+
+def key_scores(key: tuple[str, str], now: datetime, config: ScoreConfig, tau_right_days: float):
+    """compute_scores for one key, resuming from the snapshot when there is one."""
+    if snapshot is None:
+        return compute_scores(events_by_key.get(key, []), now, config, tau_right_days)
+    snapshot.check_config(config, [tau_right_days])
+    state = snapshot.state(snapshot_index.get(key, []), tau_right_days, config)
+    return resume(state, events_by_key.get(key, []), config, tau_right_days).score(now, config, tau_right_days)
 
 def score_word(word_id: str, mode: str) -> float:
     canonical = canonicalize(word_id, aliases)
@@ -115,12 +168,7 @@ def score_word(word_id: str, mode: str) -> float:
         (MY_CONFIG.tau_right_by_freq[tag] for tag in tags if tag in MY_CONFIG.tau_right_by_freq),
         default=MY_CONFIG.tau_right_default_days,
     )
-    wrong, right, score = compute_scores(
-        events_by_key.get(key, []),
-        now,
-        MY_CONFIG,
-        tau_right_days,
-    )
+    wrong, right, score = key_scores(key, now, MY_CONFIG, tau_right_days)
     # print(
     #     f"{word_id} {mode}: wrong={wrong:.2f} right={right:.2f} score={score:.3f}"
     # )
@@ -232,7 +280,7 @@ print(f"Highest score: {max(score for _, score in scored_words):.3f}")
 # Duplicates are ignored by event_stream when scoring, so report them here
 # explicitly — otherwise they are invisible. Prune them in the sheet with the
 # helper formulas in docs/google_sheets.md.
-_dupes = duplicate_rows(rows)
+_dupes = ingest.duplicates
 if _dupes:
     _extra = sum(len(_pos) - 1 for _, _pos in _dupes)
     print(
@@ -240,14 +288,18 @@ if _dupes:
         f"({_extra} extra row(s) to prune, {_extra / len(rows):.3%} of {len(rows)})"
     )
     # Sheet row = position + 2 (one header row, and the sheet is 1-based).
+    # With several --results the positions are into the merged history, which
+    # no sheet has, so only the answers are listed.
+    _one_sheet = len(RESULTS_SOURCES) <= 1
     for (_ts, _word_id, _mode, _correct), _pos in _dupes:
         _sheet_rows = ", ".join(str(_p + 2) for _p in _pos)
         print(
             f"  x{len(_pos)}  {_ts.isoformat()}  {_word_id}  {_mode}  {_correct}"
-            f"   sheet rows: {_sheet_rows}"
+            + (f"   sheet rows: {_sheet_rows}" if _one_sheet else "")
         )
-    _delete = sorted((_p + 2 for _, _pos in _dupes for _p in _pos[1:]), reverse=True)
-    print(f"  delete these sheet rows (bottom-up): {', '.join(str(r) for r in _delete)}")
+    if _one_sheet:
+        _delete = sorted((_p + 2 for _, _pos in _dupes for _p in _pos[1:]), reverse=True)
+        print(f"  delete these sheet rows (bottom-up): {', '.join(str(r) for r in _delete)}")
 
 # %%
 # # Show the top 10 lowest and top 30 highest scoring words (MODE).
@@ -296,12 +348,7 @@ for canonical in filtered_words:
         default=MY_CONFIG.tau_right_default_days,
     )
     key = (canonical, MODE)
-    wrong, right, score = compute_scores(
-        events_by_key.get(key, []),
-        datetime.now(tz=UTC),
-        MY_CONFIG,
-        tau_right_days,
-    )
+    wrong, right, score = key_scores(key, datetime.now(tz=UTC), MY_CONFIG, tau_right_days)
     filtered_scored.append((canonical, score, representative))
 
 filtered_scored.sort(key=lambda x: x[1])
@@ -316,6 +363,33 @@ for word_id, score, representative in filtered_top[:30]:
     label_id = str(representative.get("id", "")).strip() or word_id
     print(f"{word_id} = {display_label(label_id)}: {score:.3f}")
 
+# %%
+# Sweep scoring configs over the filtered words in one pass, instead of editing
+# MY_CONFIG and re-running the cells above once per config.
+from score_sweep import config_grid, deck_tags, describe, overlap, sweep
+
+# The sweep refolds every event under other tau_wrong values, which a snapshot
+# (folded under MY_CONFIG's) cannot replay.
+if snapshot is not None:
+    print("Skipping the config sweep: it needs the full history, not a snapshot")
+else:
+    SWEEP_CONFIGS = config_grid(
+        tau_wrong_days=[14.0, 21.0, 28.0],
+        weight_wrong=[1.0, 1.5, 2.0],
+        novelty_bonus=[0.5, 1.0],
+    )
+    sweep_modes = ("en-tr", "tr-en") if MODE == "both" else (MODE,)
+    sweep_results = sweep(
+        events, deck_tags(filtered_items, aliases), SWEEP_CONFIGS, sweep_modes, datetime.now(tz=UTC), 30
+    )
+    sweep_baseline = next(
+        (result.top_ids for result in sweep_results if result.config == MY_CONFIG),
+        sweep_results[0].top_ids,
+    )
+    print(f"Top-30 overlap with MY_CONFIG across {len(sweep_results)} configs:")
+    for result in sorted(sweep_results, key=lambda r: -overlap(sweep_baseline, r.top_ids)):
+        print(f"  {overlap(sweep_baseline, result.top_ids):5.2f}  {describe(result.config)}")
+
 # # %%
 # Sort filtered word+mode pairs by their most recent event and show the oldest 20.
 print("20 least recently seen words:")
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""One pooled PostgREST client for the scripts that read Supabase tables.
+
+Every urllib.request.urlopen opens a fresh TCP and TLS connection, and the
+scripts paged through whole tables one such connection per thousand rows. They
+also paged by offset, which Postgres answers by walking and discarding every
+row before the offset, so the last page of a long history cost as much as
+reading all of it. SupabaseClient keeps a few http.client connections open,
+asks for gzip, and pages by keyset instead: each request asks for the rows
+after the last one it saw, on an ordering that is unique ((answered_at, id)
+for results), so every page is the same short index range scan.
+
+read_all(parallel=True) takes the total from `Prefer: count=exact` and fetches
+offset pages on every pooled connection at once. Those are offset reads again,
+so it only pays off when latency rather than the database is the limit, and a
+row inserted mid-read can shift a page boundary; the sequential keyset read
+cannot be fooled that way and stays the default.
+
+    with SupabaseClient(url, anon, secret) as client:
+        rows = client.read_all("results", "id,answered_at,word_id", order=("answered_at", "id"))
+
+A non-2xx response raises urllib.error.HTTPError carrying PostgREST's body, as
+urlopen did, so existing error handling keeps working.
+"""
+
+from __future__ import annotations
+
+import gzip
+import http.client
+import io
+import json
+import queue
+import threading
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.message import Message
+from typing import Any, Iterable, Sequence
+from urllib.parse import quote, urlsplit
+
+PAGE_SIZE = 1000  # PostgREST caps a single response at 1000 rows
+CONNECTIONS = 4
+# The gateway in front of PostgREST refuses request lines much past 8 KB, so a
+# long in.(...) list is split into filters of at most this many characters.
+IN_FILTER_CHARS = 4000
+
+# A kept-alive connection the server has since closed fails on first use with
+# one of these; the request is then sent once more on a fresh connection.
+STALE_CONNECTION = (http.client.RemoteDisconnected, http.client.CannotSendRequest, ConnectionResetError, BrokenPipeError)
+
+
+@dataclass
+class Response:
+    status: int
+    headers: Message
+    body: bytes
+    will_close: bool = False
+
+    def json(self) -> Any:
+        return json.loads(self.body.decode("utf-8")) if self.body else None
+
+
+def _literal(value: Any) -> str:
+    """A value inside a PostgREST or=(...) list, quoted so commas and colons survive."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def keyset_after(order: Sequence[str], row: dict[str, Any]) -> str:
+    """The filter for rows strictly after `row` on the ascending ordering `order`."""
+    if len(order) == 1:
+        return f"{order[0]}=gt.{quote(str(row[order[0]]), safe='')}"
+    # (a, b) > (x, y) spelled out, as PostgREST has no row comparison:
+    # a > x, or a = x and b > y.
+    clauses = []
+    for depth, column in enumerate(order):
+        ties = [f"{earlier}.eq.{_literal(row[earlier])}" for earlier in order[:depth]]
+        step = f"{column}.gt.{_literal(row[column])}"
+        clauses.append(f"and({','.join([*ties, step])})" if ties else step)
+    return "or=" + quote(f"({','.join(clauses)})", safe="")
+
+
+def in_filters(column: str, values: Iterable[Any], budget: int = IN_FILTER_CHARS) -> list[str]:
+    """`column=in.(...)` filters that between them match any of `values`.
+
+    Each stays within `budget` characters once encoded, so every request line
+    stays short; a caller reads once per filter. No values, no filters.
+    """
+    prefix = f"{column}=in."
+    # The parentheses and separators are encoded too: "%28", "%29", "%2C".
+    room = budget - len(prefix) - 6
+    filters: list[str] = []
+    chunk: list[str] = []
+    size = 0
+    for value in values:
+        encoded = quote(_literal(value), safe="")
+        if chunk and size + 3 + len(encoded) > room:
+            filters.append(f"{prefix}%28{'%2C'.join(chunk)}%29")
+            chunk, size = [], 0
+        size += (3 if chunk else 0) + len(encoded)
+        chunk.append(encoded)
+    if chunk:
+        filters.append(f"{prefix}%28{'%2C'.join(chunk)}%29")
+    return filters
+
+
+class SupabaseClient:
+    """Keep-alive connections to one Supabase project, shared between threads."""
+
+    def __init__(
+        self,
+        url: str,
+        anon: str,
+        secret: str,
+        connections: int = CONNECTIONS,
+        page_size: int = PAGE_SIZE,
+        timeout: float = 60.0,
+    ) -> None:
+        parts = urlsplit(url.rstrip("/"))
+        self.secure = parts.scheme == "https"
+        self.host = parts.hostname or ""
+        self.port = parts.port
+        self.base_path = parts.path
+        self.timeout = timeout
+        self.page_size = page_size
+        self.connections = max(1, connections)
+        self.headers = {
+            "apikey": anon,
+            "Authorization": f"Bearer {anon}",
+            "x-app-secret": secret,
+            "Accept-Encoding": "gzip",
+        }
+        self.opened = 0
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.connections)
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> SupabaseClient:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _connect(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.opened += 1
+        if self.secure:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _send(
+        self, connection: http.client.HTTPConnection, method: str, path: str, headers: dict[str, str], body: bytes | None
+    ) -> Response:
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        raw = response.read()
+        if response.getheader("Content-Encoding", "").lower() == "gzip":
+            raw = gzip.decompress(raw)
+        return Response(response.status, response.headers, raw, response.will_close)
+
+    def request(
+        self, method: str, path: str, headers: dict[str, str] | None = None, body: bytes | None = None
+    ) -> Response:
+        """Send one request on a pooled connection; `path` is relative to the project URL."""
+        full_path = self.base_path + path
+        merged = {**self.headers, **(headers or {})}
+        with self._slots:
+            try:
+                connection, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                connection, reused = self._connect(), False
+            try:
+                response = self._send(connection, method, full_path, merged, body)
+            except STALE_CONNECTION:
+                connection.close()
+                if not reused or method not in ("GET", "HEAD"):
+                    raise
+                connection = self._connect()
+                try:
+                    response = self._send(connection, method, full_path, merged, body)
+                except BaseException:
+                    connection.close()
+                    raise
+            except BaseException:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._idle.put(connection)
+        if not 200 <= response.status < 300:
+            url = f"{'https' if self.secure else 'http'}://{self.host}{full_path}"
+            raise urllib.error.HTTPError(url, response.status, http.client.responses.get(response.status, ""),
+                                         response.headers, io.BytesIO(response.body))
+        return response
+
+    def get_json(self, path: str, headers: dict[str, str] | None = None, body: Any = None) -> Any:
+        """GET `path`, or POST `body` as JSON to it when one is given (an RPC call)."""
+        if body is None:
+            return self.request("GET", path, headers).json()
+        payload = json.dumps(body).encode("utf-8")
+        return self.request("POST", path, {"Content-Type": "application/json", **(headers or {})}, payload).json()
+
+    def count(self, table: str, filters: Iterable[str] = (), column: str = "id") -> int:
+        """Rows in `table` matching `filters`, from Content-Range under count=exact.
+
+        One row comes back with the count, so `column` should be a small one.
+        """
+        query = "&".join([f"select={column}", *filters, "limit=1"])
+        response = self.request("GET", f"/rest/v1/{table}?{query}", {"Prefer": "count=exact"})
+        content_range = response.headers.get("Content-Range", "")
+        total = content_range.rpartition("/")[2]
+        if not total.isdigit():
+            raise ValueError(f"no row count in Content-Range {content_range!r}")
+        return int(total)
+
+    def read_all(
+        self,
+        table: str,
+        select: str,
+        order: Sequence[str],
+        filters: Iterable[str] = (),
+        parallel: bool = False,
+        body: Any = None,
+    ) -> list[dict[str, Any]]:
+        """Every row of `table` matching `filters`, ascending on `order`.
+
+        `order` must be unique per row and every column of it selected, since
+        the keyset read resumes from the last row's values. `filters` are
+        PostgREST query parameters, already encoded ("word_id=eq.x"). A set-
+        returning function pages the same way: pass "rpc/<name>" as `table`
+        and its arguments as `body`.
+        """
+        missing = [column for column in order if column not in select.split(",")]
+        if missing:
+            raise ValueError(f"keyset columns not selected: {', '.join(missing)}")
+        filters = list(filters)
+        base = "&".join([f"select={select}", "order=" + ",".join(f"{column}.asc" for column in order), *filters])
+        path = f"/rest/v1/{table}?{base}"
+
+        rows: list[dict[str, Any]] = []
+        if parallel:
+            if body is not None:
+                raise ValueError("a parallel read cannot count an RPC's rows")
+            total = self.count(table, filters, order[0])
+            offsets = range(0, total, self.page_size)
+            with ThreadPoolExecutor(max_workers=self.connections) as pool:
+                pages = list(
+                    pool.map(lambda offset: self.get_json(f"{path}&offset={offset}&limit={self.page_size}"), offsets)
+                )
+            for page in pages:
+                rows.extend(page)
+            # Rows added after the count sit beyond a full last page; the
+            # keyset loop below picks them up from the last row read.
+            if pages and len(pages[-1]) < self.page_size:
+                return rows
+        while True:
+            after = f"&{keyset_after(order, rows[-1])}" if rows else ""
+            batch = self.get_json(f"{path}{after}&limit={self.page_size}", body=body)
+            rows.extend(batch)
+            if len(batch) < self.page_size:
+                return rows
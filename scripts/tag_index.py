@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Tags as bits, so filtering a deck is integer arithmetic instead of set building.
+
+filter_items used to build `set(item["tags"])` for every item on every call. A
+TagIndex interns each tag to a bit once and holds one int mask per item; an
+include/exclude filter is then two masks and, per item, an AND and a compare.
+It pays off wherever the same deck is filtered more than once: build_today.py's
+batch mode, the scoring service, the notebook.
+
+The same postings (tag -> item positions) and counts go out beside the deck,
+in web/data/tag_index.json, and today_scoring.js builds its own masks from them.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, Sequence
+
+
+class TagIndex:
+    """Per-item tag bitmasks over a fixed list of items."""
+
+    def __init__(self, items: Iterable[dict[str, Any]]) -> None:
+        self.items: list[dict[str, Any]] = list(items)
+        self.tags: list[str] = []
+        self.bits: dict[str, int] = {}
+        self.masks: list[int] = []
+        for item in self.items:
+            mask = 0
+            for tag in item.get("tags", []) or []:
+                bit = self.bits.get(tag)
+                if bit is None:
+                    bit = self.bits[tag] = 1 << len(self.tags)
+                    self.tags.append(tag)
+                mask |= bit
+            self.masks.append(mask)
+
+    def mask(self, tags: Iterable[str]) -> int | None:
+        """The bits for `tags`, or None if any is carried by no item."""
+        mask = 0
+        for tag in tags:
+            bit = self.bits.get(tag)
+            if bit is None:
+                return None
+            mask |= bit
+        return mask
+
+    def select(self, include: Iterable[str] = (), exclude: Iterable[str] = ()) -> list[int]:
+        """Positions of the items carrying every include tag and no exclude tag."""
+        wanted = self.mask(include)
+        if wanted is None:
+            return []
+        # A tag no item carries excludes nothing.
+        unwanted = 0
+        for tag in exclude:
+            unwanted |= self.bits.get(tag, 0)
+        return [
+            position
+            for position, mask in enumerate(self.masks)
+            if mask & wanted == wanted and not mask & unwanted
+        ]
+
+    def filter(self, include: Iterable[str] = (), exclude: Iterable[str] = ()) -> list[dict[str, Any]]:
+        return [self.items[position] for position in self.select(include, exclude)]
+
+    def postings(self) -> dict[str, list[int]]:
+        """tag -> positions of the items carrying it, in item order."""
+        found: dict[str, list[int]] = {tag: [] for tag in self.tags}
+        for position, mask in enumerate(self.masks):
+            while mask:
+                low = mask & -mask
+                found[self.tags[low.bit_length() - 1]].append(position)
+                mask ^= low
+        return found
+
+    def counts(self, tags: Sequence[str] | None = None) -> dict[str, int]:
+        """tag -> how many items carry it; `tags` adds zero counts for tags none carry."""
+        counted = {tag: len(positions) for tag, positions in self.postings().items()}
+        for tag in tags or ():
+            counted.setdefault(tag, 0)
+        return counted
@@ -0,0 +1,227 @@
+"""A small in-process stand-in for PostgREST, for the offline Supabase tests.
+
+It honours the query features the scripts use, over plain lists of dicts:
+select, order (several columns), limit/offset and the Range header, the
+eq/gt/gte/lt/in filters, or=(...) with nested and(...), Prefer: count=exact,
+gzip when asked for, and HTTP/1.1 keep-alive (`hangups` drops requests
+unanswered, as a server does on a connection it has timed out). Like the real
+thing it returns at most 1000 rows a request. Columns ending in "_at" compare
+as timestamps.
+
+A POST of a JSON array inserts, skipping or replacing rows whose on_conflict
+column matches by `Prefer: resolution=...`. `refusals` holds statuses to
+answer the next POSTs with instead (429, 503, ...), and a body longer than
+`max_body` bytes gets 413.
+
+    fake = FakePostgrest({"results": rows})
+    url = fake.start()
+    ...
+    fake.stop()
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qsl, urlsplit
+
+MAX_ROWS = 1000
+
+
+def _split(text: str) -> list[str]:
+    """Split on top-level commas, outside parentheses and double quotes."""
+    parts, depth, quoted, current = [], 0, False, ""
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if quoted and char == "\\":
+            current += text[index : index + 2]
+            index += 2
+            continue
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            index += 1
+            continue
+        current += char
+        index += 1
+    parts.append(current)
+    return parts
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+def _coerce(column: str, sample: Any, value: str) -> Any:
+    if column.endswith("_at"):
+        return datetime.fromisoformat(value)
+    if isinstance(sample, bool):
+        return value == "true"
+    if isinstance(sample, int):
+        return int(value)
+    return value
+
+
+def _cell(row: dict[str, Any], column: str) -> Any:
+    value = row[column]
+    return datetime.fromisoformat(value) if column.endswith("_at") else value
+
+
+def _condition(column: str, expression: str) -> Callable[[dict[str, Any]], bool]:
+    op, _, raw = expression.partition(".")
+    if op == "in":
+        options = [_unquote(part) for part in _split(raw[1:-1])]
+        return lambda row: row[column] in [_coerce(column, row[column], option) for option in options]
+    value = _unquote(raw)
+    compare = {
+        "eq": lambda a, b: a == b,
+        "gt": lambda a, b: a > b,
+        "gte": lambda a, b: a >= b,
+        "lt": lambda a, b: a < b,
+    }[op]
+    return lambda row: compare(_cell(row, column), _coerce(column, row[column], value))
+
+
+def _logic(expression: str) -> Callable[[dict[str, Any]], bool]:
+    """One member of an or/and list: `col.op.value` or a nested `and(...)`/`or(...)`."""
+    for joiner, combine in (("and(", all), ("or(", any)):
+        if expression.startswith(joiner):
+            members = [_logic(part) for part in _split(expression[len(joiner) : -1])]
+            return lambda row, members=members, combine=combine: combine(member(row) for member in members)
+    column, _, rest = expression.partition(".")
+    return _condition(column, rest)
+
+
+class FakePostgrest:
+    def __init__(self, tables: dict[str, list[dict[str, Any]]]) -> None:
+        self.tables = tables
+        self.connections = 0
+        self.requests: list[str] = []
+        # Requests to drop without a reply, as a server does with a kept-alive
+        # connection it has timed out.
+        self.hangups = 0
+        self.refusals: list[int] = []
+        self.max_body: int | None = None
+        self.posts: list[int] = []
+        self._lock = threading.Lock()
+        self.server: ThreadingHTTPServer | None = None
+
+    def start(self) -> str:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                fake.connections += 1
+
+            def do_GET(self) -> None:  # noqa: N802
+                if fake.hangups:
+                    fake.hangups -= 1
+                    self.close_connection = True
+                    return
+                fake.requests.append(self.path)
+                status, headers, body = fake.answer(self.path, self.headers)
+                if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                    body = gzip.compress(body)
+                    headers["Content-Encoding"] = "gzip"
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:  # noqa: N802
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                status, reply = fake.insert(self.path, self.headers, body)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, format, *args) -> None:  # noqa: A002
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self) -> None:
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def insert(self, path: str, headers: Any, body: bytes) -> tuple[int, bytes]:
+        url = urlsplit(path)
+        table = url.path.rsplit("/", 1)[-1]
+        with self._lock:
+            if self.refusals:
+                return self.refusals.pop(0), b'{"message": "try again"}'
+            if self.max_body is not None and len(body) > self.max_body:
+                return 413, b'{"message": "payload too large"}'
+            if table not in self.tables:
+                return 404, b'{"message": "relation does not exist"}'
+            rows = json.loads(body)
+            column = dict(parse_qsl(url.query)).get("on_conflict", "id")
+            merge = "merge-duplicates" in (headers.get("Prefer") or "")
+            position = {row[column]: index for index, row in enumerate(self.tables[table])}
+            for row in rows:
+                if row[column] not in position:
+                    position[row[column]] = len(self.tables[table])
+                    self.tables[table].append(row)
+                elif merge:
+                    self.tables[table][position[row[column]]] = row
+            self.posts.append(len(rows))
+        return 201, b""
+
+    def answer(self, path: str, headers: Any) -> tuple[int, dict[str, str], bytes]:
+        url = urlsplit(path)
+        table = url.path.rsplit("/", 1)[-1]
+        if table not in self.tables:
+            return 404, {"Content-Type": "application/json"}, b'{"message": "relation does not exist"}'
+        rows = list(self.tables[table])
+        params = parse_qsl(url.query)
+        reserved = {"select", "order", "limit", "offset"}
+        for name, value in params:
+            if name == "or":
+                test = _logic(f"or{value}")
+            elif name not in reserved:
+                test = _condition(name, value)
+            else:
+                continue
+            rows = [row for row in rows if test(row)]
+        query = dict(params)
+        for part in reversed(query.get("order", "").split(",") if query.get("order") else []):
+            column, _, direction = part.partition(".")
+            rows.sort(key=lambda row: _cell(row, column), reverse=direction == "desc")
+        total = len(rows)
+        first = int(query.get("offset", 0))
+        last = first + min(int(query.get("limit", MAX_ROWS)), MAX_ROWS) - 1
+        if headers.get("Range"):
+            start, _, end = headers["Range"].partition("-")
+            first, last = int(start), min(int(end), int(start) + MAX_ROWS - 1)
+        rows = rows[first : last + 1]
+        columns = query.get("select", "*").split(",")
+        payload = [row if columns == ["*"] else {column: row[column] for column in columns} for row in rows]
+        reply = {"Content-Type": "application/json"}
+        if "count=exact" in (headers.get("Prefer") or ""):
+            reply["Content-Range"] = f"{first}-{first + len(rows) - 1}/{total}" if rows else f"*/{total}"
+        return 200, reply, json.dumps(payload).encode()
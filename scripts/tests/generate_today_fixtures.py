@@ -12,9 +12,9 @@ from build_today import (
     DEFAULT_CONFIG,
     canonicalize,
     compute_scores,
-    event_stream,
     load_results,
 )
+from event_store import EventStore
 FIXTURE_DIR = ROOT / "scripts" / "tests" / "fixtures"
 RESULTS_PATH = FIXTURE_DIR / "results.csv"
 QUIZ_PATH = FIXTURE_DIR / "quiz.json"
@@ -30,10 +30,8 @@ TOLERANCE = 1e-4
 def main() -> None:
     rows = load_results(str(RESULTS_PATH))
     aliases = json.loads(ALIASES_PATH.read_text(encoding="utf-8")).get("aliases", {})
-    events = event_stream(rows, aliases)
-    events_by_key: dict[tuple[str, str], list[tuple[datetime, bool]]] = {}
-    for timestamp, word_id, mode, correct in events:
-        events_by_key.setdefault((word_id, mode), []).append((timestamp, correct))
+    events = EventStore.from_rows(rows, aliases)
+    events_by_key = events.by_key()
 
     quiz = json.loads(QUIZ_PATH.read_text(encoding="utf-8"))
     items = quiz.get("items", [])
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""build_deck.py must write what the four pipeline steps write, and skip only when it may.
+
+`make build` used to run rebuild_reviewed, dedupe_vocab --apply, validate_tags
+and export_quiz; build_deck.py runs them in one process and claims the same
+bytes. Both are run here in a scratch copy of data/, web/ and scripts/, so the
+checkout is never written:
+
+    .venv/bin/python scripts/tests/test_build_pipeline.py
+
+The build manifest is checked the same way: an unchanged rerun is skipped, and
+a touched input, a hand-edited or deleted output, or a different flag is not.
+"""
+
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from alias_table import AliasCycleError, flatten_aliases  # noqa: E402
+from build_manifest import BuildManifest, ParsedCache  # noqa: E402
+
+STEPS = [
+    ["rebuild_reviewed.py", "--force"],
+    ["dedupe_vocab.py", "--apply", "--force"],
+    ["validate_tags.py"],
+    ["export_quiz.py", "--force"],
+]
+
+failures: list[str] = []
+
+
+def check(name: str, ok: bool, detail: str = "") -> None:
+    if ok:
+        print(f"  ok    {name}")
+    else:
+        failures.append(f"  FAIL  {name}" + (f"\n        {detail}" if detail else ""))
+
+
+def scratch_copy(tmp: Path) -> Path:
+    root = tmp / "checkout"
+    for name in ("data", "web", "scripts"):
+        shutil.copytree(ROOT / name, root / name, ignore=shutil.ignore_patterns("__pycache__"))
+    return root
+
+
+def run(root: Path, script: str, *args: str) -> str:
+    done = subprocess.run(
+        [sys.executable, str(root / "scripts" / script), *args], cwd=root, capture_output=True, text=True
+    )
+    if done.returncode != 0:
+        raise RuntimeError(f"{script} {' '.join(args)} exited {done.returncode}:\n{done.stdout}{done.stderr}")
+    return done.stdout
+
+
+def clear(root: Path) -> None:
+    """Remove everything the pipeline writes, so a run cannot pass on leftovers."""
+    for name in ("quiz.json", "aliases.json", "tag_index.json"):
+        (root / "web" / "data" / name).unlink(missing_ok=True)
+    shutil.rmtree(root / "web" / "data" / "shards", ignore_errors=True)
+    (root / "data" / "vocab" / "reviewed.json").unlink(missing_ok=True)
+
+
+def written(root: Path) -> dict[str, bytes]:
+    files = [*(root / "web" / "data").rglob("*"), root / "data" / "vocab" / "reviewed.json"]
+    return {str(path.relative_to(root)): path.read_bytes() for path in files if path.is_file()}
+
+
+def differ(left: dict[str, bytes], right: dict[str, bytes]) -> list[str]:
+    return sorted(name for name in set(left) | set(right) if left.get(name) != right.get(name))
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = scratch_copy(Path(tmp))
+
+        # The same deck both ways, compact with shards as `make build` writes it,
+        # and readable.
+        for label, export_flags, deck_flags in (
+            ("compact with shards", ["--shards"], ["--shards"]),
+            ("readable", ["--readable"], ["--readable"]),
+        ):
+            clear(root)
+            for step in STEPS:
+                run(root, *step, *(export_flags if step[0] == "export_quiz.py" else []))
+            separate = written(root)
+            clear(root)
+            run(root, "build_deck.py", "--reviewed", "--force", *deck_flags)
+            combined = written(root)
+            check(
+                f"build_deck.py writes what the four steps write, byte for byte ({label})",
+                "web/data/quiz.json" in separate and not differ(separate, combined),
+                f"differ: {differ(separate, combined)[:5]}",
+            )
+
+        # From here on the skip rules, on the deck `make build` writes, from an
+        # empty build cache as on a fresh checkout (--force above never fills it).
+        shutil.rmtree(root / "resources" / "build_cache", ignore_errors=True)
+        build = ["build_deck.py", "--reviewed", "--shards"]
+        run(root, *build)
+        built = written(root)
+        check("an unchanged rerun is skipped", "is up to date" in run(root, *build))
+
+        candidate = sorted((root / "data" / "candidates").glob("*.candidates.json"))[0]
+        candidate.write_bytes(candidate.read_bytes() + b"\n")
+        output = run(root, *build)
+        check(
+            "a touched input rebuilds, re-parsing that file only",
+            "(1 parsed)" in output and not differ(built, written(root)),
+            output.strip(),
+        )
+
+        quiz = root / "web" / "data" / "quiz.json"
+        quiz.write_bytes(quiz.read_bytes() + b" ")
+        output = run(root, *build)
+        check("a hand-edited output rebuilds it", "Built" in output and not differ(built, written(root)), output.strip())
+
+        shard = next((root / "web" / "data" / "shards").glob("*.json"))
+        shard.unlink()
+        output = run(root, *build)
+        check("and so does a deleted one", "Built" in output and not differ(built, written(root)), output.strip())
+
+        output = run(root, *build, "--readable")
+        check("a different flag rebuilds", "Built" in output, output.strip())
+
+        # The manifest on its own, for the cases the pipeline does not hit.
+        files = {name: Path(tmp) / name for name in ("a.txt", "b.txt", "out.txt")}
+        for path in files.values():
+            path.write_text(path.name, encoding="utf-8")
+        manifest = BuildManifest(Path(tmp) / "manifest.json")
+        manifest.record("step", [files["a.txt"]], [files["out.txt"]], {"readable": True})
+        reloaded = BuildManifest(Path(tmp) / "manifest.json")
+        check(
+            "a recorded step is up to date after a reload, and only with the same inputs and flags",
+            reloaded.up_to_date("step", [files["a.txt"]], [files["out.txt"]], {"readable": True})
+            and not reloaded.up_to_date("step", [files["a.txt"], files["b.txt"]], [files["out.txt"]], {"readable": True})
+            and not reloaded.up_to_date("step", [files["a.txt"]], [files["out.txt"]])
+            and not reloaded.up_to_date("other", [files["a.txt"]], [files["out.txt"]], {"readable": True}),
+        )
+
+        cache = ParsedCache(Path(tmp) / "parsed", parser="v1")
+        cache.put(files["a.txt"], "digest", ["item"])
+        check(
+            "a parsed entry is reused only for the same file hash and parser",
+            cache.get(files["a.txt"], "digest") == ["item"]
+            and cache.get(files["a.txt"], "other") is None
+            and ParsedCache(Path(tmp) / "parsed", parser="v2").get(files["a.txt"], "digest") is None,
+        )
+
+    # The alias table the build flattens.
+    check(
+        "aliases flatten to their root, however long the chain",
+        flatten_aliases({"a": "b", "b": "c", "d": "b", "e": "f"}) == {"a": "c", "b": "c", "d": "c", "e": "f"},
+    )
+    cycles = []
+    for aliases in ({"a": "b", "b": "c", "c": "a"}, {"x": "x"}, {"d": "a", "a": "b", "b": "a"}):
+        try:
+            flatten_aliases(aliases)
+        except AliasCycleError as exc:
+            cycles.append(str(exc).split(": ", 1)[1])
+    check(
+        "and a cycle, or an id mapped onto itself, is refused by name",
+        cycles == ["a -> b -> c -> a", "x -> x", "a -> b -> a"],
+        json.dumps(cycles),
+    )
+
+    print()
+    if failures:
+        print("\n".join(failures))
+        print(f"\n{len(failures)} check(s) failed.")
+        return 1
+    print("Build pipeline tests passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env node
+
+// Covers web/deck_format.js, which turns the compact data/quiz.json back into
+// item objects. A decoding slip (a field shifted by one, a tag index read
+// against the wrong list) would quiz the wrong words without any error, so the
+// exported deck is checked against tag_index.json, which is written from the
+// same items by a different path.
+
+const fs = require("fs");
+const path = require("path");
+const assert = require("assert");
+const DeckFormat = require(path.resolve(__dirname, "..", "..", "web", "deck_format.js"));
+
+let checks = 0;
+
+// --- a hand-written deck ------------------------------------------------
+const sample = {
+  format: DeckFormat.COMPACT_FORMAT,
+  fields: ["id", "turkish", "english", "priority", "tags", "hint_tr_en", "hint_en_tr", "pron_tr", "infl_tr"],
+  tags: [
+    { id: "noun", label: "Noun", group: "pos" },
+    { id: "unit-a1-1a", label: "Unit A1-1A", group: "unit" },
+  ],
+  unregistered_tags: ["stray"],
+  items: [
+    ["w1", "göz", "eye", 3, [1, 0]],
+    ["w2", "yüz", "face", 2, [0], null, "body part", null, "yüzü"],
+    ["w3", "yüz", "hundred", 1, [2], "number"],
+  ],
+};
+const decoded = DeckFormat.decodeDeck(sample);
+assert.deepStrictEqual(decoded.tags, sample.tags, "the registry passes through");
+assert.deepStrictEqual(decoded.items[0], {
+  id: "w1",
+  turkish: "göz",
+  english: "eye",
+  priority: 3,
+  tags: ["unit-a1-1a", "noun"],
+});
+assert.deepStrictEqual(
+  decoded.items[1],
+  { id: "w2", turkish: "yüz", english: "face", priority: 2, tags: ["noun"], hint_en_tr: "body part", infl_tr: "yüzü" },
+  "a null keeps the later fields in place and is not itself a field"
+);
+assert.deepStrictEqual(decoded.items[2].tags, ["stray"], "indices past the registry are unregistered tags");
+assert.strictEqual(decoded.items[2].hint_tr_en, "number");
+assert.ok(!("hint_en_tr" in decoded.items[2]), "a dropped trailing field stays absent");
+checks += 6;
+
+// --- the readable form passes through -----------------------------------
+const readable = { items: [{ id: "w1", turkish: "göz", english: "eye", priority: 3, tags: ["noun"] }], tags: [] };
+assert.strictEqual(DeckFormat.decodeDeck(readable), readable);
+checks += 1;
+
+// --- the exported deck --------------------------------------------------
+const dataDir = path.resolve(__dirname, "..", "..", "web", "data");
+const deck = DeckFormat.decodeDeck(JSON.parse(fs.readFileSync(path.join(dataDir, "quiz.json"), "utf8")));
+const registry = new Set(deck.tags.map((tag) => tag.id));
+deck.items.forEach((item) => {
+  assert.ok(item.id && item.turkish && item.english, `missing a field: ${JSON.stringify(item)}`);
+  assert.strictEqual(typeof item.priority, "number");
+  item.tags.forEach((tag) => assert.ok(registry.has(tag), `${item.id}: ${tag} is not in the registry`));
+  Object.keys(item).forEach((field) => assert.ok(item[field] !== null, `${item.id}: ${field} is null`));
+});
+checks += 1;
+
+const tagIndexPath = path.join(dataDir, "tag_index.json");
+if (fs.existsSync(tagIndexPath)) {
+  const tagIndex = JSON.parse(fs.readFileSync(tagIndexPath, "utf8"));
+  assert.strictEqual(tagIndex.items, deck.items.length, "tag_index.json belongs to this export");
+  const carried = {};
+  deck.items.forEach((item, position) => {
+    item.tags.forEach((tag) => {
+      (carried[tag] = carried[tag] || []).push(position);
+    });
+  });
+  assert.deepStrictEqual(carried, tagIndex.postings, "decoded tags match the postings");
+  checks += 2;
+}
+
+// --- the shards, when the deck was exported with --shards ------------------
+const shardDir = path.join(dataDir, "shards");
+const manifestPath = path.join(shardDir, "manifest.json");
+let shardCount = 0;
+if (fs.existsSync(manifestPath)) {
+  const crypto = require("crypto");
+  const manifest = JSON.parse(fs.readFileSync(manifestPath, "utf8"));
+  const byShard = manifest.shards.map((shard) => {
+    const text = fs.readFileSync(path.join(shardDir, shard.file), "utf8");
+    const digest = crypto.createHash("sha256").update(text, "utf8").digest("hex");
+    assert.strictEqual(digest, shard.hash, `${shard.file} does not match its hash`);
+    assert.ok(shard.file.includes(digest.slice(0, 12)), `${shard.file} is not named by its hash`);
+    const shardItems = DeckFormat.decodeShard(manifest, JSON.parse(text));
+    assert.strictEqual(shardItems.length, shard.items, `${shard.file}: item count`);
+    return shardItems;
+  });
+  checks += 1;
+
+  // Together the shards are the deck: every item once, decoded identically.
+  const byId = (list) => list.slice().sort((a, b) => (a.id < b.id ? -1 : a.id > b.id ? 1 : 0));
+  assert.strictEqual(manifest.items, deck.items.length);
+  assert.deepStrictEqual(byId([].concat(...byShard)), byId(deck.items), "the shards hold exactly quiz.json's items");
+  checks += 2;
+
+  // Filtering on a tag must load every shard holding an item with it.
+  Object.keys(manifest.counts).forEach((tag) => {
+    const needed = manifest.shards.filter((shard, i) => byShard[i].some((item) => item.tags.includes(tag)));
+    assert.deepStrictEqual(DeckFormat.shardsFor(manifest, [tag], []), needed, `shards for ${tag}`);
+    const total = [].concat(...byShard).filter((item) => item.tags.includes(tag)).length;
+    assert.strictEqual(manifest.counts[tag], total, `count for ${tag}`);
+  });
+  checks += 2;
+  shardCount = manifest.shards.length;
+
+  const leftovers = fs.readdirSync(shardDir).filter(
+    (name) => name !== "manifest.json" && !manifest.shards.some((shard) => shard.file === name)
+  );
+  assert.deepStrictEqual(leftovers, [], "no shard outside the manifest");
+  checks += 1;
+}
+
+// An exclude tag every item of a shard carries rules the shard out; one only
+// some carry does not.
+const twoShards = {
+  shards: [
+    { file: "a", items: 2, tags: { noun: 2, verb: 1 } },
+    { file: "b", items: 1, tags: { verb: 1 } },
+  ],
+};
+assert.deepStrictEqual(DeckFormat.shardsFor(twoShards, ["verb"], ["noun"]).map((s) => s.file), ["b"]);
+assert.deepStrictEqual(DeckFormat.shardsFor(twoShards, [], ["verb"]).map((s) => s.file), ["a"]);
+assert.deepStrictEqual(DeckFormat.shardsFor(twoShards, ["noun", "verb"], []).map((s) => s.file), ["a"]);
+checks += 3;
+
+console.log(`Deck format test passed (${checks} checks, ${deck.items.length} items, ${shardCount} shards).`);
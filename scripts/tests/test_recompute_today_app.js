@@ -248,6 +248,7 @@ global.fetch = fetch;
 global.URL = URL;
 global.Blob = function () {};
 global.TodayScoring = require(path.resolve(__dirname, "..", "..", "web", "today_scoring.js"));
+global.DeckFormat = require(path.resolve(__dirname, "..", "..", "web", "deck_format.js"));
 
 global.APP_CONFIG = {
   supabaseUrl: "https://example.test",
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""The results mirror must follow every way the Supabase table changes.
+
+Runs against the in-process stand-in for PostgREST in fake_postgrest.py, so it
+needs no network:
+
+    .venv/bin/python scripts/tests/test_results_mirror.py
+
+Each step mutates the fake table the way production has: a new answer, an
+answer queued offline and synced late with its old answered_at, and a
+correction (delete plus reinsert, so the row count does not move).
+"""
+
+import contextlib
+import io
+import sys
+import tempfile
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import build_today  # noqa: E402
+import results_mirror  # noqa: E402
+from fake_postgrest import FakePostgrest  # noqa: E402
+from results_mirror import ResultsMirror  # noqa: E402
+from score_state import StateStore  # noqa: E402
+
+START = datetime(2026, 2, 1, 9, 0, 0, tzinfo=UTC)
+
+failures: list[str] = []
+table: list[dict] = []
+clock = [START + timedelta(days=60)]
+
+
+def check(name: str, ok: bool, detail: str = "") -> None:
+    if ok:
+        print(f"  ok    {name}")
+    else:
+        failures.append(f"  FAIL  {name}" + (f"\n        {detail}" if detail else ""))
+
+
+def insert(answered_at: datetime, word_id: str, correct: bool = True) -> dict:
+    clock[0] += timedelta(seconds=1)
+    row = {
+        "id": max((entry["id"] for entry in table), default=0) + 1,
+        "answered_at": answered_at.isoformat(),
+        "created_at": clock[0].isoformat(),
+        "word_id": word_id,
+        "mode": "en-tr",
+        "correct": correct,
+    }
+    table.append(row)
+    return row
+
+
+def held(mirror: ResultsMirror) -> list[tuple]:
+    return [(row["timestamp"], row["word_id"], row["correct"]) for row in mirror.rows()]
+
+
+def expected() -> list[tuple]:
+    ordered = sorted(table, key=lambda row: (row["answered_at"], row["id"]))
+    return [(row["answered_at"], row["word_id"], row["correct"]) for row in ordered]
+
+
+def run_build_today(*argv: str) -> str:
+    """build_today.py's output for these arguments; it must exit 0."""
+    saved = sys.argv
+    sys.argv = ["build_today.py", *argv]
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            code = build_today.main()
+    finally:
+        sys.argv = saved
+    return output.getvalue() if code == 0 else f"exit {code}: {output.getvalue()}"
+
+
+def main() -> int:
+    for n in range(2500):
+        insert(START + timedelta(minutes=7 * n), f"w{n % 40}", n % 3 != 0)
+
+    fake = FakePostgrest({"results": table})
+    remote = (fake.start(), "anon", "secret")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            mirror = ResultsMirror(Path(tmp) / "mirror.sqlite")
+
+            report = mirror.sync(*remote)
+            check("the first sync reads everything, across pages", held(mirror) == expected() and not report.resynced,
+                  f"held {mirror.count()} of {len(table)}")
+
+            report = mirror.sync(*remote)
+            check("a sync with nothing new re-reads only the newest timestamp", report.fetched == 1 and not report.resynced,
+                  f"{report}")
+
+            newest = datetime.fromisoformat(table[-1]["answered_at"])
+            insert(newest + timedelta(minutes=1), "w-new")
+            insert(newest + timedelta(minutes=2), "w-new", False)
+            report = mirror.sync(*remote)
+            check("new answers arrive incrementally", held(mirror) == expected() and not report.resynced, f"{report}")
+
+            insert(START + timedelta(days=3), "w-late")
+            report = mirror.sync(*remote)
+            check("an answer synced late with an old answered_at forces a resync",
+                  held(mirror) == expected() and report.resynced, f"{report}")
+
+            # A correction: the row is deleted and reinserted with its original
+            # answered_at, so the count is unchanged. A new answer arrives in the
+            # same interval, so created_at alone would look like ordinary traffic.
+            corrected = table.pop(1200)
+            insert(datetime.fromisoformat(corrected["answered_at"]), corrected["word_id"], not corrected["correct"])
+            insert(newest + timedelta(minutes=3), "w-new")
+            table.pop(0)
+            report = mirror.sync(*remote)
+            check("a correction below the tail forces a resync", held(mirror) == expected() and report.resynced,
+                  f"{report}")
+
+            since = expected()[-3][0]
+            check("rows(since) is inclusive", len(mirror.rows(since)) == 3, f"{len(mirror.rows(since))}")
+            mirror.close()
+
+            # The watermark is kept in the file: a fresh process resumes from it.
+            reopened = ResultsMirror(Path(tmp) / "mirror.sqlite")
+            report = reopened.sync(*remote)
+            check("a reopened mirror resumes incrementally", not report.resynced and report.fetched == 1, f"{report}")
+            reopened.close()
+
+            # --state --mirror reads only the rows at or after the state's
+            # watermark; that tail must be folded on, not mistaken for a history
+            # that lost everything below it. The mirror syncs from the fake here.
+            saved_config = results_mirror.supabase_config
+            results_mirror.supabase_config = lambda: remote
+            try:
+                state_args = ["--state", str(Path(tmp) / "state.json"), "--mirror", str(Path(tmp) / "mirror.sqlite"),
+                              "--mode", "both", "--dry-run"]
+                first = run_build_today(*state_args)
+                insert(newest + timedelta(minutes=4), "w-new")
+                insert(newest + timedelta(minutes=5), "w-new", False)
+                second = run_build_today(*state_args)
+            finally:
+                results_mirror.supabase_config = saved_config
+            store = StateStore.load(Path(tmp) / "state.json")
+            check("--state --mirror keeps the folded state and adds the new rows",
+                  store is not None and store.events == len(table) and "rebuilding" not in first + second
+                  and "Folded 2 new event(s)" in second,
+                  f"{store.events if store else None} of {len(table)} held\n{first}\n{second}")
+
+            # The same for Supabase named with --results, alone or merged with
+            # a sheet archive that is always read whole.
+            archive = Path(tmp) / "archive.csv"
+            archive.write_text(
+                "timestamp,word_id,mode,correct\n"
+                + "".join(f"{(START - timedelta(days=day)).isoformat()},w-old,en-tr,true\n" for day in range(1, 6)),
+                encoding="utf-8",
+            )
+            saved_config = build_today.supabase_config
+            build_today.supabase_config = lambda: remote
+            try:
+                runs = {}
+                for name, sources in (("alone", ["supabase"]), ("merged", [str(archive), "supabase"])):
+                    state_args = ["--state", str(Path(tmp) / f"state-{name}.json"), "--mode", "both", "--dry-run"]
+                    for source in sources:
+                        state_args += ["--results", source]
+                    first = run_build_today(*state_args)
+                    insert(newest + timedelta(minutes=6 + len(runs)), "w-new")
+                    second = run_build_today(*state_args)
+                    store = StateStore.load(Path(tmp) / f"state-{name}.json")
+                    runs[name] = (store.events if store else None, first + second)
+            finally:
+                build_today.supabase_config = saved_config
+            check("--state --results supabase keeps the folded state",
+                  runs["alone"][0] == len(table) - 1 and "rebuilding" not in runs["alone"][1],
+                  f"{runs['alone'][0]} of {len(table) - 1} held\n{runs['alone'][1]}")
+            check("and so does --results supabase merged with a sheet archive",
+                  runs["merged"][0] == len(table) + 5 and "rebuilding" not in runs["merged"][1],
+                  f"{runs['merged'][0]} of {len(table) + 5} held\n{runs['merged'][1]}")
+    finally:
+        fake.stop()
+
+    print()
+    if failures:
+        print("\n".join(failures))
+        print(f"\n{len(failures)} check(s) failed.")
+        return 1
+    print("Results mirror tests passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""supabase/score_aggregates.sql must fold exactly what the Python engine folds.
+
+Needs a scratch Postgres (14 or later) and psql; it works in a schema of its own
+and drops it afterwards, and skips cleanly without either, so it is safe in
+`make test`:
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost:5432/postgres \\
+        .venv/bin/python scripts/tests/test_score_aggregates.py
+
+The comparison is exact, not within a tolerance: the SQL repeats the Python
+fold step for step, and anything short of equality means the two have drifted.
+"""
+
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from build_today import DEFAULT_CONFIG, score_canonicals  # noqa: E402
+from event_store import EventStore  # noqa: E402
+from score_aggregates import states_from_aggregates, tau_columns  # noqa: E402
+from score_state import ScoreState, rank_states  # noqa: E402
+
+SCHEMA = "score_aggregates_test"
+START = datetime(2026, 1, 5, 7, 30, 0, tzinfo=UTC)
+
+failures: list[str] = []
+
+
+def skip(reason: str) -> int:
+    print(f"SKIP  score aggregates test: {reason}")
+    return 0
+
+
+def check(name: str, ok: bool, detail: str = "") -> None:
+    if ok:
+        print(f"  ok    {name}")
+    else:
+        failures.append(f"  FAIL  {name}" + (f"\n        {detail}" if detail else ""))
+
+
+def psql(url: str, sql: str) -> str:
+    result = subprocess.run(
+        [os.environ.get("PSQL", "psql"), url, "-X", "-q", "-At", "-v", "ON_ERROR_STOP=1", "-f", "-"],
+        input=sql,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PGTZ": "UTC"},
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip())
+    return result.stdout
+
+
+def synthetic_history(count: int = 3000, seed: int = 11) -> tuple[list[dict], dict[str, str]]:
+    rng = random.Random(seed)
+    aliases = {"w-alt-3": "w3", "w-alt-4": "w4"}
+    words = [f"w{n}" for n in range(60)] + list(aliases)
+    rows = []
+    moment = START
+    for _ in range(count):
+        # Microsecond steps, with runs of answers sharing one timestamp.
+        if rng.random() > 0.1:
+            moment += timedelta(seconds=rng.randint(1, 40000), microseconds=rng.randint(0, 999_999))
+        word = rng.choice(words)
+        rows.append(
+            {
+                "timestamp": moment.isoformat(),
+                # The readers trim ids and modes; so must the SQL.
+                "word_id": f" {word}" if rng.random() < 0.02 else word,
+                "mode": rng.choice(("en-tr", "tr-en")),
+                "correct": rng.random() < 0.65,
+            }
+        )
+        if rng.random() < 0.03:
+            rows.append(dict(rows[-1]))  # a retried POST
+    return rows, aliases
+
+
+def literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def main() -> int:
+    url = os.environ.get("TEST_DATABASE_URL", "").strip()
+    if not url:
+        return skip("TEST_DATABASE_URL is not set")
+    if not shutil.which(os.environ.get("PSQL", "psql")):
+        return skip("psql is not installed")
+
+    rows, aliases = synthetic_history()
+    events = EventStore.from_rows(rows, aliases)
+    canonical_ids = sorted({word_id for _, word_id, _, _ in events})
+    tau_cycle = [DEFAULT_CONFIG.tau_right_default_days, *DEFAULT_CONFIG.tau_right_by_freq.values()]
+    taus = {word_id: tau_cycle[index % len(tau_cycle)] for index, word_id in enumerate(canonical_ids)}
+    columns = tau_columns(taus)
+
+    setup = (ROOT / "supabase" / "score_aggregates.sql").read_text(encoding="utf-8")
+    setup = "\n".join(line for line in setup.splitlines() if not line.startswith("grant "))
+    values = ",\n".join(
+        f"({index}, {literal(row['word_id'])}, {literal(row['mode'])}, {str(row['correct']).lower()}, "
+        f"{literal(row['timestamp'])})"
+        for index, row in enumerate(rows)
+    )
+    try:
+        psql(
+            url,
+            f"""
+            drop schema if exists {SCHEMA} cascade;
+            create schema {SCHEMA};
+            create table {SCHEMA}.results (
+              id              bigserial primary key,
+              client_event_id text        not null unique,
+              word_id         text        not null,
+              mode            text        not null,
+              correct         boolean     not null,
+              answered_at     timestamptz not null,
+              created_at      timestamptz not null default now()
+            );
+            {setup.replace("public.", f"{SCHEMA}.")}
+            insert into {SCHEMA}.results (client_event_id, word_id, mode, correct, answered_at)
+            select 'e' || n, w, m, c, a::timestamptz from (values {values}) as v(n, w, m, c, a);
+            """,
+        )
+        output = psql(
+            url,
+            f"select coalesce(json_agg(t), '[]') from {SCHEMA}.score_aggregates("
+            f"array{columns}::double precision[], {DEFAULT_CONFIG.tau_wrong_days}, "
+            f"{literal(json.dumps(aliases))}::jsonb) t;",
+        )
+    except (OSError, RuntimeError) as exc:
+        return skip(f"could not use the database: {exc}")
+
+    try:
+        aggregates = json.loads(output)
+        keys = events.by_key()
+        check("one row per (canonical id, mode) answered",
+              sorted((row["word_id"], row["mode"]) for row in aggregates) == sorted(keys), f"{len(aggregates)} rows")
+
+        drift = []
+        for row in aggregates:
+            history = keys.get((row["word_id"], row["mode"]), [])
+            for index, tau in enumerate(columns):
+                state = ScoreState()
+                for timestamp, correct in history:
+                    state.fold(timestamp, correct, DEFAULT_CONFIG.tau_wrong_days, tau)
+                rights = row["rights"] or []
+                right = rights[index] if index < len(rights) else 0.0
+                if (row["wrong"], right, row["total"]) != (state.wrong, state.right, state.total):
+                    drift.append((row["word_id"], row["mode"], tau))
+        check("every sum equals ScoreState.fold's, for every tau", not drift, f"differs for {drift[:5]}")
+
+        now = START + timedelta(days=120)
+        modes = ("tr-en", "en-tr")
+        states = states_from_aggregates(aggregates, taus, columns)
+        expected = score_canonicals(events, taus, modes, now)
+        actual = rank_states(states, taus, taus, modes, now)
+        check("ranking from the aggregates equals score_canonicals exactly", actual == expected)
+    finally:
+        psql(url, f"drop schema if exists {SCHEMA} cascade;")
+
+    print()
+    if failures:
+        print("\n".join(failures))
+        print(f"\n{len(failures)} check(s) failed.")
+        return 1
+    print("Score aggregates tests passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+"""The alternative scoring engines must agree with compute_scores.
+
+compute_scores is the Python mirror of web/today_scoring.js, which the offline
+JS tests pin against fixtures. Every faster path is checked here against it, on
+a synthetic history big enough to exercise ties, aliases and both modes:
+
+    .venv/bin/python scripts/tests/test_scoring_engines.py
+"""
+
+import contextlib
+import csv
+import gzip
+import http.client
+import io
+import json
+import random
+import sys
+import tempfile
+import threading
+import tracemalloc
+import urllib.request
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import build_today  # noqa: E402
+from backtest import BacktestReport, backtest  # noqa: E402
+from batch_learners import SharedDeck, score_learners  # noqa: E402
+from build_today import (  # noqa: E402
+    DEFAULT_CONFIG,
+    TimestampParser,
+    compute_scores,
+    duplicate_rows,
+    event_stream,
+    filter_items,
+    group_by_canonical,
+    iter_items,
+    load_aliases,
+    load_vocab_files,
+    parse_timestamp,
+    representative,
+    score_canonicals,
+    tau_right_for,
+)
+from compact_results import Snapshot, compare, fold_tail  # noqa: E402
+from event_store import EventStore, IngestReport  # noqa: E402
+from practice_schedule import PracticeScheduler  # noqa: E402
+from results_stream import iter_records, merge_records, records_from_rows  # noqa: E402
+from score_service import ScoreService, make_server  # noqa: E402
+from score_state import ScoreState, StateStore  # noqa: E402
+from score_sweep import config_grid, sweep  # noqa: E402
+from tag_index import TagIndex  # noqa: E402
+
+NOW = datetime(2026, 2, 25, 0, 0, 0, tzinfo=UTC)
+TOLERANCE = 1e-9
+ALIASES = {"w3-alias": "w3", "w7-alias": "w7"}
+TAUS = {"w1": 3.0, "w2": 5.0, "w4": 8.0}
+# The same taus, as the frequency tags DEFAULT_CONFIG maps to them.
+DECK_TAGS = {f"w{n}": set() for n in range(12)} | {"w1": {"freq-100"}, "w2": {"freq-500"}, "w4": {"freq-1000"}}
+
+failures: list[str] = []
+
+
+def check(name: str, ok: bool, detail: str = "") -> None:
+    if ok:
+        print(f"  ok    {name}")
+    else:
+        failures.append(f"  FAIL  {name}" + (f"\n        {detail}" if detail else ""))
+
+
+def synthetic_rows(count: int = 4000, seed: int = 7) -> list[dict[str, str]]:
+    """A year of answers over a dozen words, with repeats, ties and aliases."""
+    rng = random.Random(seed)
+    words = [f"w{n}" for n in range(12)] + list(ALIASES)
+    start = NOW - timedelta(days=365)
+    rows = []
+    for _ in range(count):
+        # Whole minutes, so plenty of events share a timestamp.
+        when = start + timedelta(minutes=rng.randrange(365 * 24 * 60 // 4) * 4)
+        rows.append(
+            {
+                "timestamp": when.strftime("%Y-%m-%d %H:%M:%S"),
+                "word_id": rng.choice(words),
+                "mode": rng.choice(("en-tr", "tr-en")),
+                "correct": rng.choice(("true", "false", "true")),
+            }
+        )
+    # A retried POST: the exact same row twice.
+    rows.extend(rows[:25])
+    return rows
+
+
+def reference_scores(events) -> dict[tuple[str, str], tuple[float, float, float]]:
+    by_key: dict[tuple[str, str], list] = {}
+    for timestamp, word_id, mode, correct in events:
+        by_key.setdefault((word_id, mode), []).append((timestamp, correct))
+    return {
+        key: compute_scores(entries, NOW, DEFAULT_CONFIG, TAUS.get(key[0], DEFAULT_CONFIG.tau_right_default_days))
+        for key, entries in by_key.items()
+    }
+
+
+def max_delta(expected: dict, actual: dict) -> float:
+    if set(expected) != set(actual):
+        return float("inf")
+    return max(
+        abs(a - b) for key in expected for a, b in zip(expected[key], actual[key])
+    )
+
+
+def store_scores(store: StateStore) -> dict[tuple[str, str], tuple[float, float, float]]:
+    return {
+        key: state.score(NOW, DEFAULT_CONFIG, TAUS.get(key[0], DEFAULT_CONFIG.tau_right_default_days))
+        for key, state in store.states.items()
+    }
+
+
+def expected_sets(specs, items, aliases, score_by_canonical, limit) -> list[dict]:
+    """Each spec's top `limit`, filtered with filter_items and ranked here rather than by rank_sets."""
+    sets = []
+    for spec in specs:
+        canonicals = group_by_canonical(filter_items(items, set(spec["include"]), set(spec["exclude"])), aliases)
+        top = sorted(canonicals, key=lambda canonical_id: (-score_by_canonical[canonical_id], canonical_id))[:limit]
+        sets.append(
+            {
+                **spec,
+                "candidates": len(canonicals),
+                "ids": top,
+                "scores": [round(score_by_canonical[canonical_id], 6) for canonical_id in top],
+            }
+        )
+    return sets
+
+
+def run_build_today(*argv: str) -> tuple[int, str]:
+    """build_today.py's exit code and output for these arguments."""
+    saved = sys.argv
+    sys.argv = ["build_today.py", *argv]
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            code = build_today.main()
+    finally:
+        sys.argv = saved
+    return code, output.getvalue()
+
+
+def main() -> int:
+    rows = synthetic_rows()
+    events = event_stream(rows, ALIASES)
+    expected = reference_scores(events)
+    print(f"Comparing engines on {len(events)} events over {len(expected)} keys\n")
+
+    # ScoreState.fold replays compute_scores' loop step for step.
+    states: dict[tuple[str, str], ScoreState] = {}
+    for timestamp, word_id, mode, correct in events:
+        states.setdefault((word_id, mode), ScoreState()).fold(
+            timestamp, correct, DEFAULT_CONFIG.tau_wrong_days,
+            TAUS.get(word_id, DEFAULT_CONFIG.tau_right_default_days),
+        )
+    folded = {
+        key: state.score(NOW, DEFAULT_CONFIG, TAUS.get(key[0], DEFAULT_CONFIG.tau_right_default_days))
+        for key, state in states.items()
+    }
+    check("folding event by event equals replaying", folded == expected)
+
+    # Incremental: fold a prefix, persist, reload, fold the rest. The split falls
+    # on a timestamp several events share, and the second read starts *at* it,
+    # as an inclusive Supabase read would.
+    split = len(events) // 2
+    while events[split][0] != events[split - 1][0]:
+        split += 1
+    cut = events[split][0]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "state.json"
+        first = StateStore("test")
+        first.fold(events[:split], TAUS)
+        first.save(path)
+        second = StateStore.load(path)
+        tail = [event for event in events if event[0] >= cut]
+        new = second.fold(tail, TAUS)
+    check(
+        "a resumed fold counts boundary events exactly once",
+        new == len(events) - split and second.events == len(events),
+        f"folded {new}, expected {len(events) - split}; held {second.events} of {len(events)}",
+    )
+    delta = max_delta(expected, store_scores(second))
+    check("state saved and resumed scores like the full replay", delta <= TOLERANCE, f"max delta {delta}")
+
+    again = second.fold(events, TAUS)
+    check("re-reading the whole history folds nothing", again == 0, f"folded {again}")
+
+    # The compact store must hold exactly what event_stream returns, in the same
+    # order, including when the rows arrive out of order.
+    store = EventStore.from_rows(rows, ALIASES)
+    check("the event store matches event_stream", list(store) == events)
+    shuffled = list(rows)
+    random.Random(3).shuffle(shuffled)
+    check(
+        "and sorts rows that arrive out of order",
+        [event[0] for event in EventStore.from_rows(shuffled, ALIASES)] == [event[0] for event in events],
+    )
+    check("and groups them as compute_scores expects", reference_scores(store) == expected)
+
+    # One pass must also report what duplicate_rows finds and why rows were
+    # skipped, with the timestamp format settled once for the whole source.
+    sheet_rows = [
+        dict(row, timestamp=parse_timestamp(row["timestamp"]).strftime("%m/%d/%Y %H:%M:%S")) for row in rows
+    ] + [
+        {"timestamp": "soon", "word_id": "w1", "mode": "en-tr", "correct": "true"},
+        {"timestamp": "01/02/2026 10:00:00", "word_id": " ", "mode": "en-tr", "correct": "true"},
+        {"timestamp": "01/02/2026 10:00:00", "word_id": "w1", "mode": "en-tr", "correct": "maybe"},
+    ]
+    report = IngestReport()
+    sheet_store = EventStore.from_rows(sheet_rows, ALIASES, report)
+    check("a single ingest pass gives event_stream's events", list(sheet_store) == event_stream(sheet_rows, ALIASES))
+    check("and duplicate_rows' report", report.duplicates == duplicate_rows(sheet_rows) and len(report.duplicates) > 0,
+          f"{len(report.duplicates)} vs {len(duplicate_rows(sheet_rows))}")
+    check("and counts each rejected row once, by reason",
+          report.rejected == {"timestamp": 1, "word_id": 1, "correct": 1} and report.rows == len(sheet_rows),
+          f"{dict(report.rejected)}")
+    parser = TimestampParser()
+    mixed = ["01/02/2026 10:00", "2026-01-02T10:00:00Z", "01/02/2026 10:00:05", "garbage", ""]
+    check("and the cached timestamp format parses as parse_timestamp does",
+          report.timestamp_format == "%m/%d/%Y %H:%M:%S"
+          and [parser(value) for value in mixed] == [parse_timestamp(value) for value in mixed])
+
+    # Junk modes are kept as event_stream keeps them, however many there are,
+    # and a repeat is still a repeat only within one mode.
+    junk = [
+        {"timestamp": "2026-01-02 10:00:00", "word_id": "w1", "mode": f"junk-{n % 300}", "correct": "true"}
+        for n in range(600)
+    ]
+    check("more modes than a byte can count are stored and deduped per mode",
+          list(EventStore.from_rows(junk, ALIASES)) == event_stream(junk, ALIASES) and len(event_stream(junk, ALIASES)) == 300)
+
+    # Streaming a file into the store must give the same events whatever the
+    # format, and memory must grow with the store's columns, not the rows.
+    with tempfile.TemporaryDirectory() as tmp:
+        exports = {name: Path(tmp) / name for name in ("results.csv", "results.json.gz", "results.ndjson")}
+        with exports["results.csv"].open("w", encoding="utf-8", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=["correct", "mode", "word_id", "timestamp"])
+            writer.writeheader()
+            writer.writerows(rows)
+        exports["results.json.gz"].write_bytes(gzip.compress(json.dumps(rows, indent=1).encode("utf-8")))
+        exports["results.ndjson"].write_text("\n".join(json.dumps(row) for row in rows), encoding="utf-8")
+        wrong_formats = [
+            name for name, path in exports.items()
+            if list(EventStore.from_records(iter_records(str(path)), ALIASES)) != events
+        ]
+        check("streamed CSV, gzipped JSON and NDJSON give the same events", not wrong_formats, f"differ: {wrong_formats}")
+
+        # Three overlapping sources, each in time order but for answers synced a
+        # few rows late, must merge into one ordered stream that counts each
+        # answer once.
+        by_time = sorted(rows, key=lambda row: parse_timestamp(row["timestamp"]))
+        third = len(by_time) // 3
+        archive, recent, export = by_time[: 2 * third], by_time[third:], by_time[third : 2 * third]
+        late = random.Random(9)
+        for start in range(0, len(recent) - 8, 50):
+            recent[start : start + 8] = late.sample(recent[start : start + 8], 8)
+        exports["archive.csv"] = Path(tmp) / "archive.csv"
+        with exports["archive.csv"].open("w", encoding="utf-8", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(archive[0]))
+            writer.writeheader()
+            writer.writerows(archive)
+        merged = list(
+            merge_records([iter_records(str(exports["archive.csv"])), records_from_rows(recent), records_from_rows(export)])
+        )
+        check("a k-way merge of overlapping sources comes out in time order",
+              all(a[0] <= b[0] for a, b in zip(merged, merged[1:])))
+        check("and takes an answer found in several sources once", len(merged) == len(by_time),
+              f"{len(merged)} records for {len(by_time)} answers")
+        sheet = [("2026-02-01 10:00:00", "w1", "en-tr", "TRUE"), ("2026-02-01 10:00:00", "w1", "en-tr", "TRUE"),
+                 ("2026-02-01 10:05:00", "w2", "en-tr", "FALSE")]
+        migrated = [("2026-02-01T10:00:00Z", "w1", "en-tr", True), ("2026-02-01T10:05:00Z", "w2", "en-tr", False)]
+        overlap = IngestReport()
+        EventStore.from_records(merge_records([iter(sheet), iter(migrated)]), {}, overlap)
+        check("a repeat within one source is still reported, the overlap is not",
+              [(answer[1], positions) for answer, positions in overlap.duplicates] == [("w1", [0, 1])],
+              str(overlap.duplicates))
+        # Ties come out in source order rather than the rows' original order,
+        # which no score depends on.
+        check("and scores each answer once", reference_scores(EventStore.from_records(merged, ALIASES)) == expected)
+
+        peaks = []
+        for count in (10000, 40000):
+            path = Path(tmp) / f"history-{count}.csv.gz"
+            ordered_rows = sorted(synthetic_rows(count, seed=5), key=lambda row: row["timestamp"])
+            with gzip.open(path, "wt", encoding="utf-8", newline="") as handle:
+                writer = csv.DictWriter(handle, fieldnames=list(ordered_rows[0]))
+                writer.writeheader()
+                writer.writerows(ordered_rows)
+            tracemalloc.start()
+            EventStore.from_records(iter_records(str(path)), ALIASES)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        per_row = (peaks[1] - peaks[0]) / 30000
+        check("and a streamed read costs well under 64 bytes per extra row", per_row < 64, f"{per_row:.0f} bytes")
+    store_groups = store.by_key()
+
+    # The sweep sums counts for every tau in the grid at once; each config must
+    # rank the deck as compute_scores would under that config alone.
+    configs = config_grid(
+        tau_wrong_days=[14.0, 21.0],
+        tau_right_by_freq=[DEFAULT_CONFIG.tau_right_by_freq, {"freq-100": 2.0, "freq-500": 9.0}],
+        weight_wrong=[1.0, 1.5],
+        novelty_bonus=[0.5, 1.0],
+    )
+    worst = 0.0
+    same_order = True
+    for result in sweep(store, DECK_TAGS, configs, ("en-tr", "tr-en"), NOW, 5):
+        config = result.config
+        direct = {}
+        for word_id, tags in DECK_TAGS.items():
+            tau_right = min(
+                (config.tau_right_by_freq[tag] for tag in tags if tag in config.tau_right_by_freq),
+                default=config.tau_right_default_days,
+            )
+            direct[word_id] = max(
+                compute_scores(store_groups.get((word_id, mode), []), NOW, config, tau_right)[2]
+                for mode in ("en-tr", "tr-en")
+            )
+        worst = max(worst, max(abs(direct[word_id] - result.scores[word_id]) for word_id in direct))
+        ranked = sorted(direct.items(), key=lambda entry: (-entry[1], entry[0]))
+        same_order = same_order and [word_id for word_id, _ in ranked[:5]] == result.top_ids
+    check(f"a sweep of {len(configs)} configs scores each like compute_scores", worst <= TOLERANCE, f"max delta {worst}")
+    check("and picks the same top-N under each", same_order)
+
+    # The scheduler only revisits words whose score crosses the cutoff; at every
+    # time it must still pick what ranking the whole deck from scratch picks.
+    deck_taus = {word_id: TAUS.get(word_id, DEFAULT_CONFIG.tau_right_default_days) for word_id in DECK_TAGS}
+    modes = ("en-tr", "tr-en")
+    scheduler = PracticeScheduler({key: ScoreState(**vars(state)) for key, state in states.items()}, deck_taus, modes, 4, NOW)
+    brute_states = {key: ScoreState(**vars(state)) for key, state in states.items()}
+
+    def brute_force(at: datetime) -> list[str]:
+        ranked = sorted(
+            (
+                (
+                    max(
+                        brute_states.get((word_id, mode), ScoreState()).score(at, DEFAULT_CONFIG, tau)[2]
+                        for mode in modes
+                    ),
+                    word_id,
+                )
+                for word_id, tau in deck_taus.items()
+            ),
+            key=lambda entry: (-entry[0], entry[1]),
+        )
+        return [word_id for _, word_id in ranked[:4]]
+
+    mismatches = []
+    rng = random.Random(11)
+    for step in range(1, 120):
+        at = NOW + timedelta(hours=6 * step)
+        if step % 10 == 0:
+            # A fresh answer mid-way: only that key is rescheduled.
+            word_id, mode, correct = rng.choice(list(deck_taus)), rng.choice(modes), rng.random() < 0.5
+            scheduler.record(at, word_id, mode, correct)
+            brute_states.setdefault((word_id, mode), ScoreState()).fold(
+                at, correct, DEFAULT_CONFIG.tau_wrong_days, deck_taus[word_id]
+            )
+            at += timedelta(minutes=1)
+        if [word_id for word_id, _ in scheduler.practice_set(at)] != brute_force(at):
+            mismatches.append(at.isoformat())
+    check(
+        "the crossing scheduler picks what a full re-rank picks",
+        not mismatches,
+        f"differs at {mismatches[:3]}",
+    )
+    check("and popped crossings rather than re-ranking each time", scheduler.popped > 0 and scheduler.rebases < 10)
+
+    # The service folds rows as they are posted and filters by tag per query.
+    items = [
+        {"id": word_id, "tags": sorted(tags | {f"unit-{int(word_id[1:]) % 3}"})}
+        for word_id, tags in DECK_TAGS.items()
+    ] + [{"id": alias, "tags": ["unit-0"]} for alias in ALIASES]
+    service = ScoreService(items, ALIASES)
+    ordered = sorted(rows, key=lambda row: row["timestamp"])
+    service.ingest(ordered[: len(ordered) // 2])
+    _, stale = service.ingest(ordered[: len(ordered) // 4])
+    service.ingest(ordered[len(ordered) // 2 :])
+    check(
+        "the service folds posted rows once and reports old ones stale",
+        service.store.events == len(events) and stale == len(EventStore.from_rows(ordered[: len(ordered) // 4], ALIASES)),
+        f"held {service.store.events} of {len(events)}, {stale} stale",
+    )
+    wrong_filters = []
+    for include, exclude in (((), ()), (("unit-0",), ()), (("unit-1",), ("freq-500",)), ((), ("unit-2",))):
+        expected_ids = sorted(
+            (
+                (
+                    max(
+                        compute_scores(store_groups.get((word_id, mode), []), NOW, DEFAULT_CONFIG, service.taus[word_id])[2]
+                        for mode in ("en-tr", "tr-en")
+                    ),
+                    word_id,
+                )
+                for word_id in group_by_canonical(filter_items(items, set(include), set(exclude)), ALIASES)
+            ),
+            key=lambda entry: (-entry[0], entry[1]),
+        )[:5]
+        got = service.top(5, ("en-tr", "tr-en"), include, exclude, NOW)
+        if [word_id for _, word_id in expected_ids] != [word_id for word_id, _ in got]:
+            wrong_filters.append((include, exclude))
+    check("and ranks each filter as build_today.py would", not wrong_filters, f"differs for {wrong_filters}")
+
+    server = make_server(service, "127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        request = urllib.request.Request(
+            f"{base}/events",
+            data=json.dumps({"timestamp": "2026-02-26 00:00:00", "word_id": "w3-alias", "mode": "en-tr", "correct": "false"}).encode(),
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            posted = json.load(response)
+        with urllib.request.urlopen(f"{base}/top?n=3&mode=both&include=unit-0", timeout=5) as response:
+            served = json.load(response)
+        refused = []
+        for length in ("lots", "-1"):
+            connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+            connection.putrequest("POST", "/events")
+            connection.putheader("Content-Length", length)
+            connection.endheaders(b"[]")
+            refused.append(connection.getresponse().status)
+            connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    check(
+        "and serves both over HTTP",
+        posted["folded"] == 1 and len(served["items"]) == 3 and sorted(served["mode"]) == ["en-tr", "tr-en"],
+        f"{posted} / {served}",
+    )
+    check("and answers a malformed Content-Length with 400", refused == [400, 400], f"{refused}")
+
+    # A group of learners scored in a process pool must get, each, what scoring
+    # their own history alone gives, with the deck shared rather than re-read.
+    histories = {"ayse": rows[::2], "mert": rows[1::2], "both": rows}
+    with tempfile.TemporaryDirectory() as tmp:
+        learners = []
+        for name, history in histories.items():
+            path = Path(tmp) / f"{name}.ndjson"
+            path.write_text("\n".join(json.dumps(row) for row in history), encoding="utf-8")
+            include = ["unit-1"] if name == "mert" else []
+            learners.append({"name": name, "results": [str(path)], "include": include, "exclude": []})
+        specs = [{"name": "practice", "include": [], "exclude": []}, {"name": "unit-0", "include": ["unit-0"], "exclude": []}]
+        deck = SharedDeck(
+            aliases=ALIASES,
+            taus=service.taus,
+            index=TagIndex(items),
+            specs=specs,
+            modes=("en-tr", "tr-en"),
+            limit=4,
+            engine="python",
+            now=NOW,
+            out_dir=Path(tmp) / "reports",
+        )
+        summaries = score_learners(learners, deck, workers=2)
+        reports = {
+            summary["name"]: json.loads(Path(summary["path"]).read_text(encoding="utf-8"))
+            for summary in summaries
+            if "path" in summary
+        }
+    wrong_learners = []
+    for learner in learners:
+        alone = score_canonicals(EventStore.from_rows(histories[learner["name"]], ALIASES), deck.taus, deck.modes, NOW)
+        own_specs = [{**spec, "include": spec["include"] + learner["include"]} for spec in specs]
+        report = reports.get(learner["name"], {})
+        if (report.get("table") != {word_id: round(score, 6) for word_id, score in alone}
+                or report.get("sets") != expected_sets(own_specs, items, ALIASES, dict(alone), 4)):
+            wrong_learners.append(learner["name"])
+    check(
+        "learners scored in a pool each get their own history's table and sets",
+        len(reports) == 3 and not wrong_learners,
+        f"{summaries} / differ: {wrong_learners}",
+    )
+
+    # Batch mode scores the real deck once for every filter. Each set in its
+    # report must be what filtering the deck and scoring each canonical with
+    # compute_scores gives, with --exclude-tag applied on top of every filter.
+    deck_items = list(iter_items(load_vocab_files()))
+    deck_aliases = load_aliases()
+    rng = random.Random(11)
+    answered = sorted({str(item["id"]) for item in deck_items})[::25] + sorted(deck_aliases)[:10]
+    deck_rows = [
+        {
+            "timestamp": (NOW - timedelta(minutes=rng.randrange(365 * 24 * 60))).strftime("%Y-%m-%d %H:%M:%S"),
+            "word_id": rng.choice(answered),
+            "mode": rng.choice(("en-tr", "tr-en")),
+            "correct": rng.choice(("true", "false", "true")),
+        }
+        for _ in range(1500)
+    ]
+    filters = [
+        {"name": "nouns", "include": ["noun"]},
+        {"include": ["verb", "unit-a1"], "exclude": ["unit-a1-4b"]},
+        {"name": "nothing", "include": ["no-such-tag"]},
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        results_path = Path(tmp) / "results.csv"
+        with results_path.open("w", encoding="utf-8", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(deck_rows[0]))
+            writer.writeheader()
+            writer.writerows(deck_rows)
+        filters_path = Path(tmp) / "filters.json"
+        filters_path.write_text(json.dumps(filters), encoding="utf-8")
+        report_path = Path(tmp) / "report.json"
+        batch_args = ["--results", str(results_path), "--mode", "both", "--limit", "5", "--exclude-tag", "pronunciation"]
+        code, output = run_build_today(
+            *batch_args, "--filters", str(filters_path), "--each-tag-prefix", "unit-a2-", "--report", str(report_path)
+        )
+        batch = json.loads(report_path.read_text(encoding="utf-8")) if report_path.exists() else {}
+
+        bad_path = Path(tmp) / "bad.json"
+        bad_path.write_text("{not json", encoding="utf-8")
+        bad_report = ["--report", str(Path(tmp) / "bad-report.json")]
+        bad_code, bad_output = run_build_today(*batch_args, "--filters", str(bad_path), *bad_report)
+        bad_path.write_text(json.dumps({"name": "nouns", "include": ["noun"]}), encoding="utf-8")
+        shape_code, shape_output = run_build_today(*batch_args, "--filters", str(bad_path), *bad_report)
+        none_code, none_output = run_build_today(*batch_args, "--each-tag-prefix", "zzz-", *bad_report)
+        bad_reports = list(Path(tmp).glob("bad-report*"))
+
+    now = datetime.fromisoformat(batch["generated_at"]) if batch else NOW
+    deck_events: dict[tuple[str, str], list] = {}
+    for timestamp, word_id, mode, correct in event_stream(deck_rows, deck_aliases):
+        deck_events.setdefault((word_id, mode), []).append((timestamp, correct))
+    deck_scores = {
+        canonical_id: max(
+            compute_scores(
+                deck_events.get((canonical_id, mode), []),
+                now,
+                DEFAULT_CONFIG,
+                tau_right_for(representative(canonical_id, grouped).get("tags", []) or []),
+            )[2]
+            for mode in ("tr-en", "en-tr")
+        )
+        for canonical_id, grouped in group_by_canonical(deck_items, deck_aliases).items()
+    }
+    unit_tags = [
+        tag["id"] for tag in json.loads(build_today.TAGS_PATH.read_text(encoding="utf-8"))["tags"]
+        if tag["id"].startswith("unit-a2-")
+    ]
+    specs = [
+        {"name": "nouns", "include": ["noun"], "exclude": ["pronunciation"]},
+        {"name": "verb+unit-a1", "include": ["verb", "unit-a1"], "exclude": ["pronunciation", "unit-a1-4b"]},
+        {"name": "nothing", "include": ["no-such-tag"], "exclude": ["pronunciation"]},
+    ] + [{"name": tag_id, "include": [tag_id], "exclude": ["pronunciation"]} for tag_id in unit_tags]
+    sets = batch.get("sets", [])
+    check(
+        "a --report holds one set per --filters entry and per matching tag",
+        code == 0 and [entry["name"] for entry in sets] == [spec["name"] for spec in specs],
+        f"exit {code}: {output.strip()[-200:]}",
+    )
+    want = {entry["name"]: entry for entry in expected_sets(specs, deck_items, deck_aliases, deck_scores, 5)}
+    wrong_sets = [entry["name"] for entry in sets if entry != want.get(entry["name"])]
+    check(
+        "and each set is the filtered deck's top --limit by compute_scores",
+        sets and not wrong_sets and any(entry["ids"] for entry in sets) and batch.get("events") == len(deck_rows),
+        f"differ: {wrong_sets}",
+    )
+    check(
+        "an unreadable or misshapen --filters file stops with an error and no report",
+        (bad_code, shape_code) == (2, 2) and "cannot read --filters" in bad_output
+        and "must hold a list" in shape_output and not bad_reports,
+        f"{bad_code}: {bad_output.strip()} / {shape_code}: {shape_output.strip()}",
+    )
+    check(
+        "and so does an --each-tag-prefix matching no tag",
+        none_code == 2 and "matched no tag" in none_output,
+        f"{none_code}: {none_output.strip()}",
+    )
+
+    # A snapshot cut at a shared timestamp, plus the rows after it, must score as
+    # the whole log does: to the bit for plain keys, within rounding for the
+    # alias-merged ones, and still so once reloaded or given a new alias.
+    snapshot = Snapshot.build(rows, cut)
+    exact, total, worst, drifted = compare(snapshot, rows, ALIASES, TAUS, NOW)
+    merged = {"w3", "w7"}
+    resumed = fold_tail(snapshot, rows, ALIASES, TAUS)
+    exact_plain = all(
+        resumed[key].score(NOW, DEFAULT_CONFIG, TAUS.get(key[0], DEFAULT_CONFIG.tau_right_default_days)) == scores
+        for key, scores in expected.items()
+        if key[0] not in merged
+    )
+    check(
+        "a snapshot plus its tail scores as the full log does",
+        not drifted and exact_plain,
+        f"{exact}/{total} exact, worst {worst}, drifted {drifted[:5]}",
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "snapshot.json"
+        snapshot.save(path)
+        reloaded = Snapshot.load(path)
+    check("and survives a save and reload", compare(reloaded, rows, ALIASES, TAUS, NOW) == (exact, total, worst, drifted))
+    late_aliases = ALIASES | {"w11": "w10"}
+    _, _, worst, drifted = compare(reloaded, rows, late_aliases, TAUS, NOW)
+    check("and an alias added after compaction still lands", not drifted, f"worst {worst}, drifted {drifted[:5]}")
+    backdated = dict(rows[0], timestamp=(cut - timedelta(days=3)).strftime("%Y-%m-%d %H:%M:%S"))
+    _, before = reloaded.tail([*rows, backdated])
+    check("and a row back-dated below the cutoff is noticed", before == reloaded.rows + 1 and reloaded.tail(rows)[1] == reloaded.rows)
+    tail_only, _ = reloaded.tail(rows)
+    check(
+        "but a log replaced by its tail is not, unless a row is back-dated into it",
+        not reloaded.changed_below(reloaded.tail(tail_only)[1])
+        and reloaded.changed_below(reloaded.tail([*tail_only, backdated])[1]),
+    )
+
+    # The backtest folds as it goes; each prediction must be what compute_scores
+    # gives on that key's history up to (not including) the answer.
+    replay = backtest(events, DECK_TAGS, DEFAULT_CONFIG, ("en-tr", "tr-en"), limit=3)
+    history: dict[tuple[str, str], list] = {}
+    replayed = []
+    for timestamp, word_id, mode, correct in events:
+        entries = history.setdefault((word_id, mode), [])
+        tau = TAUS.get(word_id, DEFAULT_CONFIG.tau_right_default_days)
+        replayed.append((compute_scores(entries, timestamp, DEFAULT_CONFIG, tau)[2], not correct))
+        entries.append((timestamp, correct))
+    worst = max(abs(got[0] - want[0]) for got, want in zip(replay.predictions, replayed))
+    check(
+        "a backtest predicts each answer from the history before it",
+        len(replay.predictions) == len(replayed) == replay.events
+        and [wrong for _, wrong in replay.predictions] == [wrong for _, wrong in replayed]
+        and worst <= TOLERANCE,
+        f"{len(replay.predictions)} vs {len(replayed)} predictions, worst {worst}",
+    )
+    only_en_tr = backtest(events, DECK_TAGS, DEFAULT_CONFIG, ("en-tr",))
+    check("and only over the modes asked for", only_en_tr.events == sum(mode == "en-tr" for _, _, mode, _ in events))
+
+    # Two sessions an afternoon apart: the second picks the word answered wrong.
+    start = NOW - timedelta(days=1)
+    short = [
+        (start, "w5", "en-tr", False),
+        (start + timedelta(minutes=5), "w6", "en-tr", True),
+        (start + timedelta(hours=4), "w5", "en-tr", True),
+    ]
+    small = backtest(short, {"w5": set(), "w6": set()}, DEFAULT_CONFIG, ("en-tr",), limit=1)
+    check(
+        "and starts a session after each gap, picking the top-scored words",
+        small.sessions == 2 and [picked for _, picked in small.selections] == [["w5"], ["w5"]],
+        f"{small.sessions} sessions, {small.selections}",
+    )
+    check("and counts the wrong answers it picked", (small.answered, small.answered_wrong, small.picked_answered, small.picked_wrong) == (3, 1, 2, 1))
+
+    # AUC is the chance a wrong answer was scored above a right one, ties half:
+    # wrong {0.9, 0.5} against right {0.1, 0.5} wins 3 pairs and ties 1.
+    known = BacktestReport(predictions=[(0.9, True), (0.1, False), (0.5, True), (0.5, False)])
+    check("the AUC counts a tie as half a pair", known.auc() == 0.875, str(known.auc()))
+    reversed_auc = BacktestReport(predictions=[(0.1, True), (0.9, False)]).auc()
+    check("and is 0 when every wrong answer scored lowest", reversed_auc == 0.0, str(reversed_auc))
+    check("and is None with only one kind of answer", BacktestReport(predictions=[(0.4, True), (0.6, True)]).auc() is None)
+
+    try:
+        from score_kernel import score_events
+    except ImportError:
+        print("  skip  NumPy kernel: numpy is not installed")
+    else:
+        delta = max_delta(expected, score_events(events, TAUS, NOW))
+        check("the NumPy kernel agrees with compute_scores", delta <= TOLERANCE, f"max delta {delta}")
+        delta = max_delta(expected, score_events(store, TAUS, NOW))
+        check("and reads the event store's columns in place", delta <= TOLERANCE, f"max delta {delta}")
+
+        # decay() leaves a score alone when `now` precedes the last event; a naive
+        # sum of exponentials would weight those future events above one.
+        early = events[split][0]
+        by_key: dict[tuple[str, str], list] = {}
+        for timestamp, word_id, mode, correct in events:
+            by_key.setdefault((word_id, mode), []).append((timestamp, correct))
+        reference = {
+            key: compute_scores(entries, early, DEFAULT_CONFIG, TAUS.get(key[0], DEFAULT_CONFIG.tau_right_default_days))
+            for key, entries in by_key.items()
+        }
+        delta = max_delta(reference, score_events(events, TAUS, early))
+        check("and still agrees when `now` falls mid-history", delta <= TOLERANCE, f"max delta {delta}")
+
+    print()
+    if failures:
+        print("\n".join(failures))
+        print(f"\n{len(failures)} check(s) failed.")
+        return 1
+    print("Scoring engine tests passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""The pooled PostgREST client must read exactly what offset paging read.
+
+Runs against the in-process stand-in in fake_postgrest.py:
+
+    .venv/bin/python scripts/tests/test_supabase_client.py
+
+The history is built so keyset paging has something to get wrong: runs of
+answers sharing one answered_at that straddle the 1000-row page boundary, and
+word ids with the commas and quotes an or=(...) filter has to survive.
+"""
+
+import sys
+import tempfile
+import urllib.error
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from urllib.parse import quote
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from build_today import load_results_supabase, pushdown_ids  # noqa: E402
+from bulk_writer import BulkWriter  # noqa: E402
+from fake_postgrest import FakePostgrest  # noqa: E402
+from supabase_client import SupabaseClient, in_filters  # noqa: E402
+
+START = datetime(2026, 3, 1, 8, 0, 0, tzinfo=UTC)
+
+failures: list[str] = []
+
+
+def check(name: str, ok: bool, detail: str = "") -> None:
+    if ok:
+        print(f"  ok    {name}")
+    else:
+        failures.append(f"  FAIL  {name}" + (f"\n        {detail}" if detail else ""))
+
+
+def history(count: int) -> list[dict]:
+    rows = []
+    for n in range(count):
+        rows.append(
+            {
+                # Ids are not in answered_at order: a queued answer synced late
+                # gets a high id and an old timestamp.
+                "id": (n * 7919) % count + 1,
+                # Seventeen answers to a timestamp, so ties cross every page edge.
+                "answered_at": (START + timedelta(seconds=n // 17)).isoformat(),
+                "word_id": ["gel", 'say, "bir"', "ev\\", "çay"][n % 4],
+                "mode": "en-tr",
+                "correct": n % 3 != 0,
+            }
+        )
+    return rows
+
+
+def main() -> int:
+    results = history(3000)
+    words = [{"word": word} for word in ["ağaç", "a,b", 'iki "söz"', *(f"w{n:04d}" for n in range(2100))]]
+    fake = FakePostgrest({"results": results, "pron_audio": words})
+    url = fake.start()
+    by_key = sorted(results, key=lambda row: (row["answered_at"], row["id"]))
+    try:
+        with SupabaseClient(url, "anon", "secret") as client:
+            rows = client.read_all("results", "id,answered_at,word_id,mode,correct", order=("answered_at", "id"))
+            check("a keyset read returns every row once, in (answered_at, id) order",
+                  [row["id"] for row in rows] == [row["id"] for row in by_key], f"{len(rows)} of {len(by_key)}")
+            check("keyset pages never ask for an offset", not any("offset=" in path for path in fake.requests))
+            check("sequential pages share one kept-alive connection", client.opened == 1 and fake.connections == 1,
+                  f"{client.opened} opened")
+
+            since = by_key[1234]["answered_at"]
+            tail = client.read_all("results", "id,answered_at", order=("answered_at", "id"),
+                                   filters=[f"answered_at=gte.{quote(since)}"])
+            check("a since filter is inclusive and survives the +00:00 offset",
+                  [row["id"] for row in tail] == [row["id"] for row in by_key if row["answered_at"] >= since])
+
+            early = (START + timedelta(seconds=2)).isoformat()
+            quoted = SupabaseClient(url, "anon", "secret", page_size=3)
+            odd = quoted.read_all("results", "id,word_id", order=("word_id", "id"),
+                                  filters=[f"answered_at=lt.{quote(early)}"])
+            expected = sorted((row for row in results if row["answered_at"] < early),
+                              key=lambda row: (row["word_id"], row["id"]))
+            check("keyset values with commas, quotes and backslashes page correctly",
+                  [row["id"] for row in odd] == [row["id"] for row in expected], f"{len(odd)} of {len(expected)}")
+            quoted.close()
+
+            present = client.read_all("pron_audio", "word", order=("word",))
+            check("a single-column keyset reads a table past 1000 rows",
+                  sorted(row["word"] for row in present) == sorted(row["word"] for row in words)
+                  and len(present) == len(words))
+
+            check("count=exact counts the filtered rows",
+                  client.count("results", ["word_id=eq.gel"]) == sum(row["word_id"] == "gel" for row in results))
+
+            fake.hangups = 1
+            again = client.read_all("pron_audio", "word", order=("word",))
+            check("a connection the server dropped is replaced and the read retried", again == present,
+                  f"{len(again)} rows")
+
+            try:
+                client.get_json("/rest/v1/nope?select=id")
+            except urllib.error.HTTPError as exc:
+                check("an error response raises HTTPError with PostgREST's body",
+                      exc.code == 404 and b"does not exist" in exc.read())
+            else:
+                check("an error response raises HTTPError with PostgREST's body", False, "no error")
+
+        # 3000 rows is three full pages, so the parallel read also has to make
+        # the keyset follow-up read that finds nothing more.
+        with SupabaseClient(url, "anon", "secret", connections=3) as client:
+            parallel = client.read_all("results", "id,answered_at", order=("answered_at", "id"), parallel=True)
+            check("a parallel read matches the keyset read",
+                  [row["id"] for row in parallel] == [row["id"] for row in by_key])
+            check("a parallel read stays within the pool", client.opened <= 3, f"{client.opened} opened")
+
+        loaded = load_results_supabase(url, "anon", "secret")
+        check("load_results_supabase keeps its row shape",
+              [(row["timestamp"], row["word_id"], row["correct"]) for row in loaded]
+              == [(row["answered_at"], row["word_id"], row["correct"]) for row in by_key])
+
+        # A tag filter's ids go into the query; the long list here needs
+        # several in.(...) chunks, whose rows must come back merged in order.
+        wanted = ['say, "bir"', "ev\\", *(f"x{n:04d}" for n in range(900))]
+        chunks = in_filters("word_id", wanted)
+        check("in.(...) filters stay within the request-line budget and cover every id",
+              len(chunks) > 1 and all(len(chunk) <= 4000 for chunk in chunks)
+              and all(quote(f'"x{n:04d}"', safe="") in "".join(chunks) for n in range(900)),
+              f"{[len(chunk) for chunk in chunks]}")
+        pushed = load_results_supabase(url, "anon", "secret", word_ids=wanted, modes=("en-tr",))
+        check("a pushed-down read returns just those ids' rows, in order",
+              [(row["timestamp"], row["word_id"]) for row in pushed]
+              == [(row["answered_at"], row["word_id"]) for row in by_key if row["word_id"] in wanted],
+              f"{len(pushed)} rows")
+        check("and filters by mode too",
+              load_results_supabase(url, "anon", "secret", word_ids=wanted, modes=("tr-en",)) == [])
+        deck = [{"id": "gel"}, {"id": "ev-alt"}, {"id": "su"}]
+        check("pushdown ids cover every alias onto a filtered canonical id",
+              pushdown_ids(deck[:2], {"ev-alt": "ev\\", "gelmek": "gel", "su-alt": "su"}) == ["ev-alt", "ev\\", "gel", "gelmek"])
+
+        # Bulk writes: byte-budgeted batches, retried through 429/5xx, split on
+        # 413, and resumable from the checkpoint without sending a row twice.
+        records = [
+            {"client_event_id": f"e{n:05d}", "word_id": ["gel", "ağaç"][n % 2], "mode": "en-tr", "correct": n % 3 != 0}
+            for n in range(2500)
+        ]
+        fake.tables["writes"] = []
+        fake.refusals = [429, 503, 502]
+        with SupabaseClient(url, "anon", "secret", connections=4) as client:
+            writer = BulkWriter(client, "writes", on_conflict="client_event_id", batch_bytes=8000, sleep=lambda _: None)
+            result = writer.write(records, key=lambda record: record["client_event_id"])
+        check("bulk writes land every row once, in batches within the byte budget",
+              sorted(row["client_event_id"] for row in fake.tables["writes"]) == [r["client_event_id"] for r in records]
+              and result.sent == len(records) and result.batches == len(fake.posts) > 1,
+              f"{len(fake.tables['writes'])} rows, {result}")
+        check("and retry what the server refused for now", result.retries == 3, f"{result.retries} retries")
+
+        fake.tables["writes"], fake.posts = [], []
+        fake.max_body = 3000
+        with SupabaseClient(url, "anon", "secret") as client:
+            writer = BulkWriter(client, "writes", on_conflict="client_event_id", batch_bytes=8000, sleep=lambda _: None)
+            writer.write(records, key=lambda record: record["client_event_id"])
+        check("and split a batch the server finds too large",
+              len(fake.tables["writes"]) == len(records) and writer.batch_bytes <= 3000, f"budget {writer.batch_bytes}")
+        fake.max_body = None
+
+        def interrupted(limit: int):
+            for number, record in enumerate(records):
+                if number == limit:
+                    raise KeyboardInterrupt
+                yield record
+
+        fake.tables["writes"], fake.posts = [], []
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = Path(tmp) / "writes.checkpoint"
+            with SupabaseClient(url, "anon", "secret", connections=4) as client:
+                writer = BulkWriter(client, "writes", on_conflict="client_event_id", checkpoint=checkpoint, batch_bytes=8000)
+                try:
+                    writer.write(interrupted(1200), key=lambda record: record["client_event_id"])
+                except KeyboardInterrupt:
+                    pass
+                stopped_at = len(fake.tables["writes"])
+                kept = checkpoint.exists()
+                resumed = BulkWriter(client, "writes", on_conflict="client_event_id", checkpoint=checkpoint, batch_bytes=8000)
+                result = resumed.write(records, key=lambda record: record["client_event_id"])
+            check("an interrupted bulk write resumes from its checkpoint without resending a row",
+                  kept and result.skipped == stopped_at > 0 and sum(fake.posts) == len(records)
+                  and len(fake.tables["writes"]) == len(records),
+                  f"stopped at {stopped_at}, {result}, {sum(fake.posts)} rows posted")
+            check("and drops the checkpoint once complete", not checkpoint.exists())
+    finally:
+        fake.stop()
+
+    print()
+    if failures:
+        print("\n".join(failures))
+        print(f"\n{len(failures)} check(s) failed.")
+        return 1
+    print("Supabase client tests passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
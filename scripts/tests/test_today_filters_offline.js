@@ -38,4 +38,24 @@ expected.cases.forEach((testCase) => {
   });
 });
 
+// The bitset index built from export_quiz.py-style postings must filter exactly
+// as one built by walking the items.
+const postings = {};
+quiz.items.forEach((item, position) => {
+  (item.tags || []).forEach((tag) => {
+    (postings[tag] = postings[tag] || []).push(position);
+  });
+});
+const fromPostings = TodayScoring.buildTagIndex(quiz.items, postings);
+const fromItems = TodayScoring.buildTagIndex(quiz.items);
+assert.deepStrictEqual(fromPostings.counts, fromItems.counts, "tag counts differ");
+Object.keys(postings).forEach((tag) => {
+  const include = new Set([tag]);
+  assert.deepStrictEqual(
+    TodayScoring.filterItems(quiz.items, include, new Set(), fromPostings),
+    TodayScoring.filterItems(quiz.items, include, new Set(), fromItems),
+    `postings index disagrees for ${tag}`
+  );
+});
+
 console.log("Today filter recompute tests passed.");
@@ -15,6 +15,11 @@ to repeat. `--refresh` re-sends them, but that is an upsert onto an existing
 row, which Postgres treats as an UPDATE — the table grants only select and
 insert, so --refresh needs an update policy added first.
 
+Clips go through bulk_writer: POSTs of up to --batch-bytes of JSON, a few at a
+time, retried through rate limits and 5xx. The words of committed batches are
+kept in a checkpoint, so an interrupted --refresh resumes rather than
+re-sending everything.
+
 Usage:
   python3 scripts/upload_pron_audio.py --dry-run
   python3 scripts/upload_pron_audio.py
@@ -28,18 +33,19 @@ import base64
 import json
 import sys
 import urllib.error
-import urllib.parse
-import urllib.request
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bulk_writer import BATCH_BYTES, CONCURRENCY, BulkWriter  # noqa: E402
+from export_quiz import load_quiz  # noqa: E402
 from make_pron_audio import forms, safe    # noqa: E402  one splitting rule, not two
+from supabase_client import SupabaseClient  # noqa: E402
 
 ROOT = Path(__file__).resolve().parents[1]
 AUDIO = ROOT / "resources" / "pron_audio"
 KEYS = ROOT / "resources" / "access_keys"
 QUIZ = ROOT / "web" / "data" / "quiz.json"
-BATCH = 20          # ~20 clips a request keeps each POST around 200 KB
+CHECKPOINT = ROOT / "resources" / "pron_audio_upload.checkpoint"
 
 
 def secret(name: str) -> str:
@@ -49,37 +55,17 @@ def secret(name: str) -> str:
     return path.read_text(encoding="utf-8").strip()
 
 
-def headers(url_key: str) -> dict[str, str]:
-    return {
-        "apikey": url_key,
-        "Authorization": f"Bearer {url_key}",
-        "x-app-secret": secret("supabase_app_secret.txt"),
-        "Content-Type": "application/json",
-    }
-
-
-def request(url: str, method: str, hdrs: dict, body: bytes | None = None):
-    req = urllib.request.Request(url, data=body, headers=hdrs, method=method)
-    try:
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            raw = resp.read()
-            return resp.status, (json.loads(raw) if raw else None)
-    except urllib.error.HTTPError as exc:
-        # The body carries PostgREST's actual complaint; without it every
-        # failure looks like a bare 400 and says nothing about the cause.
-        sys.exit(f"{method} {url.split('?')[0]} -> {exc.code}: {exc.read().decode()[:400]}")
-
-
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--dry-run", action="store_true")
     ap.add_argument("--refresh", action="store_true", help="re-send words already there")
     ap.add_argument("--limit", type=int)
+    ap.add_argument("--batch-bytes", type=int, default=BATCH_BYTES, help="JSON bytes per POST")
+    ap.add_argument("--concurrency", type=int, default=CONCURRENCY, help="POSTs in flight at once")
     args = ap.parse_args()
 
     base = secret("supabase_url.txt").rstrip("/")
     key = secret("supabase_anon_key.txt")
-    hdrs = headers(key)
 
     on_disk = {p.name: p for p in AUDIO.glob("*.mp3")}
     if not on_disk:
@@ -95,7 +81,7 @@ def main() -> int:
     # case-insensitive filesystem, so Mısır/mısır, Ocak/ocak and Pazar/pazar each
     # collapsed into one clip. Same pronunciation either way, and both spellings
     # get a row pointing at the same bytes.
-    wanted = sorted({f for i in json.loads(QUIZ.read_text(encoding="utf-8"))["items"]
+    wanted = sorted({f for i in load_quiz(QUIZ)["items"]
                      for f in forms(i["turkish"])})
     pairs = [(w, on_disk.get(f"{safe(w)}.mp3") or folded.get(f"{safe(w)}.mp3".casefold()))
              for w in wanted]
@@ -109,15 +95,13 @@ def main() -> int:
         # queued the rest for re-upload, which then failed: an upsert onto an
         # existing row needs an UPDATE policy, and the table has only select and
         # insert. The bad count was the cause; the RLS error was the symptom.
-        offset = 0
-        while True:
-            _, rows = request(
-                f"{base}/rest/v1/pron_audio?select=word&order=word"
-                f"&offset={offset}&limit=1000", "GET", hdrs)
-            if not rows:
-                break
-            present |= {r["word"] for r in rows}
-            offset += len(rows)
+        # Keyset pages on word, over one kept-alive connection.
+        try:
+            with SupabaseClient(base, key, secret("supabase_app_secret.txt")) as client:
+                rows = client.read_all("pron_audio", "word", order=("word",))
+        except urllib.error.HTTPError as exc:
+            sys.exit(f"GET {base}/rest/v1/pron_audio -> {exc.code}: {exc.read().decode()[:400]}")
+        present = {r["word"] for r in rows}
         print(f"{len(present)} already in the table")
 
     todo = [(w, p) for w, p in pairs if w not in present][: args.limit]
@@ -128,19 +112,25 @@ def main() -> int:
     if args.dry_run or not todo:
         return 0
 
-    sent = 0
-    url = f"{base}/rest/v1/pron_audio?on_conflict=word"
-    post = dict(hdrs, Prefer="resolution=merge-duplicates,return=minimal")
-    for start in range(0, len(todo), BATCH):
-        chunk = todo[start:start + BATCH]
-        rows = [{"word": word,
-                 "mp3_b64": base64.b64encode(path.read_bytes()).decode(),
-                 "engine": "google"} for word, path in chunk]
-        request(url, "POST", post, json.dumps(rows).encode())
-        sent += len(chunk)
-        print(f"  {sent}/{len(todo)}", flush=True)
-
-    print(f"\ndone, {sent} clips uploaded")
+    with SupabaseClient(base, key, secret("supabase_app_secret.txt"), connections=args.concurrency) as client:
+        # merge-duplicates is what --refresh needs; for a new word it inserts
+        # just as ignore-duplicates would.
+        writer = BulkWriter(client, "pron_audio", on_conflict="word", resolution="merge-duplicates",
+                            checkpoint=CHECKPOINT, batch_bytes=args.batch_bytes, concurrency=args.concurrency)
+        earlier = sum(w in writer.done for w, _ in todo)
+        if earlier:
+            print(f"resuming: {earlier} sent by the interrupted run")
+        # Built as the writer reaches them, so only the batches in flight hold
+        # their clips in memory, and none is read for a word already sent.
+        rows = ({"word": word, "mp3_b64": base64.b64encode(path.read_bytes()).decode(), "engine": "google"}
+                for word, path in todo if word not in writer.done)
+        try:
+            result = writer.write(rows, key=lambda row: row["word"],
+                                  progress=lambda done: print(f"  {earlier + done.sent}/{len(todo)}", flush=True))
+        except urllib.error.HTTPError as exc:
+            sys.exit(f"POST {base}/rest/v1/pron_audio -> {exc.code}: {exc.read().decode()[:400]}")
+
+    print(f"\ndone, {result.sent} clips uploaded")
     return 0
 
 
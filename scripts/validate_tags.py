@@ -1,28 +1,49 @@
 #!/usr/bin/env python3
 
+import argparse
 import json
 from pathlib import Path
 
+from build_manifest import BuildManifest, scripts
 
 ROOT = Path(__file__).resolve().parents[1]
 TAGS_PATH = ROOT / "data" / "tags.json"
 VOCAB_DIR = ROOT / "data" / "vocab"
 
 
-def main() -> int:
+def known_tags() -> set:
     tags_raw = json.loads(TAGS_PATH.read_text(encoding="utf-8"))
-    known = {tag.get("id") for tag in tags_raw.get("tags", [])}
+    return {tag.get("id") for tag in tags_raw.get("tags", [])}
+
 
+def tag_errors(file_name: str, items: list, known: set) -> list[str]:
+    errors: list[str] = []
+    for item in items:
+        item_id = item.get("id", "")
+        for tag_id in item.get("tags", []) or []:
+            if tag_id not in known:
+                errors.append(f"{file_name} -> {item_id}: unknown tag '{tag_id}'")
+    return errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check every vocab item's tags against data/tags.json.")
+    parser.add_argument("--force", action="store_true", help="Validate even if nothing changed since the last pass.")
+    args = parser.parse_args()
+
+    manifest = BuildManifest()
+    # Only a passing run is recorded, so a failure is reported again every time.
+    step_inputs = [TAGS_PATH, *sorted(VOCAB_DIR.glob("*.json")), *scripts("validate_tags.py")]
+    if not args.force and manifest.up_to_date("validate_tags", step_inputs):
+        print("Tag validation passed (unchanged since the last run)")
+        return 0
+
+    known = known_tags()
     errors: list[str] = []
     for path in sorted(VOCAB_DIR.glob("*.json")):
         raw = json.loads(path.read_text(encoding="utf-8"))
         items = raw.get("items", []) if isinstance(raw, dict) else raw
-
-        for item in items:
-            item_id = item.get("id", "")
-            for tag_id in item.get("tags", []) or []:
-                if tag_id not in known:
-                    errors.append(f"{path.name} -> {item_id}: unknown tag '{tag_id}'")
+        errors += tag_errors(path.name, items, known)
 
     if errors:
         print("Tag validation failed:")
@@ -30,6 +51,7 @@ def main() -> int:
             print(line)
         return 1
 
+    manifest.record("validate_tags", step_inputs)
     print("Tag validation passed")
     return 0
 
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""Keep the deck in memory and re-export it whenever a candidate file is saved.
+
+Curating a sweep meant editing data/candidates/*.candidates.json and running
+`make build` after every change to see it in the app. This holds what
+build_deck.py builds, the items of every candidate file, the alias map and the
+tag registry, and polls the sources:
+
+    .venv/bin/python scripts/watch_deck.py
+
+When a candidate file changes, only that file is re-read. Only the items whose
+export can have changed are merged and turned into quiz entries again: the
+file's ids (before and after the edit), the canonical items their aliases fold
+into, and the aliases folding into them. Then web/data/ is rewritten. A change
+to data/aliases.json or data/tags.json re-derives everything, still without
+re-reading the candidate files.
+
+The deck rules from test_deck_invariants.py (see deck_invariants) are checked
+for the touched items only, and reported after each export. An unknown tag or
+a file that does not parse is reported, and nothing is written until it is
+fixed, so the app keeps the last good deck. An alias cycle is reported too, and
+the previous aliases and tags stay in use. data/vocab/reviewed.json is not
+written; run `make build` when the session is done.
+
+One difference from build_deck.py: an id present in two candidate files ships
+once here, where the build ships both. The rules report the duplicate either way.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+from alias_table import AliasCycleError, flatten_aliases
+from build_deck import other_vocab_files, vocab_items
+from dedupe_vocab import load_aliases, merge_tags
+from deck_invariants import deck_rules
+from export_quiz import ALIASES_PATH, OUT_SHARDS_MANIFEST_PATH, TAGS_PATH, load_tags, quiz_entry, write_deck
+from rebuild_reviewed import CANDIDATES_DIR, approved_items
+from rebuild_reviewed import OUT_PATH as REVIEWED_PATH
+from validate_tags import known_tags, tag_errors
+
+Item = dict[str, Any]
+POLL_SECONDS = 0.3
+
+
+class LiveDeck:
+    """The merged deck, kept current one candidate file at a time."""
+
+    def __init__(self, candidates_dir: Path = CANDIDATES_DIR) -> None:
+        self.candidates_dir = candidates_dir
+        # Per candidate file name: every item (the rules read `source` from all
+        # of them) and the approved ones, keyed by id, as rebuild_reviewed keeps them.
+        self.sourced: dict[str, list[Item]] = {}
+        self.approved: dict[str, dict[str, Item]] = {}
+        self.entries: dict[str, Item] = {}
+        # Hand-kept vocab files, fixed for the session; they sort around reviewed.json.
+        self.extra = {path.name: vocab_items(path) for path in other_vocab_files()}
+        self.errors: dict[str, str] = {}
+        # id -> its unknown tags; while any remain, nothing is written.
+        self.tag_errors: dict[str, list[str]] = {}
+        for path in sorted(candidates_dir.glob("*.candidates.json")):
+            self.read_file(path)
+        self.load_registry()
+
+    # -- sources ---------------------------------------------------------
+
+    def read_file(self, path: Path) -> set[str]:
+        """Re-read one candidate file; the ids it held before or holds now."""
+        before = set(self.approved.get(path.name, {}))
+        if not path.exists():
+            self.sourced.pop(path.name, None)
+            self.approved.pop(path.name, None)
+            self.errors.pop(path.name, None)
+            return before
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as exc:
+            # Mid-edit: keep the last version that parsed.
+            self.errors[path.name] = str(exc)
+            return set()
+        self.errors.pop(path.name, None)
+        self.sourced[path.name] = list(data.get("items", []))
+        self.approved[path.name] = {str(item.get("id", "")): item for item in approved_items(data)}
+        return before | set(self.approved[path.name])
+
+    def load_registry(self) -> None:
+        """Aliases and tags, and every entry derived again from them.
+
+        Raises AliasCycleError before changing anything, so a watcher can keep
+        the previous registry.
+        """
+        aliases = load_aliases(ALIASES_PATH)
+        self.roots = flatten_aliases(aliases)
+        self.aliases = aliases
+        # root -> its aliases, in the order apply_aliases visits them.
+        self.members: dict[str, list[str]] = {}
+        for alias_id in self.aliases:
+            alias_key = str(alias_id).strip()
+            root = self.roots.get(alias_key, "")
+            if alias_key and root and alias_key != root:
+                self.members.setdefault(root, []).append(alias_key)
+        self.tags = load_tags()
+        self.known = known_tags()
+        self.entries = {}
+        self.tag_errors = {}
+        self.refresh(self.all_ids())
+
+    # -- the merge -------------------------------------------------------
+
+    def raw(self, item_id: str) -> Item | None:
+        # The last file in sorted order wins, as apply_aliases' by_id does.
+        found = None
+        for name in sorted(self.approved):
+            found = self.approved[name].get(item_id, found)
+        return found
+
+    def all_ids(self) -> set[str]:
+        return {item_id for items in self.approved.values() for item_id in items}
+
+    def merged(self, item_id: str) -> Item | None:
+        """The item as dedupe_vocab --apply leaves it; None if it merges away."""
+        item = self.raw(item_id)
+        if item is None:
+            return None
+        root = self.roots.get(item_id, item_id)
+        if root != item_id and self.raw(root) is not None:
+            return None  # folded into its canonical item
+        alias_items = [alias for alias in map(self.raw, self.members.get(item_id, [])) if alias is not None]
+        if not alias_items:
+            return item
+        item = dict(item)
+        for alias_item in alias_items:
+            item["tags"] = merge_tags(item.get("tags", []) or [], alias_item.get("tags", []) or [])
+            if not item.get("notes") and alias_item.get("notes"):
+                item["notes"] = alias_item.get("notes")
+            if not item.get("source") and alias_item.get("source"):
+                item["source"] = alias_item.get("source")
+        return item
+
+    def affected(self, changed: set[str]) -> set[str]:
+        """`changed` plus the canonical items their aliases fold into, and those items' aliases."""
+        roots = {self.roots.get(item_id, item_id) for item_id in changed}
+        return changed | roots | {alias for root in roots for alias in self.members.get(root, [])}
+
+    def refresh(self, item_ids: set[str]) -> None:
+        for item_id in item_ids:
+            item = self.merged(item_id)
+            entry = quiz_entry(item) if item is not None else None
+            if entry is None:
+                self.entries.pop(item_id, None)
+            else:
+                self.entries[item_id] = entry
+
+    # -- output ----------------------------------------------------------
+
+    def quiz_items(self) -> list[Item]:
+        files = {name: [entry for entry in map(quiz_entry, items) if entry is not None] for name, items in self.extra.items()}
+        files[REVIEWED_PATH.name] = [self.entries[item_id] for item_id in sorted(self.entries)]
+        return [entry for name in sorted(files) for entry in files[name]]
+
+    def check_tags(self, item_ids: set[str]) -> list[str]:
+        """Re-check the tags of `item_ids`; every unknown tag still in the deck."""
+        for item_id in item_ids:
+            item = self.merged(item_id)
+            errors = tag_errors(REVIEWED_PATH.name, [item], self.known) if item is not None else []
+            if errors:
+                self.tag_errors[item_id] = errors
+            else:
+                self.tag_errors.pop(item_id, None)
+        return [line for item_id in sorted(self.tag_errors) for line in self.tag_errors[item_id]]
+
+    def export(self) -> list[Item]:
+        quiz_items = self.quiz_items()
+        # Keep whichever form the last build left: with shards or without.
+        write_deck(quiz_items, self.tags, flatten_aliases(self.aliases), shards=OUT_SHARDS_MANIFEST_PATH.exists())
+        return quiz_items
+
+    def violations(self, quiz_items: list[Item], only: set[str]) -> list[tuple[str, list[str], str]]:
+        registry = {tag["id"] for tag in self.tags}
+        sourced = [item for name in sorted(self.sourced) for item in self.sourced[name]]
+        return [result for result in deck_rules(quiz_items, registry, sourced, only) if result[1]]
+
+
+def snapshot(paths: list[Path]) -> dict[Path, int]:
+    return {path: path.stat().st_mtime_ns for path in paths if path.exists()}
+
+
+def watched(candidates_dir: Path) -> list[Path]:
+    return [*sorted(candidates_dir.glob("*.candidates.json")), ALIASES_PATH, TAGS_PATH]
+
+
+def report(deck: LiveDeck, only: set[str] | None, started: float) -> None:
+    for name, error in sorted(deck.errors.items()):
+        print(f"  {name} does not parse, kept the last good version: {error}")
+    unknown = deck.check_tags(set(deck.all_ids()) if only is None else only)
+    if unknown:
+        print("  Tag validation failed; nothing written:")
+        for line in unknown:
+            print(f"    {line}")
+        return
+    quiz_items = deck.export()
+    print(f"  wrote {len(quiz_items)} items in {(time.perf_counter() - started) * 1000:.0f} ms")
+    touched = set(deck.entries) if only is None else only
+    for name, bad, hint in deck.violations(quiz_items, touched):
+        print(f"  rule broken: {name} ({len(bad)})")
+        for line in bad[:12]:
+            print(f"    {line}")
+        if hint:
+            print(f"    {hint}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Re-export web/data/ whenever a candidate file changes.")
+    parser.add_argument("--interval", type=float, default=POLL_SECONDS, help="Seconds between polls.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        deck = LiveDeck()
+    except AliasCycleError as exc:
+        print(f"Not started: {exc}")
+        return 1
+    print(f"Loaded {len(deck.approved)} candidate files")
+    report(deck, None, started)
+    seen = snapshot(watched(deck.candidates_dir))
+    print("Watching data/candidates/, data/aliases.json and data/tags.json; Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(args.interval)
+            now = snapshot(watched(deck.candidates_dir))
+            changed = [path for path in set(seen) | set(now) if seen.get(path) != now.get(path)]
+            seen = now
+            if not changed:
+                continue
+            started = time.perf_counter()
+            print(f"{time.strftime('%H:%M:%S')} {', '.join(sorted(path.name for path in changed))}")
+            if ALIASES_PATH in changed or TAGS_PATH in changed:
+                for path in changed:
+                    if path not in (ALIASES_PATH, TAGS_PATH):
+                        deck.read_file(path)
+                try:
+                    deck.load_registry()
+                except AliasCycleError as exc:
+                    print(f"  {exc}; kept the previous aliases and tags")
+                    deck.refresh(deck.all_ids())
+                report(deck, None, started)
+                continue
+            ids: set[str] = set()
+            for path in changed:
+                ids |= deck.read_file(path)
+            touched = deck.affected(ids)
+            deck.refresh(touched)
+            report(deck, touched, started)
+    except KeyboardInterrupt:
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,135 @@
+-- Per-(word, mode) scoring aggregates, folded where the answers live.
+--
+-- Scoring needs five numbers per (word_id, mode): wrongScore, lastWrong,
+-- rightScore, lastRight and totalEvents (see scripts/score_state.py). Every
+-- reader used to download the whole of `results` to compute them. This folds
+-- them inside Postgres and returns one row per key, so
+-- `scripts/build_today.py --aggregates` reads about two rows per deck word.
+--
+-- The fold is the Python one step for step — decay the running sum to this
+-- answer, add one — in a custom aggregate ordered by answered_at, so the
+-- numbers match the Python engine's exactly (both call the C library's exp())
+-- rather than merely closely. A closed-form sum of exp() terms would be the
+-- same in exact arithmetic, but rounds differently.
+--
+-- The right-answer tau depends on a word's frequency tags, which the database
+-- does not know, so the caller passes every tau in use and gets one right sum
+-- per tau, in the same order; it then picks the one for each word. Aliases
+-- are passed the same way (the flat alias -> canonical map), because which
+-- sum an answer lands in depends on them. As in the Python readers, exact
+-- repeats of (answered_at, word_id, mode, correct) count once, and ids and
+-- modes are trimmed.
+--
+-- The function runs with the caller's rights, so the RLS policies on
+-- `results` still decide whose answers are folded.
+--
+-- Run this in the Supabase SQL editor. scripts/tests/test_score_aggregates.py
+-- checks it against the Python engine on a local Postgres.
+
+do $$
+begin
+  create type public.score_fold as (
+    wrong       double precision,
+    last_wrong  timestamptz,
+    rights      double precision[],
+    last_right  timestamptz,
+    total       integer
+  );
+exception
+  when duplicate_object then null;  -- already there from an earlier run
+end
+$$;
+
+-- build_today.decay. Postgres 14+ extracts the interval as an exact numeric,
+-- so seconds become days with the same rounding timedelta.total_seconds() has.
+create or replace function public.score_decay(
+  score double precision, last_time timestamptz, at_time timestamptz, tau_days double precision
+) returns double precision
+language sql immutable
+as $$
+  select case
+    when score <= 0 or tau_days <= 0 then 0.0::double precision
+    when at_time <= last_time then score
+    else score * exp(
+      -(extract(epoch from at_time - last_time)::double precision / 86400.0) / tau_days
+    )
+  end
+$$;
+
+create or replace function public.score_fold_step(
+  state public.score_fold,
+  answered_at timestamptz,
+  correct boolean,
+  taus double precision[],
+  tau_wrong double precision
+) returns public.score_fold
+language plpgsql immutable
+as $$
+declare
+  rights double precision[] := state.rights;
+begin
+  state.total := state.total + 1;
+  if correct then
+    for i in 1 .. coalesce(array_length(taus, 1), 0) loop
+      rights[i] := coalesce(rights[i], 0.0);
+      if state.last_right is not null then
+        rights[i] := public.score_decay(rights[i], state.last_right, answered_at, taus[i]);
+      end if;
+      rights[i] := rights[i] + 1.0;
+    end loop;
+    state.rights := rights;
+    state.last_right := answered_at;
+  else
+    if state.last_wrong is not null then
+      state.wrong := public.score_decay(state.wrong, state.last_wrong, answered_at, tau_wrong);
+    end if;
+    state.wrong := state.wrong + 1.0;
+    state.last_wrong := answered_at;
+  end if;
+  return state;
+end
+$$;
+
+create or replace aggregate public.score_fold_agg(timestamptz, boolean, double precision[], double precision) (
+  sfunc = public.score_fold_step,
+  stype = public.score_fold,
+  initcond = '(0,,{},,0)'
+);
+
+create or replace function public.score_aggregates(
+  taus double precision[],
+  tau_wrong double precision default 21,
+  aliases jsonb default '{}'
+) returns table (
+  word_id    text,
+  mode       text,
+  wrong      double precision,
+  last_wrong timestamptz,
+  rights     double precision[],
+  last_right timestamptz,
+  total      integer
+)
+language sql stable
+as $$
+  with answers as (
+    select distinct r.answered_at, btrim(r.word_id) as raw_id, btrim(r.mode) as raw_mode, r.correct
+    from public.results r
+    where btrim(r.word_id) <> '' and btrim(r.mode) <> ''
+  ),
+  folded as (
+    select
+      coalesce(score_aggregates.aliases ->> a.raw_id, a.raw_id) as key_id,
+      a.raw_mode as key_mode,
+      public.score_fold_agg(
+        a.answered_at, a.correct, score_aggregates.taus, score_aggregates.tau_wrong
+        order by a.answered_at
+      ) as state
+    from answers a
+    group by 1, 2
+  )
+  select f.key_id, f.key_mode, (f.state).wrong, (f.state).last_wrong,
+         coalesce((f.state).rights, '{}'), (f.state).last_right, (f.state).total
+  from folded f
+$$;
+
+grant execute on function public.score_aggregates(double precision[], double precision, jsonb) to anon;
@@ -37,6 +37,13 @@ const MODE_STORAGE = "tr-quiz-mode";
 const DEFAULT_MODE = "en-tr";
 let mode = DEFAULT_MODE;
 let items = [];
+// Tag bitmasks over `items`, rebuilt whenever `items` is replaced (see loadData).
+let tagIndex = null;
+// When the deck ships in shards: their manifest, and the items of each shard
+// loaded so far, by file name. `items` is then only the shards the filter needs.
+let deckShards = null;
+const loadedShards = new Map();
+const SHARD_CACHE = "tr-quiz-shards";
 let tagRegistry = [];
 let current = null;
 let isRevealed = false;
@@ -1127,46 +1134,37 @@ const getFilteredItems = () => {
   const exclude = selectedValues(EXCLUDE_TAGS);
   const hasComputedToday = computedToday && computedToday.size > 0;
 
-  return items.filter((item) => {
-    const itemTags = new Set(item.tags || []);
+  // The session tag is membership in the computed list, not a deck tag, so it is
+  // taken out of the masks and checked per item.
+  const wantToday = include.has(SESSION_TAG);
+  const avoidToday = exclude.has(SESSION_TAG);
+  const deckInclude = new Set([...include].filter((tagId) => tagId !== SESSION_TAG));
+  const deckExclude = new Set([...exclude].filter((tagId) => tagId !== SESSION_TAG));
+  const index = currentTagIndex();
+  const wanted = TodayScoring.tagMask(index, deckInclude, true);
+  if (!wanted) return [];
+  const unwanted = TodayScoring.tagMask(index, deckExclude, false);
+
+  return items.filter((item, position) => {
+    if (!TodayScoring.matchesTags(index, position, wanted, unwanted)) return false;
+    if (!wantToday && !avoidToday) return true;
     const isToday = hasComputedToday
       ? computedToday.has(item.id)
-      : itemTags.has(SESSION_TAG) || computedToday.has(item.id);
-
-    for (const tagId of include) {
-      if (tagId === SESSION_TAG) {
-        if (!isToday) return false;
-        continue;
-      }
-      if (!itemTags.has(tagId)) return false;
-    }
-
-    for (const tagId of exclude) {
-      if (tagId === SESSION_TAG) {
-        if (isToday) return false;
-        continue;
-      }
-      if (itemTags.has(tagId)) return false;
-    }
-
-    return true;
+      : (item.tags || []).includes(SESSION_TAG) || computedToday.has(item.id);
+    return isToday ? !avoidToday : !wantToday;
   });
 };
 
-const filterItemsByTags = (allItems, include, exclude) => {
-  return allItems.filter((item) => {
-    const itemTags = new Set(item.tags || []);
-
-    for (const tagId of include) {
-      if (!itemTags.has(tagId)) return false;
-    }
-
-    for (const tagId of exclude) {
-      if (itemTags.has(tagId)) return false;
-    }
+// The index for the current deck; built from the items if loadData had none.
+const currentTagIndex = () => {
+  if (!tagIndex || tagIndex.items !== items) {
+    tagIndex = TodayScoring.buildTagIndex(items);
+  }
+  return tagIndex;
+};
 
-    return true;
-  });
+const filterItemsByTags = (allItems, include, exclude) => {
+  return TodayScoring.filterItems(allItems, include, exclude, allItems === items ? currentTagIndex() : null);
 };
 
 const recomputeToday = async ({ silent = false } = {}) => {
@@ -1355,10 +1353,10 @@ const renderTagOptions = (isInitial) => {
     tagRegistry.map((tag) => [tag.id, tag.label || tag.id])
   );
 
-  const usedTags = new Set();
-  items.forEach((item) => {
-    (item.tags || []).forEach((tagId) => usedTags.add(tagId));
-  });
+  const index = currentTagIndex();
+  // With shards, `items` may be a few units only; the manifest counts them all.
+  const deckCounts = deckShards ? deckShards.counts : index.counts;
+  const usedTags = new Set(deckShards ? Object.keys(deckCounts) : index.tags);
 
   const tagIds = Array.from(new Set([...existing.keys(), ...usedTags])).sort();
   const includeSelection = loadSelection(INCLUDE_STORAGE);
@@ -1371,12 +1369,7 @@ const renderTagOptions = (isInitial) => {
 
   // How many words carry each tag, so a tag that can never match is visible as "(0)"
   // rather than silently emptying the filter.
-  const tagCounts = new Map();
-  items.forEach((item) => {
-    (item.tags || []).forEach((tagId) => {
-      tagCounts.set(tagId, (tagCounts.get(tagId) || 0) + 1);
-    });
-  });
+  const tagCounts = new Map(Object.entries(deckCounts));
   // The study batch lives on this device, not in the deck, so count the local list
   // rather than any tag the deck happened to ship with. Matches getFilteredItems.
   if (computedToday && computedToday.size) {
@@ -1803,16 +1796,32 @@ MODE_BTNS.forEach((btn) => {
   });
 });
 
+// A filter may reach into shards not loaded yet; render once they are in.
+const renderAfterShards = () => {
+  const loading = loadShardsForSelection();
+  if (!loading) {
+    renderPrompt({ keepFocus: false });
+    return;
+  }
+  PROMPT.textContent = "Loading words…";
+  loading.then(
+    () => renderPrompt({ keepFocus: false }),
+    () => {
+      PROMPT.textContent = "Failed to load the words for this filter";
+    }
+  );
+};
+
 INCLUDE_TAGS.addEventListener("change", () => {
   saveSelection(INCLUDE_STORAGE, selectedValues(INCLUDE_TAGS));
   syncTagGroups(INCLUDE_TAGS);
-  renderPrompt({ keepFocus: false });
+  renderAfterShards();
 });
 
 EXCLUDE_TAGS.addEventListener("change", () => {
   saveSelection(EXCLUDE_STORAGE, selectedValues(EXCLUDE_TAGS));
   syncTagGroups(EXCLUDE_TAGS);
-  renderPrompt({ keepFocus: false });
+  renderAfterShards();
 });
 
 SESSION_TARGET.addEventListener("change", () => {
@@ -1998,23 +2007,109 @@ document.addEventListener("visibilitychange", () => {
   }
 });
 
-const loadData = async () => {
-  const response = await fetch(withCacheBust("data/quiz.json"), { cache: "no-store" });
-  const data = await response.json();
-  items = data.items || [];
-  tagRegistry = data.tags || [];
+// A shard's file name carries its content hash, so a stored copy never goes
+// stale: each one is downloaded once, and after a content update only the
+// shards whose hash changed are fetched again. The Cache API keeps them across
+// reloads; without it (or outside a secure context) the HTTP cache still helps.
+const fetchShard = async (shard) => {
+  const url = `data/shards/${shard.file}`;
+  const cache = typeof caches !== "undefined" ? await caches.open(SHARD_CACHE).catch(() => null) : null;
+  const stored = cache ? await cache.match(url).catch(() => null) : null;
+  if (stored) return DeckFormat.decodeShard(deckShards, await stored.json());
+  const response = await fetch(url);
+  if (!response.ok) throw new Error(`Failed to load ${url}`);
+  if (cache) await cache.put(url, response.clone()).catch(() => {});
+  return DeckFormat.decodeShard(deckShards, await response.json());
+};
+
+// Drop stored shards the current manifest no longer lists.
+const pruneShardCache = async () => {
+  if (typeof caches === "undefined" || !deckShards) return;
+  const listed = new Set(deckShards.shards.map((shard) => shard.file));
+  const cache = await caches.open(SHARD_CACHE);
+  const stored = await cache.keys();
+  await Promise.all(
+    stored
+      .filter((request) => !listed.has(new URL(request.url).pathname.split("/").pop()))
+      .map((request) => cache.delete(request))
+  );
+};
 
+// Load the shards the saved filter needs and have not been loaded yet, in
+// parallel, then rebuild `items` from every loaded shard in manifest order.
+// Returns null when there is nothing to fetch, so a filter change within the
+// loaded shards re-renders at once.
+const loadShardsForSelection = () => {
+  if (!deckShards) return null;
+  const include = loadSelection(INCLUDE_STORAGE);
+  const exclude = loadSelection(EXCLUDE_STORAGE);
+  // The practice set is computed per device, not carried in the deck.
+  include.delete(SESSION_TAG);
+  exclude.delete(SESSION_TAG);
+  const missing = DeckFormat.shardsFor(deckShards, include, exclude).filter(
+    (shard) => !loadedShards.has(shard.file)
+  );
+  if (!missing.length) return null;
+  return Promise.all(
+    missing.map(async (shard) => {
+      loadedShards.set(shard.file, await fetchShard(shard));
+    })
+  ).then(() => {
+    items = deckShards.shards
+      .filter((shard) => loadedShards.has(shard.file))
+      .flatMap((shard) => loadedShards.get(shard.file));
+    tagIndex = null;
+  });
+};
+
+// The shard manifest, or null when the deck was exported without --shards.
+const loadShardManifest = async () => {
   try {
-    const aliasResponse = await fetch(withCacheBust("data/aliases.json"), {
-      cache: "no-store",
-    });
-    if (aliasResponse.ok) {
-      const aliasData = await aliasResponse.json();
-      aliases = aliasData.aliases || {};
-    }
+    const response = await fetch(withCacheBust("data/shards/manifest.json"), { cache: "no-store" });
+    return response.ok ? await response.json() : null;
   } catch {
-    aliases = {};
+    return null;
+  }
+};
+
+const loadData = async () => {
+  deckShards = await loadShardManifest();
+  if (deckShards) {
+    try {
+      tagRegistry = deckShards.tags || [];
+      await loadShardsForSelection();
+      void pruneShardCache().catch(() => {});
+    } catch {
+      deckShards = null;  // a shard would not load: fall back to the whole deck
+      loadedShards.clear();
+    }
   }
+  if (!deckShards) {
+    const response = await fetch(withCacheBust("data/quiz.json"), { cache: "no-store" });
+    // Compact unless exported with --readable; decodeDeck accepts either.
+    const data = DeckFormat.decodeDeck(await response.json());
+    items = data.items || [];
+    tagRegistry = data.tags || [];
+  }
+
+  const [aliasData, tagIndexData] = await Promise.all(
+    ["data/aliases.json", deckShards ? null : "data/tag_index.json"].map(async (path) => {
+      if (!path) return null;
+      try {
+        const sideResponse = await fetch(withCacheBust(path), { cache: "no-store" });
+        return sideResponse.ok ? await sideResponse.json() : null;
+      } catch {
+        return null;
+      }
+    })
+  );
+  aliases = (aliasData && aliasData.aliases) || {};
+  // The postings index quiz.json's items by position, so they are only usable
+  // for the same export, and never for shards; otherwise the masks are built
+  // from the items.
+  const postings =
+    tagIndexData && tagIndexData.items === items.length ? tagIndexData.postings : null;
+  tagIndex = TodayScoring.buildTagIndex(items, postings);
 
   loadSessionTarget();
   loadTodayLimit();
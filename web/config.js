@@ -14,5 +14,5 @@ const APP_CONFIG = {
   // The write token is entered once in-app and kept in localStorage only.
   commentRepo: "valpola/kielikone",
   commentLabel: "vocab-comment",
-  cacheBust: "20260814-83",
+  cacheBust: "20261017-87",
 };
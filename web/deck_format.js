@@ -0,0 +1,77 @@
+(function (root, factory) {
+  if (typeof module === "object" && module.exports) {
+    module.exports = factory();
+  } else {
+    root.DeckFormat = factory();
+  }
+})(typeof self !== "undefined" ? self : this, function () {
+  "use strict";
+
+  // data/quiz.json is every device's first download. export_quiz.py writes it
+  // compact: one array per item in `fields` order, trailing absent fields
+  // dropped, tags as positions in the registry (then in unregistered_tags),
+  // minified and in plain UTF-8. This turns it back into the item objects the
+  // rest of the app works with. A deck exported with --readable is already in
+  // that shape and passes through untouched.
+  var COMPACT_FORMAT = "compact-1";
+
+  var decodeDeck = function (data) {
+    if (!data || data.format !== COMPACT_FORMAT) return data || {};
+    var tags = data.tags || [];
+    var names = tags
+      .map(function (tag) {
+        return tag.id;
+      })
+      .concat(data.unregistered_tags || []);
+    var fields = data.fields || [];
+    var items = (data.items || []).map(function (row) {
+      var item = {};
+      for (var i = 0; i < fields.length && i < row.length; i += 1) {
+        if (row[i] !== null && row[i] !== undefined) item[fields[i]] = row[i];
+      }
+      item.tags = (item.tags || []).map(function (position) {
+        return names[position];
+      });
+      return item;
+    });
+    return { items: items, tags: tags };
+  };
+
+  // With `export_quiz.py --shards` the deck also ships as one file per unit
+  // under data/shards/. The manifest carries what decodeDeck reads from a
+  // whole deck (format, fields, the registry); a shard carries only its rows.
+  var decodeShard = function (manifest, shard) {
+    return decodeDeck({
+      format: manifest.format,
+      fields: manifest.fields,
+      tags: manifest.tags,
+      unregistered_tags: manifest.unregistered_tags,
+      items: (shard && shard.items) || [],
+    }).items;
+  };
+
+  // The shards that can hold an item matching the filter: every include tag
+  // is carried by some item in the shard, and not every item carries an
+  // exclude tag. Include tags are ANDed, so a shard missing one has no match.
+  var shardsFor = function (manifest, includeTags, excludeTags) {
+    var include = Array.from(includeTags || []);
+    var exclude = Array.from(excludeTags || []);
+    return (manifest.shards || []).filter(function (shard) {
+      var carried = shard.tags || {};
+      var hasAll = include.every(function (tag) {
+        return (carried[tag] || 0) > 0;
+      });
+      var allExcluded = exclude.some(function (tag) {
+        return (carried[tag] || 0) === shard.items;
+      });
+      return hasAll && !allExcluded;
+    });
+  };
+
+  return {
+    COMPACT_FORMAT: COMPACT_FORMAT,
+    decodeDeck: decodeDeck,
+    decodeShard: decodeShard,
+    shardsFor: shardsFor,
+  };
+});
@@ -60,14 +60,13 @@
     return null;
   };
 
+  // export_quiz.py flattens data/aliases.json before writing it out, so every
+  // alias maps straight to its root and one lookup suffices.
   var canonicalize = function (wordId, aliases) {
-    var current = wordId;
-    var seen = {};
-    while (aliases && Object.prototype.hasOwnProperty.call(aliases, current) && !seen[current]) {
-      seen[current] = true;
-      current = aliases[current];
+    if (aliases && Object.prototype.hasOwnProperty.call(aliases, wordId)) {
+      return aliases[wordId];
     }
-    return current;
+    return wordId;
   };
 
   var eventStream = function (rows, aliases) {
@@ -173,19 +172,84 @@
     };
   };
 
-  var filterItems = function (items, includeTags, excludeTags) {
-    var include = includeTags || new Set();
-    var exclude = excludeTags || new Set();
-    return items.filter(function (item) {
-      var tags = new Set(item.tags || []);
-      var ok = true;
-      include.forEach(function (tag) {
-        if (!tags.has(tag)) ok = false;
+  // Tags as bits: one Uint32Array row of `words` 32-bit words per item, so an
+  // include/exclude filter is a few ANDs per item rather than a Set per item.
+  // `postings` (tag -> item positions, as export_quiz.py writes them) saves
+  // walking every item's tag list; without it the items are read directly.
+  var buildTagIndex = function (items, postings) {
+    var bits = {};
+    var tags = [];
+    var intern = function (tag) {
+      if (!Object.prototype.hasOwnProperty.call(bits, tag)) {
+        bits[tag] = tags.length;
+        tags.push(tag);
+      }
+      return bits[tag];
+    };
+    if (postings) {
+      Object.keys(postings).forEach(intern);
+    } else {
+      items.forEach(function (item) {
+        (item.tags || []).forEach(intern);
       });
-      exclude.forEach(function (tag) {
-        if (tags.has(tag)) ok = false;
+    }
+    var words = Math.max(1, Math.ceil(tags.length / 32));
+    var masks = new Uint32Array(items.length * words);
+    var counts = {};
+    var set = function (position, bit) {
+      masks[position * words + (bit >>> 5)] |= 1 << (bit & 31);
+    };
+    if (postings) {
+      tags.forEach(function (tag) {
+        var positions = postings[tag] || [];
+        counts[tag] = positions.length;
+        positions.forEach(function (position) {
+          set(position, bits[tag]);
+        });
+      });
+    } else {
+      items.forEach(function (item, position) {
+        (item.tags || []).forEach(function (tag) {
+          set(position, bits[tag]);
+          counts[tag] = (counts[tag] || 0) + 1;
+        });
       });
-      return ok;
+    }
+    return { items: items, bits: bits, tags: tags, words: words, masks: masks, counts: counts };
+  };
+
+  // The query as a mask row; null when an include tag is carried by no item.
+  var tagMask = function (index, tags, strict) {
+    var mask = new Uint32Array(index.words);
+    var known = true;
+    tags.forEach(function (tag) {
+      if (!Object.prototype.hasOwnProperty.call(index.bits, tag)) {
+        if (strict) known = false;
+        return;
+      }
+      var bit = index.bits[tag];
+      mask[bit >>> 5] |= 1 << (bit & 31);
+    });
+    return known ? mask : null;
+  };
+
+  var matchesTags = function (index, position, wanted, unwanted) {
+    var base = position * index.words;
+    for (var w = 0; w < index.words; w += 1) {
+      var row = index.masks[base + w];
+      // >>> 0: & yields a signed int, and bit 31 would otherwise never compare equal.
+      if ((row & wanted[w]) >>> 0 !== wanted[w] || (row & unwanted[w]) !== 0) return false;
+    }
+    return true;
+  };
+
+  var filterItems = function (items, includeTags, excludeTags, tagIndex) {
+    var index = tagIndex && tagIndex.items === items ? tagIndex : buildTagIndex(items);
+    var wanted = tagMask(index, includeTags || new Set(), true);
+    if (!wanted) return [];
+    var unwanted = tagMask(index, excludeTags || new Set(), false);
+    return items.filter(function (item, position) {
+      return matchesTags(index, position, wanted, unwanted);
     });
   };
 
@@ -246,6 +310,9 @@
     buildEventsByKey: buildEventsByKey,
     decay: decay,
     computeScores: computeScores,
+    buildTagIndex: buildTagIndex,
+    tagMask: tagMask,
+    matchesTags: matchesTags,
     filterItems: filterItems,
     scoreItems: scoreItems,
     selectTopN: selectTopN,